@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+重い集計・出力リクエストの受け付け制御
+
+「全データ」（約72万件）や長い期間指定の集計・Excel出力が同時に何本も走ると、DBの接続を
+使い切り、ダッシュボードの軽い呼び出しまで待たされる。ここではリクエストのコストを
+「期間の日数 × マッピング（支店・アカウントの組）の数」で見積もり、
+
+    軽い（ADMISSION_HEAVY_COST 未満）… 制限なしでそのまま実行（軽いリクエスト用の枠）
+    重い                             … ワーカーあたり ADMISSION_HEAVY_PER_WORKER 本まで同時に実行。
+                                         ADMISSION_DIR を指定するとホスト全体でも
+                                         ADMISSION_HEAVY_PER_HOST 本まで（ロックファイルの枠、POSIX のみ）
+
+空きがなければ ADMISSION_QUEUE_SECONDS 秒まで順番を待ち、待ちが ADMISSION_MAX_QUEUE 件を
+超えるか時間内に空かなければ 503 と Retry-After を返す。重いリクエストの同時数を接続プールの
+大きさより小さく抑えることで、残りの接続が軽いリクエスト用に空けておかれる。
+
+レスポンスには X-Admission: light / heavy と、重いリクエストの待ち時間 X-Admission-Wait-Ms を付ける。
+状況は /api/admin/admission で見る。
+
+設定（環境変数 または app.config）:
+    ADMISSION_ENABLED            0 で無効（既定: 1）
+    ADMISSION_HEAVY_COST         重いとみなすコスト（日数 × マッピング数、既定: 3000）
+    ADMISSION_HEAVY_PER_WORKER   ワーカーあたりの重いリクエストの同時実行数（既定: 2）
+    ADMISSION_HEAVY_PER_HOST     ホスト全体の同時実行数（ADMISSION_DIR 指定時のみ、既定: 4）
+    ADMISSION_DIR                ホスト全体の枠に使うロックファイルの置き場（既定: なし）
+    ADMISSION_QUEUE_SECONDS      空きを待つ秒数（既定: 10）
+    ADMISSION_MAX_QUEUE          ワーカーあたりの待ちの上限（既定: 8）
+    ADMISSION_RETRY_AFTER        拒否したときの Retry-After 秒数（既定: 15）
+    ADMISSION_ALL_DAYS           「全データ」を何日分とみなすか（既定: 3650）
+    ADMISSION_MAPPING_SECONDS    マッピング数を使い回す秒数（既定: 300）
+"""
+
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, jsonify, make_response
+
+try:
+    import fcntl
+except ImportError:  # Windows ではホスト全体の枠を使わない
+    fcntl = None
+
+
+class AdmissionRejected(Exception):
+    """重いリクエストの枠が空かなかった"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CachedValue:
+    """計算結果を一定時間使い回す（マッピング数のように変化の少ない見積もり用）"""
+
+    def __init__(self, compute, ttl_seconds=300.0):
+        self.compute = compute
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._value = None
+        self._computed_at = 0.0
+
+    def get(self):
+        with self._lock:
+            if self._value is None or time.monotonic() - self._computed_at >= self.ttl_seconds:
+                self._value = self.compute()
+                self._computed_at = time.monotonic()
+            return self._value
+
+
+class HostSlots:
+    """ホスト全体の同時実行枠（slot-<番号>.lock のどれか1つを flock できれば1枠）"""
+
+    def __init__(self, directory, size):
+        self.directory = directory
+        self.size = size
+        os.makedirs(directory, exist_ok=True)
+
+    def try_acquire(self):
+        for index in range(self.size):
+            handle = open(os.path.join(self.directory, f'slot-{index}.lock'), 'a+b')
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return handle
+            except OSError:
+                handle.close()
+        return None
+
+    @staticmethod
+    def release(handle):
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+
+
+class AdmissionController:
+    def __init__(self, heavy_cost=3000, per_worker=2, per_host=4, host_dir=None,
+                 queue_seconds=10.0, max_queue=8, retry_after=15):
+        self.heavy_cost = heavy_cost
+        self.per_worker = per_worker
+        self.queue_seconds = queue_seconds
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.host_slots = HostSlots(host_dir, per_host) if host_dir and fcntl is not None else None
+
+        self._condition = threading.Condition()
+        self.running = 0
+        self.waiting = 0
+        self.admitted = {'light': 0, 'heavy': 0}
+        self.rejected = 0
+
+    def is_heavy(self, cost):
+        return cost >= self.heavy_cost
+
+    def _acquire_worker_slot(self, deadline):
+        with self._condition:
+            if self.running < self.per_worker:
+                self.running += 1
+                return
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected('queue_full', self.retry_after)
+            self.waiting += 1
+            try:
+                while self.running >= self.per_worker:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise AdmissionRejected('queue_timeout', self.retry_after)
+                    self._condition.wait(remaining)
+                self.running += 1
+            finally:
+                self.waiting -= 1
+
+    def _release_worker_slot(self):
+        with self._condition:
+            self.running -= 1
+            self._condition.notify()
+
+    def _acquire_host_slot(self, deadline):
+        while True:
+            handle = self.host_slots.try_acquire()
+            if handle is not None:
+                return handle
+            if time.monotonic() >= deadline:
+                with self._condition:
+                    self.rejected += 1
+                raise AdmissionRejected('host_busy', self.retry_after)
+            time.sleep(0.05)
+
+    @contextmanager
+    def heavy_slot(self):
+        """重いリクエストの枠を取る（空かなければ AdmissionRejected）。with には待った秒数を渡す"""
+        started = time.monotonic()
+        deadline = started + self.queue_seconds
+        self._acquire_worker_slot(deadline)
+        handle = None
+        try:
+            if self.host_slots is not None:
+                handle = self._acquire_host_slot(deadline)
+            with self._condition:
+                self.admitted['heavy'] += 1
+            yield time.monotonic() - started
+        finally:
+            if handle is not None:
+                self.host_slots.release(handle)
+            self._release_worker_slot()
+
+    def record_light(self):
+        with self._condition:
+            self.admitted['light'] += 1
+
+    def stats(self):
+        with self._condition:
+            return {
+                'heavy_cost': self.heavy_cost,
+                'heavy_per_worker': self.per_worker,
+                'heavy_per_host': self.host_slots.size if self.host_slots else None,
+                'running_heavy': self.running,
+                'waiting_heavy': self.waiting,
+                'admitted': dict(self.admitted),
+                'rejected': self.rejected
+            }
+
+
+# ========================
+# Flask
+# ========================
+
+def controlled(estimate_cost):
+    """
+    estimate_cost() のコストで軽い・重いを分け、重いリクエストは枠が空くまで待たせる（空かなければ 503）
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            controller = current_app.extensions.get('admission')
+            if controller is None:
+                return view(*args, **kwargs)
+            cost = estimate_cost()
+            if not controller.is_heavy(cost):
+                controller.record_light()
+                response = make_response(view(*args, **kwargs))
+                response.headers['X-Admission'] = 'light'
+                return response
+            try:
+                with controller.heavy_slot() as waited:
+                    response = make_response(view(*args, **kwargs))
+            except AdmissionRejected as e:
+                response = make_response(jsonify({
+                    'status': 'error',
+                    'message': f'重い集計が混み合っています。{e.retry_after}秒ほど待ってから再度お試しください',
+                    'reason': e.reason,
+                    'retry_after': e.retry_after
+                }), 503)
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+            response.headers['X-Admission'] = 'heavy'
+            response.headers['X-Admission-Wait-Ms'] = str(int(waited * 1000))
+            return response
+        return wrapper
+    return decorator
+
+
+def init_app(app, db):
+    """受け付け制御を有効にし、/api/admin/admission を登録"""
+    app.config.setdefault('ADMISSION_ENABLED', os.getenv('ADMISSION_ENABLED', '1') == '1')
+    app.config.setdefault('ADMISSION_HEAVY_COST', int(os.getenv('ADMISSION_HEAVY_COST', '3000')))
+    app.config.setdefault('ADMISSION_HEAVY_PER_WORKER', int(os.getenv('ADMISSION_HEAVY_PER_WORKER', '2')))
+    app.config.setdefault('ADMISSION_HEAVY_PER_HOST', int(os.getenv('ADMISSION_HEAVY_PER_HOST', '4')))
+    app.config.setdefault('ADMISSION_DIR', os.getenv('ADMISSION_DIR') or None)
+    app.config.setdefault('ADMISSION_QUEUE_SECONDS', float(os.getenv('ADMISSION_QUEUE_SECONDS', '10')))
+    app.config.setdefault('ADMISSION_MAX_QUEUE', int(os.getenv('ADMISSION_MAX_QUEUE', '8')))
+    app.config.setdefault('ADMISSION_RETRY_AFTER', int(os.getenv('ADMISSION_RETRY_AFTER', '15')))
+    app.config.setdefault('ADMISSION_ALL_DAYS', int(os.getenv('ADMISSION_ALL_DAYS', '3650')))
+    app.config.setdefault('ADMISSION_MAPPING_SECONDS', float(os.getenv('ADMISSION_MAPPING_SECONDS', '300')))
+
+    controller = AdmissionController(
+        heavy_cost=app.config['ADMISSION_HEAVY_COST'],
+        per_worker=app.config['ADMISSION_HEAVY_PER_WORKER'],
+        per_host=app.config['ADMISSION_HEAVY_PER_HOST'],
+        host_dir=app.config['ADMISSION_DIR'],
+        queue_seconds=app.config['ADMISSION_QUEUE_SECONDS'],
+        max_queue=app.config['ADMISSION_MAX_QUEUE'],
+        retry_after=app.config['ADMISSION_RETRY_AFTER']
+    )
+    if app.config['ADMISSION_ENABLED']:
+        app.extensions['admission'] = controller
+
+    # 重いリクエストが接続プールを使い切ると軽いリクエストの枠がなくなる
+    with app.app_context():
+        pool_size = getattr(db.engine.pool, 'size', lambda: None)()
+    if pool_size is not None and controller.per_worker >= pool_size:
+        print(f'ADMISSION_HEAVY_PER_WORKER({controller.per_worker}) が接続プール({pool_size})以上のため、'
+              f'軽いリクエスト用の接続が残りません')
+
+    @app.route('/api/admin/admission')
+    def admin_admission():
+        """重いリクエストの実行・待ち・拒否の状況"""
+        return jsonify(dict(controller.stats(), status='success', enabled=app.config['ADMISSION_ENABLED']))
+
+    return controller
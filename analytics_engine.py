@@ -0,0 +1,153 @@
+"""
+組み込み DuckDB による分析用バックエンド
+
+「1年」「全期間（⚠️重い）」のような長い期間の集計は、行指向の MySQL では
+companies を広く読むことになり重い。companies_snapshot.py が書き出した
+Parquet スナップショットを DuckDB（列指向・組み込み）で集計し、
+アプリの集計関数と同じ形式で返す。
+
+    counts_by_period        … get_companies_counts_by_period と同じ形式
+    unassigned_counts_by_area … get_unassigned_counts_by_area と同じ形式
+    daily_aggregate         … count_cube.daily_aggregate と同じ行（日別ピボットの元）
+
+スナップショットは差分エクスポートの間隔だけ遅れるため、長い期間の集計にだけ使う
+（use_for で期間の日数を判定する）。今日を含む期間は、最後のエクスポートから
+max_lag_seconds 以内のときだけ使い、それより古ければ取りこぼしがないよう MySQL に任せる。
+"""
+
+import os
+from datetime import date, datetime
+
+try:
+    import duckdb
+except ImportError:  # duckdb が入っていない環境では常に MySQL で集計する
+    duckdb = None
+
+import companies_snapshot
+
+
+class DuckDBAnalytics:
+    def __init__(self, root, min_range_days=90, max_lag_seconds=None):
+        self.root = root
+        self.min_range_days = min_range_days
+        # 今日を含む期間に使えるスナップショットの遅れの上限（None なら遅れを見ない）
+        self.max_lag_seconds = max_lag_seconds
+
+    @property
+    def available(self):
+        return duckdb is not None and bool(self.root) and os.path.exists(
+            os.path.join(self.root, companies_snapshot.WATERMARK_FILE)
+        )
+
+    def use_for(self, start, end):
+        """期間 [start, end] をこのバックエンドで集計するか（None は全期間）"""
+        if not self.available:
+            return False
+        if start is not None and (end - start).days + 1 < self.min_range_days:
+            return False
+        if end is not None and end < date.today():
+            return True
+        return self.fresh_enough()
+
+    def fresh_enough(self):
+        """最後のエクスポートが max_lag_seconds 以内か（それより後に追加された行を落とさないか）"""
+        if self.max_lag_seconds is None:
+            return True
+        exported_at = companies_snapshot.read_exported_at(self.root)
+        return exported_at is not None and (datetime.now() - exported_at).total_seconds() <= self.max_lag_seconds
+
+    # ------------------------
+    # クエリ
+    # ------------------------
+
+    def _latest(self):
+        """
+        各 id の最新版だけを残したスナップショット（companies_snapshot.read_companies と同じ規則）
+
+        集計に使う列だけを読むことで、Parquet の列単位の読み込みを活かす。
+        """
+        pattern = os.path.join(self.root, f'{companies_snapshot.PARTITION_COLUMN}=*', '*.parquet')
+        return f"""
+            SELECT id, fm_area_id, imported_fm_account_id, fm_import_result, created_at, updated_at
+            FROM read_parquet('{pattern.replace("'", "''")}', hive_partitioning = true)
+            QUALIFY row_number() OVER (
+                PARTITION BY id ORDER BY updated_at DESC NULLS LAST, {companies_snapshot.RUN_COLUMN} DESC
+            ) = 1
+        """
+
+    @staticmethod
+    def _in_period(column, start, end):
+        if start is None:
+            return 'TRUE', []
+        return f'CAST({column} AS DATE) BETWEEN ? AND ?', [start, end]
+
+    def _execute(self, sql, params=()):
+        # 接続はスレッド間で共有できないため、呼び出しごとにインメモリで開く
+        conn = duckdb.connect()
+        try:
+            return conn.execute(sql, list(params)).fetchall()
+        finally:
+            conn.close()
+
+    def counts_by_period(self, start, end):
+        """{(支店ID, アカウントID): {'new_count': n, 'update_count': n}}"""
+        created, created_params = self._in_period('created_at', start, end)
+        updated, updated_params = self._in_period('updated_at', start, end)
+        rows = self._execute(f"""
+            WITH latest AS ({self._latest()})
+            SELECT
+                fm_area_id,
+                imported_fm_account_id,
+                count(*) FILTER (WHERE fm_import_result = 2 AND {created}) AS new_count,
+                count(*) FILTER (WHERE fm_import_result = 1 AND {updated}) AS update_count
+            FROM latest
+            GROUP BY fm_area_id, imported_fm_account_id
+            HAVING new_count + update_count > 0
+        """, created_params + updated_params)
+        return {
+            (area_id, account_id): {'new_count': new_count, 'update_count': update_count}
+            for area_id, account_id, new_count, update_count in rows
+        }
+
+    def unassigned_counts_by_area(self, start, end):
+        """{支店ID: 件数}"""
+        created, params = self._in_period('created_at', start, end)
+        rows = self._execute(f"""
+            WITH latest AS ({self._latest()})
+            SELECT fm_area_id, count(*)
+            FROM latest
+            WHERE (imported_fm_account_id IS NULL OR imported_fm_account_id = 0)
+              AND fm_import_result = 0
+              AND {created}
+            GROUP BY fm_area_id
+        """, params)
+        return {area_id: count for area_id, count in rows}
+
+    def daily_aggregate(self, start=None, end=None):
+        """(日付, 支店ID, アカウントID, 取込結果, 件数) の日別集計"""
+        created, created_params = self._in_period('created_at', start, end)
+        updated, updated_params = self._in_period('updated_at', start, end)
+        rows = self._execute(f"""
+            WITH latest AS ({self._latest()})
+            SELECT CAST(created_at AS DATE), fm_area_id, imported_fm_account_id, fm_import_result, count(*)
+            FROM latest
+            WHERE fm_import_result IN (0, 2) AND {created}
+            GROUP BY ALL
+            UNION ALL
+            SELECT CAST(updated_at AS DATE), fm_area_id, imported_fm_account_id, fm_import_result, count(*)
+            FROM latest
+            WHERE fm_import_result = 1 AND {updated}
+            GROUP BY ALL
+        """, created_params + updated_params)
+        return [tuple(row) for row in rows]
+
+    def daily_pivot(self, start=None, end=None):
+        """日別の新規・更新・振り分けなし件数 {日付: {'new_count', 'update_count', 'unassigned_count'}}"""
+        keys = {0: 'unassigned_count', 1: 'update_count', 2: 'new_count'}
+        pivot = {}
+        for day, _, account_id, result, count in self.daily_aggregate(start, end):
+            if day is None or (result == 0 and account_id not in (None, 0)):
+                continue
+            totals = pivot.setdefault(day, {'new_count': 0, 'update_count': 0, 'unassigned_count': 0})
+            totals[keys[result]] += count
+        return dict(sorted(pivot.items()))
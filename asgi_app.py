@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+データAPIの ASGI 版（非同期ドライバ）
+
+集計APIの処理時間の大半は MySQL の応答待ちで、同期の Flask ワーカーでは待っている間も
+リクエスト1本がスレッドを1本占有する。ここでは次のルートを、同じ SELECT・同じレスポンスの
+組み立て（real_data_app / hellowork_app の関数）のまま、非同期ドライバと専用の接続プールで返す。
+
+    POST      /api/filtered-data
+    GET/POST  /api/date-range-data
+    GET       /api/mapping
+    GET       /api/daily-report
+    GET       /healthz
+
+待っている間はイベントループが他のリクエストを進めるため、1プロセスで同時に抱えられる
+リクエストの数はスレッド数ではなく接続プールの大きさで決まる。1リクエスト内の独立した SELECT は
+asyncio.gather でプールの別々の接続に同時に投げる（同期版の parallel_queries と同じ組み合わせ）。
+
+    MySQL   … mysql+aiomysql（DATABASE_URL の mysql+pymysql などを置き換える）
+    SQLite  … sqlite+aiosqlite（ローカル検証・テスト用）
+
+同期版との違い: 件数キューブ・分析用バックエンド・期間集計のキャッシュ（stale-while-revalidate）・
+受け付け制御・同じリクエストのまとめ・ETag による 304・レスポンスの圧縮は通さない
+（いつも SQL で数える。圧縮はリバースプロキシに任せる）。ステートメントの上限は MySQL の
+MAX_EXECUTION_TIME ヒントだけをかけ、超えたら 504 を返す。
+
+起動:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8000
+    python asgi_app.py --port 8000
+
+比較:
+    python async_load_test.py
+
+設定（環境変数）:
+    ASYNC_DATABASE_URL            sales_list の接続先（既定: DATABASE_URL を非同期ドライバに置き換えたもの）
+    ASYNC_HELLOWORK_DATABASE_URL  ハローワークの接続先（既定: HELLOWORK_DATABASE_URL を同様に）
+    ASYNC_POOL_SIZE               接続プールの大きさ（既定: 20）
+    ASYNC_MAX_OVERFLOW            プールを超えて開く接続の数（既定: 10）
+    STATEMENT_TIMEOUT_MS          ステートメント1本の上限（既定: 10000。0 で無効）
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from datetime import datetime
+from urllib.parse import parse_qsl
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.datastructures import MIMEAccept, MultiDict
+from werkzeug.http import parse_accept_header
+
+import hellowork_app
+import json_formats
+import query_timeouts
+import real_data_app
+
+ASYNC_DRIVERS = {'mysql': 'aiomysql', 'sqlite': 'aiosqlite'}
+
+
+def async_database_url(url):
+    """同期ドライバの URL を非同期ドライバの URL に置き換える（mysql+pymysql:// -> mysql+aiomysql://）"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'非同期ドライバに対応していないデータベースです: {backend}')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.payload = dict({'status': 'error', 'message': message}, **extra)
+
+
+class AsyncRequest:
+    """ASGI の scope と本文から、ルートが使う部分だけを Flask の request に似せて取り出す"""
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = MultiDict(parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True))
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.accept_mimetypes = parse_accept_header(self.headers.get('accept'), MIMEAccept)
+        self.body = body
+
+    def get_json(self, silent=False):
+        try:
+            return json.loads(self.body) if self.body else None
+        except ValueError:
+            if silent:
+                return None
+            raise
+
+
+# ========================
+# 接続プール
+# ========================
+
+class AsyncDatabases:
+    """sales_list・ハローワークの非同期エンジン（最初に使ったイベントループで作り、dispose で閉じる）"""
+
+    def __init__(self, urls, pool_size=20, max_overflow=10, statement_timeout_ms=10000):
+        self.urls = urls
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.statement_timeout_ms = statement_timeout_ms
+        self._engines = {}
+
+    def engine(self, name):
+        if name not in self._engines:
+            self._engines[name] = self._create_engine(self.urls[name])
+        return self._engines[name]
+
+    def _create_engine(self, url):
+        url = async_database_url(url)
+        # aiosqlite の既定（NullPool）でも MySQL と同じく大きさの決まったプールを使う
+        options = {
+            'poolclass': AsyncAdaptedQueuePool,
+            'pool_size': self.pool_size,
+            'max_overflow': self.max_overflow,
+            'pool_pre_ping': True
+        }
+        if url.get_backend_name() == 'mysql':
+            options['pool_recycle'] = 3600
+        engine = create_async_engine(url, **options)
+
+        if url.get_backend_name() == 'mysql' and self.statement_timeout_ms:
+            @event.listens_for(engine.sync_engine, 'before_cursor_execute', retval=True)
+            def _max_execution_time(conn, cursor, statement, parameters, context, executemany):
+                return query_timeouts.add_max_execution_time(statement, self.statement_timeout_ms), parameters
+
+        return engine
+
+    async def fetch_all(self, name, statement):
+        """SELECT を1本、プールの接続1本で実行して全行を返す"""
+        async with self.engine(name).connect() as connection:
+            return (await connection.execute(statement)).all()
+
+    async def dispose(self):
+        engines, self._engines = self._engines, {}
+        for engine in engines.values():
+            await engine.dispose()
+
+
+def raise_for_timeout(error):
+    if isinstance(error, DBAPIError) and query_timeouts.is_timeout_error(error.orig):
+        raise HTTPError(504, '集計が時間内に終わりませんでした。期間を短くするか、しばらくしてから再度お試しください',
+                        timeout=True)
+
+
+# ========================
+# ルート
+# ========================
+
+async def filtered_data(databases, request):
+    """期間フィルタを適用したデータ取得API（real_data_app の /api/filtered-data と同じレスポンス）"""
+    data = request.get_json() or {}
+    date_filter = data.get('date_filter', 'today')
+    filter_start, filter_end = real_data_app.get_period_range(date_filter)
+    new_statement, update_statement = real_data_app.period_count_statements(filter_start, filter_end)
+
+    async def areas_with_accounts():
+        all_areas, mapping_rows = await asyncio.gather(
+            databases.fetch_all('sales_list', real_data_app.all_areas_statement()),
+            databases.fetch_all('sales_list', real_data_app.area_account_mapping_statement())
+        )
+        mapping = real_data_app.mapping_from_rows(mapping_rows)
+        mapped_area_ids = {item['area_id'] for item in mapping}
+        try:
+            areas_having_data = {
+                row[0] for row in await databases.fetch_all(
+                    'sales_list', real_data_app.areas_having_data_statement(mapped_area_ids)
+                )
+            } if mapped_area_ids else set()
+        except Exception:
+            areas_having_data = set()
+        return real_data_app.group_areas_with_accounts(all_areas, mapping, areas_having_data)
+
+    areas, new_rows, update_rows, unassigned_rows = await asyncio.gather(
+        areas_with_accounts(),
+        databases.fetch_all('sales_list', new_statement),
+        databases.fetch_all('sales_list', update_statement),
+        databases.fetch_all('sales_list', real_data_app.unassigned_counts_statement(filter_start, filter_end)),
+        return_exceptions=True
+    )
+    if isinstance(areas, Exception):
+        raise_for_timeout(areas)
+        # マッピング取得に失敗した場合は空のレスポンスを返す
+        return {
+            'status': 'success',
+            'period': '今日',
+            'period_text': '今日',
+            'total_new': 0,
+            'total_update': 0,
+            'total_companies': 0,
+            'areas': [],
+            'message': f'マッピングデータの取得に失敗しました: {areas}'
+        }
+    for result in (new_rows, update_rows):
+        if isinstance(result, Exception):
+            raise result
+    if isinstance(unassigned_rows, Exception):
+        print(f"支店レベル振り分けなしデータ取得エラー: {unassigned_rows}")
+        unassigned_rows = []
+
+    return real_data_app.filtered_data_payload(
+        date_filter, areas,
+        real_data_app.counts_from_rows(new_rows, update_rows),
+        {area_id: count for area_id, count in unassigned_rows},
+        computed_at=datetime.now().isoformat(timespec='seconds')
+    )
+
+
+async def date_range_data(databases, request):
+    """日付範囲指定データ取得API（real_data_app の /api/date-range-data と同じレスポンス）"""
+    data = request.args if request.method == 'GET' else (request.get_json(silent=True) or {})
+    start_date_str = data.get('start_date')
+    end_date_str = data.get('end_date')
+    if not start_date_str or not end_date_str:
+        raise HTTPError(400, '開始日と終了日を指定してください')
+
+    start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+    end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    new_statement, update_statement = real_data_app.period_count_statements(start_date, end_date)
+
+    mapping_rows, new_rows, update_rows, unassigned_rows = await asyncio.gather(
+        databases.fetch_all('sales_list', real_data_app.area_account_mapping_statement()),
+        databases.fetch_all('sales_list', new_statement),
+        databases.fetch_all('sales_list', update_statement),
+        databases.fetch_all('sales_list', real_data_app.unassigned_counts_statement(start_date, end_date)),
+        return_exceptions=True
+    )
+    for result in (mapping_rows, new_rows, update_rows):
+        if isinstance(result, Exception):
+            raise result
+    if isinstance(unassigned_rows, Exception):
+        print(f"支店レベル振り分けなしデータ取得エラー（日付範囲）: {unassigned_rows}")
+        unassigned_rows = []
+
+    return real_data_app.date_range_payload(
+        start_date_str, end_date_str,
+        real_data_app.mapping_from_rows(mapping_rows),
+        real_data_app.counts_from_rows(new_rows, update_rows),
+        {area_id: count for area_id, count in unassigned_rows},
+        computed_at=datetime.now().isoformat(timespec='seconds')
+    )
+
+
+async def mapping(databases, request):
+    """支店・アカウントマッピング取得API"""
+    rows = await databases.fetch_all('sales_list', real_data_app.area_account_mapping_statement())
+    return {'status': 'success', 'data': real_data_app.mapping_from_rows(rows)}
+
+
+async def daily_report(databases, request):
+    """日別レポートAPI（hellowork_app の /api/daily-report と同じレスポンス）"""
+    statement = hellowork_app.daily_report_statement(*hellowork_app.daily_report_params(request.args))
+    return hellowork_app.daily_report_payload(await databases.fetch_all('hellowork', statement))
+
+
+async def healthz(databases, request):
+    """プロセスが応答できるか（I/O なし）"""
+    return {'status': 'ok'}
+
+
+ROUTES = {
+    '/api/filtered-data': (('POST',), filtered_data),
+    '/api/date-range-data': (('GET', 'POST'), date_range_data),
+    '/api/mapping': (('GET',), mapping),
+    '/api/daily-report': (('GET',), daily_report),
+    '/healthz': (('GET',), healthz),
+}
+
+
+# ========================
+# ASGI アプリケーション
+# ========================
+
+class AsyncDataAPI:
+    def __init__(self, databases, json_provider):
+        self.databases = databases
+        self.json = json_provider
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.databases.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        request = AsyncRequest(scope, body)
+        status, payload, headers = await self.dispatch(request)
+
+        if status == 200:
+            payload, mimetype = json_formats.negotiate(payload, request.accept_mimetypes)
+            headers.append((b'vary', b'Accept'))
+        else:
+            mimetype = json_formats.JSON_MIMETYPE
+        content = self.json.dumps(payload).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', mimetype.encode('latin-1')),
+                (b'content-length', str(len(content)).encode('latin-1')),
+            ] + headers
+        })
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def dispatch(self, request):
+        """(ステータス, レスポンスの dict, 追加ヘッダー)"""
+        route = ROUTES.get(request.path)
+        if route is None:
+            return 404, {'status': 'error', 'message': 'Not Found'}, []
+        methods, handler = route
+        if request.method not in methods:
+            return 405, {'status': 'error', 'message': 'Method Not Allowed'}, \
+                [(b'allow', ', '.join(methods).encode('latin-1'))]
+        try:
+            return 200, await handler(self.databases, request), []
+        except HTTPError as e:
+            return e.status, e.payload, []
+        except Exception as e:
+            try:
+                raise_for_timeout(e)
+            except HTTPError as timeout:
+                return timeout.status, timeout.payload, []
+            return 500, {'status': 'error', 'message': str(e)}, []
+
+
+def create_app():
+    databases = AsyncDatabases(
+        {
+            'sales_list': os.getenv('ASYNC_DATABASE_URL') or real_data_app.app.config['SQLALCHEMY_DATABASE_URI'],
+            'hellowork': os.getenv('ASYNC_HELLOWORK_DATABASE_URL') or hellowork_app.app.config['SQLALCHEMY_DATABASE_URI'],
+        },
+        pool_size=int(os.getenv('ASYNC_POOL_SIZE', '20')),
+        max_overflow=int(os.getenv('ASYNC_MAX_OVERFLOW', '10')),
+        statement_timeout_ms=int(os.getenv('STATEMENT_TIMEOUT_MS', '10000'))
+    )
+    return AsyncDataAPI(databases, real_data_app.app.json)
+
+
+app = create_app()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='データAPIを ASGI（uvicorn）で起動')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        print('uvicorn が入っていません（pip install uvicorn）')
+        return 1
+    uvicorn.run('asgi_app:app', host=args.host, port=args.port, workers=args.workers)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
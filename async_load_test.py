@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+同期（Flask・スレッド）と ASGI（asgi_app・非同期ドライバ）の1プロセスあたりの同時実行数の比較
+
+ローカルの SQLite は MySQL と違って応答待ちがほとんどないため、SQL 1本ごとに --latency-ms の
+待ちを入れて MySQL の往復を真似る（SQLite のトレースコールバックで、SQL を実行するスレッドを
+止める。同期版ではリクエストのスレッド、非同期版では aiosqlite の接続ごとのスレッドが止まる）。
+
+同じリクエストを --concurrency 本ずつ同時に送り、
+
+    sync   … --threads 本のスレッドを持つ同期ワーカー（gunicorn の gthread 相当）に Flask のテストクライアントで
+    async  … asgi_app をイベントループ1本で直接呼ぶ
+
+ときの処理件数/秒・レイテンシと、同時に待っていた SQL の最大数を比べる。同期版はスレッド数、
+非同期版は接続プールの大きさ（ASYNC_POOL_SIZE）が上限になる。
+同じ処理を比べるため、同期版の期間集計のキャッシュ・受け付け制御・同じリクエストのまとめは切る。
+
+使い方:
+    python local_db.py seed --companies 5000
+    python async_load_test.py --requests 400 --concurrency 64 --threads 8 --latency-ms 20
+
+件数が多いと SQLite の集計そのもの（CPU）が律速になり、待ちの比較にならない。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+import local_db
+
+MONTH_AGO = str(date.today() - timedelta(days=30))
+
+ROUTES = [
+    ('POST', '/api/filtered-data', b'', json.dumps({'date_filter': 'month'}).encode()),
+    ('GET', '/api/date-range-data', f'start_date={MONTH_AGO}&end_date={date.today()}'.encode(), b''),
+    ('GET', '/api/mapping', b'', b''),
+    ('GET', '/api/daily-report', b'', b''),
+]
+
+
+class StatementLatency:
+    """SQL 1本ごとに実行スレッドを latency 秒止め、同時に待っている SQL の最大数を数える"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.peak = 0
+
+    def __call__(self, statement):
+        with self._lock:
+            self.waiting += 1
+            self.peak = max(self.peak, self.waiting)
+        time.sleep(self.latency)
+        with self._lock:
+            self.waiting -= 1
+
+    def install_sync(self, engine):
+        @event.listens_for(engine, 'connect')
+        def _connect(dbapi_connection, connection_record):
+            dbapi_connection.set_trace_callback(self)
+        engine.dispose()  # 既存の接続にも入るように開き直させる
+
+    def install_async(self, engine):
+        @event.listens_for(engine.sync_engine, 'connect')
+        def _connect(dbapi_connection, connection_record):
+            # aiosqlite の接続のスレッドで呼ばれるようにする（イベントループは止めない）
+            dbapi_connection.await_(dbapi_connection._connection.set_trace_callback(self))
+
+
+def summarize(mode, timings, wall, latency, statuses):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+    errors = sum(1 for status in statuses if status != 200)
+    print(f'{mode:<7}{len(timings):>9}{len(timings) / wall:>10.1f}{statistics.median(timings):>10.1f}'
+          f'{p95:>10.1f}{latency.peak:>12}{errors:>8}')
+
+
+def run_sync(modules, requests, concurrency, threads, latency):
+    real_data_app, hellowork_app = modules
+    for module in modules:
+        with module.app.app_context():
+            latency.install_sync(module.db.engine)
+    clients = {id(real_data_app): real_data_app.app.test_client(), id(hellowork_app): hellowork_app.app.test_client()}
+
+    def handle(index):
+        method, path, query, body = ROUTES[index % len(ROUTES)]
+        module = hellowork_app if path == '/api/daily-report' else real_data_app
+        response = clients[id(module)].open(
+            path, method=method, query_string=query.decode(), data=body or None, content_type='application/json'
+        )
+        return response.status_code
+
+    # concurrency 本のクライアントが送っても、同期ワーカーが同時に処理できるのは threads 本まで
+    # （レイテンシはスレッドが空くまでの待ちを含めてクライアント側で測る）
+    with ThreadPoolExecutor(max_workers=threads) as worker:
+        def one(index):
+            started = time.perf_counter()
+            status = worker.submit(handle, index).result()
+            return (time.perf_counter() - started) * 1000, status
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as clients_pool:
+            results = list(clients_pool.map(one, range(requests)))
+        wall = time.perf_counter() - started
+    summarize('sync', [r[0] for r in results], wall, latency, [r[1] for r in results])
+
+
+async def call_asgi(app, method, path, query, body):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+             'headers': [(b'content-type', b'application/json')]}
+    await app(scope, receive, send)
+    return messages[0]['status']
+
+
+def run_async(asgi_app, requests, concurrency, latency):
+    app = asgi_app.app
+
+    async def main():
+        for name in ('sales_list', 'hellowork'):
+            latency.install_async(app.databases.engine(name))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(index):
+            method, path, query, body = ROUTES[index % len(ROUTES)]
+            async with semaphore:
+                started = time.perf_counter()
+                status = await call_asgi(app, method, path, query, body)
+                return (time.perf_counter() - started) * 1000, status
+
+        try:
+            started = time.perf_counter()
+            results = await asyncio.gather(*(one(index) for index in range(requests)))
+            return results, time.perf_counter() - started
+        finally:
+            await app.databases.dispose()
+
+    results, wall = asyncio.run(main())
+    summarize('async', [r[0] for r in results], wall, latency, [r[1] for r in results])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='同期版と ASGI 版の同時実行数を比較')
+    parser.add_argument('--url', default=local_db.DEFAULT_URL, help='sales_list 用のDB URL')
+    parser.add_argument('--hellowork-url', default=local_db.DEFAULT_HELLOWORK_URL, help='ハローワーク用のDB URL')
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=64, help='同時に送るリクエストの数')
+    parser.add_argument('--threads', type=int, default=8, help='同期ワーカーのスレッド数')
+    parser.add_argument('--latency-ms', type=float, default=20, help='SQL 1本ごとに入れる待ち（MySQL の往復の代わり）')
+    args = parser.parse_args(argv)
+
+    # 同じ処理を比べるため、同期版のキャッシュ・受け付け制御・まとめは切る
+    os.environ['AGGREGATE_FRESH_SECONDS'] = '0'
+    os.environ['AGGREGATE_STALE_SECONDS'] = '0'
+    os.environ['ADMISSION_ENABLED'] = '0'
+    os.environ['SINGLE_FLIGHT_ENABLED'] = '0'
+    os.environ.setdefault('ASYNC_POOL_SIZE', str(args.concurrency))
+    url = local_db.absolute_sqlite_url(args.url)
+    hellowork_url = local_db.absolute_sqlite_url(args.hellowork_url)
+    modules = (
+        local_db.load_app_module('real_data_app', url, hellowork_url),
+        local_db.load_app_module('hellowork_app', url, hellowork_url)
+    )
+    asgi_app = local_db.load_app_module('asgi_app', url, hellowork_url)
+
+    print(f'requests={args.requests} concurrency={args.concurrency} threads={args.threads} '
+          f'latency={args.latency_ms}ms pool={os.environ["ASYNC_POOL_SIZE"]}')
+    print(f'{"mode":<7}{"requests":>9}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"peak SQL":>12}{"errors":>8}')
+    run_sync(modules, args.requests, args.concurrency, args.threads, StatementLatency(args.latency_ms / 1000))
+    run_async(asgi_app, args.requests, args.concurrency, StatementLatency(args.latency_ms / 1000))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
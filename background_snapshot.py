@@ -0,0 +1,106 @@
+"""
+バックグラウンドで定期的に作り直すスナップショット
+
+トップページの統計（支店・アカウント数、期間ごとの件数など）のように、毎回計算すると重いが
+数十秒〜数分古くても構わない値を、バックグラウンドスレッドが interval_seconds ごとに
+計算し直して保持する。リクエストは保持している値をそのまま使い、値の古さ（age_seconds）を表示する。
+
+スレッドを使わない設定（enabled=False）では、値がないか interval_seconds より古いときに
+呼び出し元のリクエストで計算し直す。
+"""
+
+import threading
+import time
+from datetime import datetime
+
+
+class BackgroundSnapshot:
+    def __init__(self, app, compute, interval_seconds=60, enabled=True, name='background-snapshot'):
+        self.app = app
+        self.compute = compute
+        self.interval_seconds = interval_seconds
+        self.enabled = enabled
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._value = None
+        self._computed_at = None
+        self._computed_monotonic = 0.0
+        self._thread = None
+        self._stopped = threading.Event()
+        self.last_error = None
+
+    # ------------------------
+    # 更新スレッド
+    # ------------------------
+
+    def start(self):
+        """更新スレッドを起動（起動済み・無効なら何もしない）"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                with self.app.app_context():
+                    self.refresh()
+            except Exception as e:
+                # 前回の値を使い続ける（次の周期で再計算）
+                print(f'{self.name} の更新に失敗しました: {e}')
+            self._stopped.wait(self.interval_seconds)
+
+    # ------------------------
+    # 値の取得
+    # ------------------------
+
+    def refresh(self):
+        """値を計算し直して保持する（アプリケーションコンテキスト内で呼ぶ）"""
+        with self._refresh_lock:
+            try:
+                value = self.compute()
+            except Exception as e:
+                self.last_error = f'{type(e).__name__}: {e}'
+                raise
+            with self._lock:
+                self._value = value
+                self._computed_at = datetime.now()
+                self._computed_monotonic = time.monotonic()
+                self.last_error = None
+        return value
+
+    def age_seconds(self):
+        if self._computed_at is None:
+            return None
+        return time.monotonic() - self._computed_monotonic
+
+    def get(self):
+        """
+        (値, 計算した日時, 経過秒数) を返す
+
+        値がまだなければ（起動直後）、またはスレッドなしで古くなっていれば、その場で計算する。
+        """
+        self.start()
+        age = self.age_seconds()
+        running = self._thread is not None and self._thread.is_alive()
+        if age is None or (not running and age >= self.interval_seconds):
+            self.refresh()
+        with self._lock:
+            return self._value, self._computed_at, time.monotonic() - self._computed_monotonic
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self._computed_at = None
+            self._computed_monotonic = 0.0
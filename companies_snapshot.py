@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+companies の列指向（Parquet）スナップショット
+
+分析用の集計を本番の companies テーブルに直接投げると、アプリのクエリと競合する。
+companies を作成日でパーティション分割した Parquet に書き出し、2回目以降は
+updated_at のウォーターマーク以降に変更された行だけを追記する。
+分析やレポート関数は read_companies / counts_by_period などで MySQL の代わりに参照する。
+
+レイアウト:
+    <root>/created_date=YYYY-MM-DD/part-<実行ID>-<バッチ番号>-0.parquet
+    <root>/_watermark.json
+
+同じ id の行は更新のたびに追記されるため、読み込み時に updated_at（同時刻なら
+後の実行）が最新のものだけを残す。削除された行はウォーターマークでは検出できないので、
+定期的に --full で作り直すか compact でまとめ直す。
+
+使い方:
+    # 差分エクスポート（初回は全件）
+    python companies_snapshot.py export --root snapshots/companies
+
+    # パーティションごとに最新版だけを1ファイルにまとめ直す
+    python companies_snapshot.py compact --root snapshots/companies
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from sqlalchemy import Date, DateTime, Integer, and_, or_, select, tuple_
+
+# 既定で書き出さない重いテキスト列
+DEFAULT_EXCLUDE = ('job_detail',)
+
+WATERMARK_FILE = '_watermark.json'
+PARTITION_COLUMN = 'created_date'
+RUN_COLUMN = 'snapshot_run'
+
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.date32())]), flavor='hive')
+
+
+def arrow_type(column_type):
+    """SQLAlchemy の型を Arrow の型に変換"""
+    if isinstance(column_type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(column_type, Date):
+        return pa.date32()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    return pa.string()
+
+
+def snapshot_columns(table, exclude=DEFAULT_EXCLUDE):
+    return [column for column in table.columns if column.name not in set(exclude)]
+
+
+def snapshot_schema(columns):
+    return pa.schema(
+        [(column.name, arrow_type(column.type)) for column in columns]
+        + [(RUN_COLUMN, pa.int64()), (PARTITION_COLUMN, pa.date32())]
+    )
+
+
+# ========================
+# ウォーターマーク
+# ========================
+
+def _read_state(root):
+    try:
+        with open(os.path.join(root, WATERMARK_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def read_watermark(root):
+    """前回エクスポートした updated_at の最大値（未エクスポートなら None）"""
+    state = _read_state(root)
+    return datetime.fromisoformat(state['updated_at']) if state.get('updated_at') else None
+
+
+def read_exported_at(root):
+    """前回エクスポートした時刻（未エクスポートなら None）"""
+    state = _read_state(root)
+    return datetime.fromisoformat(state['exported_at']) if state.get('exported_at') else None
+
+
+def write_watermark(root, updated_at, rows):
+    path = os.path.join(root, WATERMARK_FILE)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'updated_at': updated_at.isoformat() if updated_at else None,
+            'exported_rows': rows,
+            'exported_at': datetime.now().isoformat(timespec='seconds')
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+# ========================
+# エクスポート
+# ========================
+
+def export(engine, table, root, full=False, exclude=DEFAULT_EXCLUDE, overlap_seconds=60, batch_size=50000):
+    """
+    companies を Parquet に書き出す（差分）
+
+    ウォーターマークから overlap_seconds 戻った時刻以降に更新された行を
+    (updated_at, id) のキーセットページングで読み出す。遅れてコミットされた行を
+    取りこぼさないための重複は、読み込み時に除かれる。
+    戻り値: 書き出した行数
+    """
+    if full and os.path.isdir(root):
+        shutil.rmtree(root)
+    os.makedirs(root, exist_ok=True)
+
+    columns = snapshot_columns(table, exclude)
+    schema = snapshot_schema(columns)
+    names = [column.name for column in columns]
+    updated_at = table.c.updated_at
+    watermark = read_watermark(root)
+    run_id = int(time.time() * 1000)
+
+    base = select(*columns).order_by(updated_at, table.c.id).limit(batch_size)
+    if watermark is not None:
+        base = base.where(updated_at >= watermark - timedelta(seconds=overlap_seconds))
+
+    exported = 0
+    new_watermark = watermark
+    cursor = None
+    batch_no = 0
+    with engine.connect() as conn:
+        while True:
+            query = base
+            if cursor is not None:
+                # NULL は先頭に並ぶ（MySQL / SQLite）ため、NULL の次からは値のある行へ進む
+                if cursor[0] is None:
+                    query = query.where(or_(
+                        and_(updated_at.is_(None), table.c.id > cursor[1]),
+                        updated_at.isnot(None)
+                    ))
+                else:
+                    query = query.where(tuple_(updated_at, table.c.id) > tuple_(*cursor))
+            rows = conn.execute(query).fetchall()
+            if not rows:
+                break
+
+            frame = pd.DataFrame.from_records(rows, columns=names)
+            frame[RUN_COLUMN] = run_id
+            frame[PARTITION_COLUMN] = pd.to_datetime(frame['created_at']).dt.date
+            ds.write_dataset(
+                pa.Table.from_pandas(frame, schema=schema, preserve_index=False),
+                root,
+                format='parquet',
+                partitioning=PARTITIONING,
+                basename_template=f'part-{run_id}-{batch_no}-{{i}}.parquet',
+                existing_data_behavior='overwrite_or_ignore'
+            )
+            batch_no += 1
+            exported += len(rows)
+
+            last = rows[-1]
+            cursor = (last.updated_at, last.id)
+            if last.updated_at is not None and (new_watermark is None or last.updated_at > new_watermark):
+                new_watermark = last.updated_at
+
+    write_watermark(root, new_watermark, exported)
+    return exported
+
+
+def compact(root):
+    """各パーティションを最新版の行だけの1ファイルにまとめ直す"""
+    frame = read_companies(root)
+    if frame.empty:
+        return 0
+    staging = f'{root}.compact-{os.getpid()}'
+    frame[RUN_COLUMN] = int(time.time() * 1000)
+    frame[PARTITION_COLUMN] = pd.to_datetime(frame['created_at']).dt.date
+    ds.write_dataset(
+        pa.Table.from_pandas(frame, preserve_index=False),
+        staging,
+        format='parquet',
+        partitioning=PARTITIONING,
+        basename_template='part-compact-{i}.parquet'
+    )
+    shutil.copy(os.path.join(root, WATERMARK_FILE), os.path.join(staging, WATERMARK_FILE))
+    backup = f'{root}.old-{os.getpid()}'
+    os.replace(root, backup)
+    os.replace(staging, root)
+    shutil.rmtree(backup)
+    return len(frame)
+
+
+# ========================
+# 読み込み
+# ========================
+
+def read_companies(root, columns=None, created_start=None, created_end=None):
+    """
+    スナップショットから各 id の最新版の行を DataFrame で読み込む
+
+    created_start / created_end を指定すると作成日パーティションで絞り込む。
+    """
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f'スナップショットがありません: {root}')
+    dataset = ds.dataset(root, format='parquet', partitioning=PARTITIONING, exclude_invalid_files=True)
+
+    condition = None
+    if created_start is not None:
+        condition = ds.field(PARTITION_COLUMN) >= created_start
+    if created_end is not None:
+        upper = ds.field(PARTITION_COLUMN) <= created_end
+        condition = upper if condition is None else condition & upper
+
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys(['id', 'updated_at', RUN_COLUMN] + list(columns)))
+    frame = dataset.to_table(columns=read_columns, filter=condition).to_pandas()
+    if frame.empty:
+        return frame.drop(columns=[RUN_COLUMN], errors='ignore')
+
+    frame = frame.sort_values(['updated_at', RUN_COLUMN], kind='stable', na_position='first')
+    frame = frame.drop_duplicates('id', keep='last').sort_values('id').reset_index(drop=True)
+    frame = frame.drop(columns=[RUN_COLUMN])
+    if columns is not None:
+        frame = frame[list(columns)]
+    return frame
+
+
+def _in_period(series, start, end):
+    if start is None:
+        return pd.Series(True, index=series.index)
+    days = pd.to_datetime(series).dt.normalize()
+    return days.between(pd.Timestamp(start), pd.Timestamp(end))
+
+
+def _key(value):
+    return None if pd.isna(value) else int(value)
+
+
+def counts_by_period(frame, start, end):
+    """
+    get_companies_counts_by_period と同じ形式で返す
+    {(支店ID, アカウントID): {'new_count': n, 'update_count': n}}
+    """
+    counts = {}
+    for result, column, key in ((2, 'created_at', 'new_count'), (1, 'updated_at', 'update_count')):
+        rows = frame[(frame['fm_import_result'] == result) & _in_period(frame[column], start, end)]
+        grouped = rows.groupby(['fm_area_id', 'imported_fm_account_id'], dropna=False).size()
+        for (area_id, account_id), count in grouped.items():
+            counts.setdefault(
+                (_key(area_id), _key(account_id)), {'new_count': 0, 'update_count': 0}
+            )[key] = int(count)
+    return counts
+
+
+def unassigned_counts_by_area(frame, start, end):
+    """get_unassigned_counts_by_area と同じ形式で返す {支店ID: 件数}"""
+    account = frame['imported_fm_account_id']
+    rows = frame[
+        (account.isna() | (account == 0))
+        & (frame['fm_import_result'] == 0)
+        & _in_period(frame['created_at'], start, end)
+    ]
+    return {_key(area_id): int(count) for area_id, count in rows.groupby('fm_area_id', dropna=False).size().items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='companies の Parquet スナップショット')
+    parser.add_argument('--root', default=os.getenv('COMPANIES_SNAPSHOT_DIR') or 'snapshots/companies')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    exp = sub.add_parser('export', help='前回のウォーターマーク以降の変更を書き出す')
+    exp.add_argument('--full', action='store_true', help='作り直して全件書き出す')
+    exp.add_argument('--include-job-detail', action='store_true', help='job_detail も書き出す')
+    exp.add_argument('--overlap', type=int, default=60, help='ウォーターマークから戻って読み直す秒数')
+    sub.add_parser('compact', help='パーティションを最新版だけにまとめ直す')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        import real_data_app as m
+
+        started = time.perf_counter()
+        with m.app.app_context():
+            engine = m.db.engine
+        rows = export(
+            engine, m.Company.__table__, args.root, full=args.full,
+            exclude=() if args.include_job_detail else DEFAULT_EXCLUDE, overlap_seconds=args.overlap
+        )
+        print(f'{rows:,}行を書き出しました（{time.perf_counter() - started:.1f}秒）: {args.root}')
+        return 0
+
+    if args.command == 'compact':
+        rows = compact(args.root)
+        print(f'{rows:,}行にまとめ直しました: {args.root}')
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
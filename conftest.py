@@ -0,0 +1,98 @@
+"""
+pytest 共通設定: アプリをローカルSQLiteで動かす
+
+アプリは読み込み時に DATABASE_URL から接続先を決めるため、ここで
+セッション用の一時SQLiteファイルを指すように差し替える（.env より優先）。
+実DBに接続する既存の確認スクリプト（test_real_data.py など）は
+pytest ではなく `python test_real_data.py` のように直接実行すること。
+"""
+
+import importlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+import local_db
+
+_TEST_DB_DIR = tempfile.mkdtemp(prefix='saleslist-test-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_TEST_DB_DIR, 'sales_list.db')}"
+os.environ['HELLOWORK_DATABASE_URL'] = f"sqlite:///{os.path.join(_TEST_DB_DIR, 'hellowork.db')}"
+os.environ.setdefault('SLOW_QUERY_LOG_PATH', os.path.join(_TEST_DB_DIR, 'slow_query.log'))
+# トップページの統計はスレッドで更新せず、リクエストのたびに計算する（データを入れ直すテストのため）
+os.environ['DASHBOARD_REFRESHER_ENABLED'] = '0'
+os.environ['DASHBOARD_REFRESH_SECONDS'] = '0'
+# 条件付き GET のフィンガープリント・受け付け制御のマッピング数も使い回さない
+os.environ['FINGERPRINT_SECONDS'] = '0'
+os.environ['ADMISSION_MAPPING_SECONDS'] = '0'
+# 画面用の期間集計も使い回さず、毎回その場で計算する
+os.environ['AGGREGATE_FRESH_SECONDS'] = '0'
+os.environ['AGGREGATE_STALE_SECONDS'] = '0'
+
+
+# ========================
+# 発行SQLの計測
+# ========================
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def count_statements(engine):
+    """ブロック内でエンジンに発行されたSQLを記録する"""
+    counter = StatementCounter()
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', _before_cursor_execute)
+
+
+# ========================
+# テストデータ投入
+# ========================
+
+def _engine_of(module_name):
+    module = importlib.import_module(module_name)
+    with module.app.app_context():
+        return module.db.engine
+
+
+def seed_sales_list(areas=2, accounts_per_area=2, companies_per_account=3):
+    """sales_list 相当のテーブルを作り直してデータを投入（real_data_app / excel_only_app 共用）"""
+    local_db.seed_sales_list(
+        _engine_of('real_data_app'), areas=areas, accounts_per_area=accounts_per_area,
+        companies_per_account=companies_per_account
+    )
+
+
+def seed_hellowork(areas=2, accounts_per_area=2, rows_per_account=3):
+    """hellowork_app のテーブルを作り直してデータを投入"""
+    local_db.seed_hellowork(
+        _engine_of('hellowork_app'), areas=areas, accounts_per_area=accounts_per_area,
+        rows_per_account=rows_per_account
+    )
+
+
+@pytest.fixture
+def sales_list_db():
+    seed_sales_list()
+    return seed_sales_list
+
+
+@pytest.fixture
+def hellowork_db():
+    seed_hellowork()
+    return seed_hellowork
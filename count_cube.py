@@ -0,0 +1,288 @@
+"""
+NumPy による件数キューブ（日 × 支店 × アカウント × 取込結果）
+
+日別集計から密な配列を作り、日方向の累積和（prefix sum）を持っておくことで、
+今日・1週間・1ヶ月・1年・任意期間のどの窓も DB にアクセスせず
+O(支店数 × アカウント数) で答えられるようにする。
+
+日付の軸は集計の定義に合わせている:
+    新規（fm_import_result = 2）と振り分けなし（0）は created_at の日付
+    更新（fm_import_result = 1）は updated_at の日付
+アカウント軸の先頭（インデックス 0）は imported_fm_account_id が NULL / 0 の「未設定」。
+"""
+
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func
+
+import db_dialect
+
+# 取込結果の軸（インデックス = fm_import_result）
+RESULT_UNASSIGNED = 0
+RESULT_UPDATE = 1
+RESULT_NEW = 2
+RESULTS = (RESULT_UNASSIGNED, RESULT_UPDATE, RESULT_NEW)
+
+UNASSIGNED_ACCOUNT = 0
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+class CountCube:
+    """件数の密な配列と、日方向の累積和"""
+
+    def __init__(self, start_day, area_ids, account_ids, counts, history_complete=True, cumulative=None):
+        self.start_day = start_day
+        self.area_ids = list(area_ids)
+        self.account_ids = list(account_ids)
+        self.area_index = {area_id: i for i, area_id in enumerate(self.area_ids)}
+        self.account_index = {account_id: i for i, account_id in enumerate(self.account_ids)}
+        # counts[日, 支店, アカウント, 取込結果]（スナップショットから開いた読み取り専用のキューブでは None）
+        self.counts = counts
+        # cumulative[d] = start_day から d 日分の合計（cumulative[0] は 0）
+        if cumulative is None:
+            cumulative = np.zeros((counts.shape[0] + 1,) + counts.shape[1:], dtype=np.int64)
+            np.cumsum(counts, axis=0, out=cumulative[1:])
+        self.cumulative = cumulative
+        # start_day より前にデータがない（全期間を読み込んだ）かどうか
+        self.history_complete = history_complete
+        self.loaded_at = time.time()
+        self.refreshed_at = self.loaded_at
+
+    @property
+    def days(self):
+        return self.cumulative.shape[0] - 1
+
+    @property
+    def end_day(self):
+        return self.start_day + timedelta(days=self.days - 1)
+
+    # ------------------------
+    # 読み込み
+    # ------------------------
+
+    @classmethod
+    def from_rows(cls, rows, start_day=None, end_day=None, history_complete=True):
+        """(日付, 支店ID, アカウントID, 取込結果, 件数) の行からキューブを作る"""
+        rows = [(_as_date(day), area_id, account_id or UNASSIGNED_ACCOUNT, result, count)
+                for day, area_id, account_id, result, count in rows
+                if day is not None and result in RESULTS]
+        days = [row[0] for row in rows]
+        start_day = start_day or (min(days) if days else date.today())
+        end_day = end_day or max(days + [date.today()])
+        if end_day < start_day:
+            end_day = start_day
+
+        area_ids = sorted({row[1] for row in rows})
+        account_ids = [UNASSIGNED_ACCOUNT] + sorted({row[2] for row in rows} - {UNASSIGNED_ACCOUNT})
+
+        counts = np.zeros(
+            ((end_day - start_day).days + 1, len(area_ids), len(account_ids), len(RESULTS)),
+            dtype=np.int64
+        )
+        area_index = {area_id: i for i, area_id in enumerate(area_ids)}
+        account_index = {account_id: i for i, account_id in enumerate(account_ids)}
+        for day, area_id, account_id, result, count in rows:
+            offset = (day - start_day).days
+            if 0 <= offset < counts.shape[0]:
+                counts[offset, area_index[area_id], account_index[account_id], result] += count
+
+        return cls(start_day, area_ids, account_ids, counts, history_complete=history_complete)
+
+    @classmethod
+    def load(cls, session, Company, since=None):
+        """companies の日別集計からキューブを作る（since を省略すると全期間）"""
+        rows = daily_aggregate(session, Company, since=since)
+        return cls.from_rows(rows, start_day=since, history_complete=since is None)
+
+    def refresh_day(self, session, Company, day=None):
+        """指定日（既定: 今日）の集計だけを読み直し、累積和を差分で更新する"""
+        day = day or date.today()
+        if self.counts is None:
+            raise ValueError('読み取り専用のキューブは更新できません')
+        rows = daily_aggregate(session, Company, since=day, until=day)
+        self._ensure_day(day)
+        self._ensure_ids(rows)
+
+        offset = (day - self.start_day).days
+        if offset < 0:
+            return
+        fresh = np.zeros(self.counts.shape[1:], dtype=np.int64)
+        for _, area_id, account_id, result, count in rows:
+            if result in RESULTS:
+                fresh[self.area_index[area_id], self.account_index[account_id or UNASSIGNED_ACCOUNT], result] += count
+
+        delta = fresh - self.counts[offset]
+        self.counts[offset] = fresh
+        self.cumulative[offset + 1:] += delta
+        self.refreshed_at = time.time()
+
+    def _ensure_day(self, day):
+        """キューブの末尾が day に届いていなければ日を追加する"""
+        missing = (day - self.end_day).days
+        if missing <= 0:
+            return
+        self.counts = np.concatenate(
+            [self.counts, np.zeros((missing,) + self.counts.shape[1:], dtype=self.counts.dtype)]
+        )
+        self.cumulative = np.concatenate(
+            [self.cumulative, np.repeat(self.cumulative[-1:], missing, axis=0)]
+        )
+
+    def _ensure_ids(self, rows):
+        """新しい支店・アカウントが現れたら軸を広げる"""
+        new_areas = sorted({row[1] for row in rows} - set(self.area_index))
+        new_accounts = sorted({row[2] or UNASSIGNED_ACCOUNT for row in rows} - set(self.account_index))
+        if not new_areas and not new_accounts:
+            return
+        pad = ((0, 0), (0, len(new_areas)), (0, len(new_accounts)), (0, 0))
+        self.counts = np.pad(self.counts, pad)
+        self.cumulative = np.pad(self.cumulative, pad)
+        for area_id in new_areas:
+            self.area_index[area_id] = len(self.area_ids)
+            self.area_ids.append(area_id)
+        for account_id in new_accounts:
+            self.account_index[account_id] = len(self.account_ids)
+            self.account_ids.append(account_id)
+
+    # ------------------------
+    # 期間の集計
+    # ------------------------
+
+    def covers(self, start, end):
+        """期間 [start, end] をキューブだけで答えられるか（None は期間制限なし）"""
+        # 末尾より後の日は window() で切り詰められ、0件に見えてしまうため答えない
+        # （未来の日はまだ件数がないので今日までで見る）
+        last_day = date.today() if end is None else min(end, date.today())
+        if last_day > self.end_day:
+            return False
+        if start is None:
+            return self.history_complete
+        return self.history_complete or start >= self.start_day
+
+    def window(self, start, end):
+        """期間 [start, end] の合計を [支店, アカウント, 取込結果] の配列で返す"""
+        lo = 0 if start is None else min(max((start - self.start_day).days, 0), self.days)
+        hi = self.days if end is None else min(max((end - self.start_day).days + 1, 0), self.days)
+        if hi <= lo:
+            return np.zeros(self.cumulative.shape[1:], dtype=np.int64)
+        return self.cumulative[hi] - self.cumulative[lo]
+
+    def account_counts(self, start, end):
+        """
+        get_companies_counts_by_period と同じ形式で返す
+        {(支店ID, アカウントID): {'new_count': n, 'update_count': n}}
+        """
+        totals = self.window(start, end)
+        counts = {}
+        area_idx, account_idx = np.nonzero(totals[:, :, RESULT_NEW] + totals[:, :, RESULT_UPDATE])
+        for a, c in zip(area_idx.tolist(), account_idx.tolist()):
+            counts[(self.area_ids[a], self.account_ids[c])] = {
+                'new_count': int(totals[a, c, RESULT_NEW]),
+                'update_count': int(totals[a, c, RESULT_UPDATE])
+            }
+        return counts
+
+    def pair_counts(self, area_id, account_id, start, end):
+        """1つの (支店, アカウント) の新規・更新件数"""
+        a = self.area_index.get(area_id)
+        c = self.account_index.get(account_id or UNASSIGNED_ACCOUNT)
+        if a is None or c is None:
+            return {'new_count': 0, 'update_count': 0}
+        totals = self.window(start, end)
+        return {
+            'new_count': int(totals[a, c, RESULT_NEW]),
+            'update_count': int(totals[a, c, RESULT_UPDATE])
+        }
+
+    def unassigned_counts(self, start, end):
+        """get_unassigned_counts_by_area と同じ形式で返す {支店ID: 件数}"""
+        totals = self.window(start, end)[:, self.account_index[UNASSIGNED_ACCOUNT], RESULT_UNASSIGNED]
+        return {self.area_ids[a]: int(totals[a]) for a in np.nonzero(totals)[0].tolist()}
+
+
+def daily_aggregate(session, Company, since=None, until=None):
+    """
+    日別集計 (日付, 支店ID, アカウントID, 取込結果, 件数) を取得
+
+    新規・振り分けなしは created_at、更新は updated_at の日付で集計する。
+    期間の絞り込みは日時カラムの範囲条件で行い、インデックスを使えるようにする。
+    """
+    def _range(column):
+        conditions = []
+        if since is not None:
+            conditions.append(column >= datetime.combine(since, datetime.min.time()))
+        if until is not None:
+            conditions.append(column < datetime.combine(until + timedelta(days=1), datetime.min.time()))
+        return conditions
+
+    def _query(column, results):
+        day = db_dialect.date_of(column)
+        return session.query(
+            day,
+            Company.fm_area_id,
+            Company.imported_fm_account_id,
+            Company.fm_import_result,
+            func.count(Company.id)
+        ).filter(
+            Company.fm_import_result.in_(results),
+            *_range(column)
+        ).group_by(
+            day,
+            Company.fm_area_id,
+            Company.imported_fm_account_id,
+            Company.fm_import_result
+        ).all()
+
+    return (
+        _query(Company.created_at, (RESULT_NEW, RESULT_UNASSIGNED))
+        + _query(Company.updated_at, (RESULT_UPDATE,))
+    )
+
+
+class CountCubeStore:
+    """
+    プロセス内でキューブを1つ保持する
+
+    初回アクセスで読み込み、以降は refresh_seconds ごとに前回の更新日〜今日の分だけを
+    読み直す（日付をまたいでも前日分の取りこぼしがないようにする）。過去日の件数は
+    更新で別の日に移ることがあるため、reload_seconds ごとに全体を読み直す。
+    """
+
+    def __init__(self, Company, refresh_seconds=60, reload_seconds=3600, since_days=None):
+        self.Company = Company
+        self.refresh_seconds = refresh_seconds
+        self.reload_seconds = reload_seconds
+        self.since_days = since_days
+        self.cube = None
+        self._refreshed_day = None
+        self._lock = threading.Lock()
+
+    def get(self, session):
+        with self._lock:
+            now = time.time()
+            today = date.today()
+            if self.cube is None or now - self.cube.loaded_at >= self.reload_seconds:
+                since = today - timedelta(days=self.since_days) if self.since_days else None
+                self.cube = CountCube.load(session, self.Company, since=since)
+                self._refreshed_day = today
+            elif now - self.cube.refreshed_at >= self.refresh_seconds:
+                day = min(self._refreshed_day, today)
+                while day <= today:
+                    self.cube.refresh_day(session, self.Company, day)
+                    day += timedelta(days=1)
+                self._refreshed_day = today
+            return self.cube
+
+    def reset(self):
+        with self._lock:
+            self.cube = None
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+件数キューブのバイナリスナップショット（ワーカー間でメモリを共有）
+
+各ワーカーがそれぞれキューブを読み込むと、読み込み時間とメモリがワーカー数分かかる。
+書き込み側のプロセスが累積和の配列を1つのファイルに書き出し、各ワーカーは
+numpy.memmap で読み取り専用に開く。ページキャッシュを全ワーカーで共有するため、
+起動はほぼ一瞬でメモリも1つ分で済む。
+
+ファイル形式:
+    MAGIC (8バイト) | ヘッダ長 (uint32 LE) | ヘッダ JSON | 64バイト境界まで詰め物 | int64 LE の累積和
+
+新しい版は一時ファイルに書いてから os.replace で差し替える（rename-and-swap）。
+開いている古い版は差し替え後もワーカーが閉じるまで読めるため、読み手がロックを取る必要はない。
+
+使い方:
+    # 60秒ごとに今日分を更新してスナップショットを公開
+    python cube_snapshot.py publish --path snapshots/count_cube.snap --interval 60
+
+    # ワーカー側（real_data_app）
+    COUNT_CUBE_ENABLED=1 COUNT_CUBE_SNAPSHOT_PATH=snapshots/count_cube.snap python real_data_app.py
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from datetime import date
+
+import numpy as np
+
+import count_cube
+
+MAGIC = b'CCUBE\x00\x01\x00'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+DTYPE = '<i8'
+
+
+def read_header(path):
+    """スナップショットのヘッダ（JSON）と、配列データの開始位置を返す"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'件数キューブのスナップショットではありません: {path}')
+        (header_length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    if header.get('format') != FORMAT_VERSION:
+        raise ValueError(f'未対応のスナップショット形式です: {header.get("format")}')
+    offset = len(MAGIC) + 4 + header_length
+    return header, offset + (-offset % ALIGNMENT)
+
+
+def publish(cube, path):
+    """キューブをスナップショットとして書き出し、既存のファイルと原子的に差し替える（新しい版番号を返す）"""
+    try:
+        version = read_header(path)[0]['version'] + 1
+    except (OSError, ValueError):
+        version = 1
+
+    cumulative = np.ascontiguousarray(cube.cumulative, dtype=DTYPE)
+    header = json.dumps({
+        'format': FORMAT_VERSION,
+        'version': version,
+        'built_at': cube.refreshed_at,
+        'start_day': cube.start_day.isoformat(),
+        'area_ids': cube.area_ids,
+        'account_ids': cube.account_ids,
+        'shape': list(cumulative.shape),
+        'dtype': DTYPE,
+        'history_complete': cube.history_complete
+    }, ensure_ascii=False).encode('utf-8')
+    offset = len(MAGIC) + 4 + len(header)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            f.write(b'\0' * (-offset % ALIGNMENT))
+            cumulative.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return version
+
+
+def open_snapshot(path):
+    """スナップショットを読み取り専用の memmap で開き、(キューブ, 版番号) を返す"""
+    header, offset = read_header(path)
+    cumulative = np.memmap(path, dtype=header['dtype'], mode='r', offset=offset, shape=tuple(header['shape']))
+    cube = count_cube.CountCube(
+        date.fromisoformat(header['start_day']),
+        header['area_ids'],
+        header['account_ids'],
+        None,
+        history_complete=header['history_complete'],
+        cumulative=cumulative
+    )
+    cube.loaded_at = cube.refreshed_at = header['built_at']
+    return cube, header['version']
+
+
+class SnapshotReader:
+    """
+    ワーカー側でスナップショットを保持する
+
+    check_seconds ごとにファイルの差し替え（inode・更新時刻の変化）を確認し、
+    新しい版が公開されていれば開き直す。ファイルがなければ None を返す。
+    書き込み側のプロセスが止まると今日の分が増えなくなるため、built_at から
+    max_age_seconds を過ぎたスナップショットも None を返す（None なら年齢を見ない）。
+    """
+
+    def __init__(self, path, check_seconds=1.0, max_age_seconds=None):
+        self.path = path
+        self.check_seconds = check_seconds
+        self.max_age_seconds = max_age_seconds
+        self.cube = None
+        self.version = None
+        self._identity = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            now = time.time()
+            if self.cube is None or now - self._checked_at >= self.check_seconds:
+                self._checked_at = now
+                self._reopen_if_replaced()
+            if self.is_stale(now):
+                return None
+            return self.cube
+
+    def is_stale(self, now=None):
+        """開いているスナップショットが max_age_seconds より古いか"""
+        if self.cube is None or self.max_age_seconds is None:
+            return False
+        return (now or time.time()) - self.cube.refreshed_at > self.max_age_seconds
+
+    def _reopen_if_replaced(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity != self._identity:
+            self.cube, self.version = open_snapshot(self.path)
+            self._identity = identity
+
+
+# ========================
+# 書き込み側プロセス
+# ========================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='件数キューブのスナップショットを公開')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    pub = sub.add_parser('publish', help='DBからキューブを作りスナップショットを公開')
+    pub.add_argument('--path', default=os.getenv('COUNT_CUBE_SNAPSHOT_PATH') or 'snapshots/count_cube.snap')
+    pub.add_argument('--interval', type=float, default=60, help='今日分を更新して公開する間隔（秒）')
+    pub.add_argument('--reload', type=float, default=3600, help='全期間を読み直す間隔（秒）')
+    pub.add_argument('--once', action='store_true', help='1回だけ公開して終了')
+
+    args = parser.parse_args(argv)
+
+    import real_data_app as m
+
+    store = count_cube.CountCubeStore(m.Company, refresh_seconds=0, reload_seconds=args.reload)
+    while True:
+        started = time.perf_counter()
+        with m.app.app_context():
+            cube = store.get(m.db.session)
+            m.db.session.remove()
+        version = publish(cube, args.path)
+        print(f'スナップショット v{version} を公開しました（{time.perf_counter() - started:.2f}秒）: {args.path}')
+        if args.once:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+データベース方言の差異を吸収する薄いレイヤー
+
+アプリは本番の MySQL を前提にしているが、MySQL 固有の文
+（SHOW TABLES LIKE / DESCRIBE / SELECT VERSION()）と日付の切り出しだけを
+ここで方言ごとに切り替えることで、ローカルの SQLite ファイルでも
+アプリ・ベンチマーク・テストをそのまま動かせるようにする。
+"""
+
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import Date, and_, func, inspect, text, type_coerce
+
+
+def connection_of(bind):
+    """Session（scoped_session を含む）なら現在の Connection を、Connection ならそのまま返す"""
+    if hasattr(bind, 'get_bind'):
+        return bind.connection()
+    return bind
+
+
+def dialect_name(bind):
+    """Session / Connection から方言名（'mysql', 'sqlite' など）を取得"""
+    return connection_of(bind).dialect.name
+
+
+def is_mysql(bind):
+    return dialect_name(bind) == 'mysql'
+
+
+def table_exists(bind, table_name):
+    """テーブルが存在するか（MySQL: SHOW TABLES LIKE / SQLite: sqlite_master / その他: インスペクタ）"""
+    connection = connection_of(bind)
+    if is_mysql(connection):
+        return connection.execute(text('SHOW TABLES LIKE :name'), {'name': table_name}).fetchone() is not None
+    if dialect_name(connection) == 'sqlite':
+        # インスペクタの has_table は PRAGMA を複数回発行するため、1回で済む sqlite_master を引く
+        return connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': table_name}
+        ).fetchone() is not None
+    return inspect(connection).has_table(table_name)
+
+
+def describe_table(bind, table_name):
+    """DESCRIBE 相当のカラム情報を [{'Field', 'Type', 'Null', 'Key'}] で返す"""
+    connection = connection_of(bind)
+    if is_mysql(connection):
+        rows = connection.execute(text(f'DESCRIBE `{table_name}`')).fetchall()
+        return [{'Field': row[0], 'Type': row[1], 'Null': row[2], 'Key': row[3]} for row in rows]
+
+    if dialect_name(connection) == 'sqlite':
+        # PRAGMA table_info: cid, name, type, notnull, dflt_value, pk
+        rows = connection.execute(text(f'PRAGMA table_info("{table_name}")')).fetchall()
+        return [
+            {
+                'Field': row[1],
+                'Type': row[2],
+                'Null': 'NO' if row[3] else 'YES',
+                'Key': 'PRI' if row[5] else ''
+            } for row in rows
+        ]
+
+    inspector = inspect(connection)
+    primary_keys = set(inspector.get_pk_constraint(table_name).get('constrained_columns') or [])
+    return [
+        {
+            'Field': col['name'],
+            'Type': str(col['type']),
+            'Null': 'YES' if col.get('nullable', True) else 'NO',
+            'Key': 'PRI' if col['name'] in primary_keys else ''
+        } for col in inspector.get_columns(table_name)
+    ]
+
+
+def server_version(bind):
+    """データベースサーバーのバージョン文字列"""
+    connection = connection_of(bind)
+    if dialect_name(connection) == 'sqlite':
+        return 'SQLite ' + connection.execute(text('SELECT sqlite_version()')).scalar()
+    return connection.execute(text('SELECT VERSION()')).scalar()
+
+
+def date_of(column):
+    """
+    日時カラムを日付単位に切り出す式（日別集計・日付比較用）
+
+    MySQL の DATE() と SQLite の date() はどちらも func.date で書けるが、SQLite は
+    'YYYY-MM-DD' の文字列を返すため、結果を date 型として受け取れるよう型を付ける。
+    """
+    return type_coerce(func.date(column), Date)
+
+
+def day_range(column, start, end):
+    """
+    日時カラムが start〜end（両端の日を含む）に入る条件
+
+    DATE(column) で比較するとインデックスを範囲検索で使えないため、日時の半開区間で比較する。
+    """
+    return and_(
+        column >= datetime.combine(start, time.min),
+        column < datetime.combine(end + timedelta(days=1), time.min)
+    )
@@ -0,0 +1,79 @@
+"""
+死活監視・準備完了確認のエンドポイント
+
+オーケストレーターのヘルスチェックが /api/test（実データの集計を含む）を叩くと、
+チェックだけでDBに負荷がかかる。監視用には軽いエンドポイントを別に用意する。
+
+    /healthz … プロセスが応答できるか（I/O なし）
+    /readyz  … プールから接続を借りて SELECT 1 が通るか（結果を READYZ_CACHE_SECONDS 秒キャッシュ）
+
+集計を含む診断情報は real_data_app の /api/admin/diagnostics（遅い・手動確認用）で見る。
+
+設定（環境変数 または app.config）:
+    READYZ_CACHE_SECONDS   /readyz の結果を使い回す秒数（既定: 5）
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from flask import jsonify
+
+
+class ReadinessCheck:
+    """接続プールからの接続取得と SELECT 1 の結果を一定時間キャッシュする"""
+
+    def __init__(self, engine, cache_seconds=5.0):
+        self.engine = engine
+        self.cache_seconds = cache_seconds
+        self._lock = threading.Lock()
+        self._result = None
+        self._checked_at = 0.0
+
+    def _probe(self):
+        started = time.perf_counter()
+        try:
+            with self.engine.connect() as connection:
+                connection.exec_driver_sql('SELECT 1')
+            error = None
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        return {
+            'ready': error is None,
+            'error': error,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+            'checked_at': datetime.now().isoformat(timespec='seconds')
+        }
+
+    def check(self):
+        """(結果, キャッシュから返したか)。同時に来た確認は1回の SELECT 1 にまとめる"""
+        with self._lock:
+            if self._result is not None and time.monotonic() - self._checked_at < self.cache_seconds:
+                return self._result, True
+            self._result = self._probe()
+            self._checked_at = time.monotonic()
+            return self._result, False
+
+
+def init_app(app, db):
+    """/healthz と /readyz を登録"""
+    app.config.setdefault('READYZ_CACHE_SECONDS', float(os.getenv('READYZ_CACHE_SECONDS', '5')))
+
+    with app.app_context():
+        readiness = ReadinessCheck(db.engine, cache_seconds=app.config['READYZ_CACHE_SECONDS'])
+    app.extensions['readiness'] = readiness
+
+    @app.route('/healthz')
+    def healthz():
+        """プロセスの死活（DBには触れない）"""
+        return jsonify({'status': 'ok'})
+
+    @app.route('/readyz')
+    def readyz():
+        """DBに接続できるか（SELECT 1、結果は数秒キャッシュ）"""
+        result, cached = app.extensions['readiness'].check()
+        body = dict(result, status='ready' if result['ready'] else 'not_ready', cached=cached)
+        return jsonify(body), 200 if result['ready'] else 503
+
+    return readiness
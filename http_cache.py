@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+レスポンスの圧縮と条件付き GET（ETag / If-None-Match）
+
+1. 圧縮
+   JSON・HTML などの本文が COMPRESS_MIN_BYTES 以上なら、Accept-Encoding に合わせて brotli
+   （Brotli パッケージが入っている場合）か gzip で圧縮して返す。Excel のようなファイル送信
+   （direct_passthrough）と、すでに Content-Encoding の付いたもの（/assets/）はそのまま。
+
+2. 条件付き GET
+   支店・アカウント・マッピングのようなマスタや、締まった（終了日が昨日以前の）期間の集計は
+   毎回同じ本文になる。データのフィンガープリント（マスタ行のハッシュ、companies の最大ID・
+   最終更新日時など）から強い ETag を作り、If-None-Match が一致すれば集計クエリを実行せずに
+   304 を返す。フィンガープリントは FINGERPRINT_SECONDS 秒キャッシュするので、その間は
+   条件付きリクエストでクエリを1本も発行しない（変更の反映は最大でその秒数遅れる）。
+
+   圧縮した本文の ETag には -gzip / -br を付けて区別し（強い ETag は本文のバイト列ごとに
+   異なる必要がある）、If-None-Match の比較ではこの接尾辞を外して比べる。
+
+設定（環境変数 または app.config）:
+    COMPRESS_MIN_BYTES    これ未満の本文は圧縮しない（既定: 1024）
+    COMPRESS_LEVEL        gzip の圧縮レベル（既定: 6。brotli は品質 5 固定）
+    FINGERPRINT_SECONDS   データのフィンガープリントを使い回す秒数（既定: 30）
+"""
+
+import functools
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+from flask import current_app, make_response, request
+
+try:
+    import brotli
+except ImportError:  # Brotli が入っていない環境では gzip だけを使う
+    brotli = None
+
+# 圧縮する Content-Type
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'application/vnd.saleslist.columnar+json',
+    'text/html', 'text/plain', 'text/css', 'application/javascript', 'text/javascript'
+)
+
+# Accept-Encoding で選ぶ順（先にあるものを優先）
+ENCODINGS = ('br', 'gzip')
+BROTLI_QUALITY = 5
+
+
+# ========================
+# 圧縮
+# ========================
+
+def _compress(data, encoding, level):
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=level)
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def _choose_encoding(accept_encodings):
+    for encoding in ENCODINGS:
+        if encoding == 'br' and brotli is None:
+            continue
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress_response(response):
+    """after_request で呼ぶ。条件を満たすレスポンスの本文を圧縮する"""
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+        or 'no-transform' in response.headers.get('Cache-Control', '')
+    ):
+        return response
+    encoding = _choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < current_app.config['COMPRESS_MIN_BYTES']:
+        return response
+
+    response.set_data(_compress(data, encoding, current_app.config['COMPRESS_LEVEL']))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak=weak)
+    return response
+
+
+# ========================
+# データのフィンガープリントと ETag
+# ========================
+
+class DataFingerprint:
+    """データの変化を表す値を一定時間キャッシュする（同時に来た要求は1回の計算にまとめる）"""
+
+    def __init__(self, compute, ttl_seconds=30.0):
+        self.compute = compute
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._value = None
+        self._computed_at = 0.0
+
+    def current(self):
+        """フィンガープリント（16進文字列）。アプリケーションコンテキスト内で呼ぶ"""
+        with self._lock:
+            if self._value is None or time.monotonic() - self._computed_at >= self.ttl_seconds:
+                self._value = hashlib.sha256(repr(self.compute()).encode('utf-8')).hexdigest()
+                self._computed_at = time.monotonic()
+            return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+
+
+def request_key():
+    """同じ本文になるリクエストかを区別する値（メソッド・パス・クエリ・Accept・POST の本文）"""
+    return (
+        request.method, request.full_path,
+        request.headers.get('Accept', ''), request.get_data(as_text=True)
+    )
+
+
+def make_etag(fingerprints, key):
+    source = '|'.join(fingerprint.current() for fingerprint in fingerprints) + repr(key)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:32]
+
+
+def _if_none_match_contains(etag):
+    """If-None-Match に一致する ETag があれば（圧縮の接尾辞を外して比べる）その値を返す"""
+    if request.if_none_match.star_tag:
+        return etag
+    for tag in request.if_none_match.as_set():
+        if tag.split('-', 1)[0] == etag:
+            return tag
+    return None
+
+
+def conditional(*fingerprints, when=None):
+    """
+    データのフィンガープリントから強い ETag を付け、If-None-Match が一致すれば
+    ビュー関数を呼ばずに 304 を返すデコレータ
+
+    fingerprints: DataFingerprint（複数なら全部を組み合わせる）
+    when: ETag を付けるリクエストか（None なら常に）。締まった期間だけ、のような絞り込みに使う
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if when is not None and not when():
+                return view(*args, **kwargs)
+            etag = make_etag(fingerprints, request_key())
+            matched = _if_none_match_contains(etag)
+            if matched is not None:
+                response = current_app.response_class(status=304)
+                response.set_etag(matched)
+            else:
+                response = make_response(view(*args, **kwargs))
+                # タイムアウトで返した前回の値（X-Stale）は今のデータの ETag で覚えさせない
+                if response.status_code != 200 or 'X-Stale' in response.headers:
+                    return response
+                response.set_etag(etag)
+            # ブラウザにも毎回 If-None-Match で確認させる
+            response.headers['Cache-Control'] = 'no-cache'
+            response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
+
+
+def init_app(app):
+    """レスポンス圧縮を登録"""
+    app.config.setdefault('COMPRESS_MIN_BYTES', int(os.getenv('COMPRESS_MIN_BYTES', '1024')))
+    app.config.setdefault('COMPRESS_LEVEL', int(os.getenv('COMPRESS_LEVEL', '6')))
+    app.config.setdefault('FINGERPRINT_SECONDS', float(os.getenv('FINGERPRINT_SECONDS', '30')))
+    app.after_request(compress_response)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+/api/* のレスポンスのシリアライズ形式の比較
+
+各ルートを1回実行してレスポンスの中身を取り出し、書き出しだけを繰り返して
+形式ごとのサイズ（そのまま / gzip）と書き出し時間を比べる。
+
+    json              Flask の既定（標準ライブラリ json、ensure_ascii・sort_keys）
+    orjson            json_formats.FastJSONProvider（orjson が入っている場合のみ）
+    json columnar     列形式（Accept: application/vnd.saleslist.columnar+json）を標準ライブラリで
+    orjson columnar   列形式を orjson で
+
+使い方:
+    python local_db.py seed --companies 100000
+    python json_benchmark.py --repeat 200
+"""
+
+import argparse
+import gzip
+import json
+import statistics
+import sys
+import time
+from datetime import date
+
+import json_formats
+import local_db
+
+ROUTES = [
+    ('real_data_app', 'GET', '/api/mapping', {}),
+    ('real_data_app', 'POST', '/api/filtered-data', {'json': {'date_filter': 'all'}}),
+    ('real_data_app', 'POST', '/api/date-range-data', {'json': {'start_date': '2000-01-01', 'end_date': str(date.today())}}),
+    ('hellowork_app', 'GET', '/api/daily-report', {}),
+]
+
+
+def stdlib_dumps(obj):
+    """Flask の既定プロバイダと同じ書き出し（本番の compact 出力）"""
+    return json.dumps(obj, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def encoders(app):
+    result = [('json', stdlib_dumps)]
+    if json_formats.orjson is not None:
+        provider = json_formats.FastJSONProvider(app)
+        result.append(('orjson', provider._orjson_dumps))
+    return result
+
+
+def time_encode(encode, payload, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode(payload)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='/api/* のシリアライズ形式を比較')
+    parser.add_argument('--url', default=local_db.DEFAULT_URL, help='sales_list 用のDB URL')
+    parser.add_argument('--hellowork-url', default=local_db.DEFAULT_HELLOWORK_URL, help='ハローワーク用のDB URL')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args(argv)
+    url = local_db.absolute_sqlite_url(args.url)
+    hellowork_url = local_db.absolute_sqlite_url(args.hellowork_url)
+
+    if json_formats.orjson is None:
+        print('orjson が入っていないため json のみ比較します（pip install orjson）')
+    print(f'{"route":<24}{"format":<18}{"bytes":>10}{"gzip":>9}{"encode ms":>11}')
+    for module_name, method, path, kwargs in ROUTES:
+        module = local_db.load_app_module(module_name, url, hellowork_url)
+        response = module.app.test_client().open(path, method=method, **kwargs)
+        payload = response.get_json()
+        if response.status_code != 200 or payload.get('status') != 'success':
+            print(f'{path}: 取得に失敗しました ({response.status_code})')
+            continue
+        columnar = dict(json_formats.to_columnar(payload), format='columnar')
+        for name, encode in encoders(module.app):
+            for label, obj in ((name, payload), (f'{name} columnar', columnar)):
+                encode_ms, body = time_encode(encode, obj, args.repeat)
+                print(f'{path:<24}{label:<18}{len(body):>10,}{len(gzip.compress(body)):>9,}{encode_ms:>11.3f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
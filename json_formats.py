@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+/api/* の JSON シリアライズ
+
+1. 高速な JSON プロバイダ
+   orjson が入っていれば Flask の既定（標準ライブラリ json）の代わりに orjson で直接 bytes に
+   書き出す。入っていなければ既定のプロバイダと同じ動き。日付・Decimal などの扱いは既定と同じ。
+
+2. 列形式（columnar）のレスポンス
+   支店・アカウントごとの件数のように、同じキーを持つ dict の配列が続くレスポンスは、キー名が
+   行数分繰り返される。Accept: application/vnd.saleslist.columnar+json を送ってきたクライアントには
+   dict の配列を「キーごとの値の配列」に組み替えて返す（入れ子の配列も同様）。
+
+       [{"id": 1, "name": "札幌"}, {"id": 2, "name": "仙台"}]
+       -> {"id": [1, 2], "name": ["札幌", "仙台"]}
+
+   Accept がなければ（ブラウザの fetch の既定 */* も）通常の JSON を返す。
+
+設定（環境変数 または app.config）:
+    JSON_PROVIDER   orjson / default（既定: orjson が入っていれば orjson）
+
+比較:
+    python json_benchmark.py
+"""
+
+import os
+
+from flask import jsonify, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson が入っていない環境では標準ライブラリ json で書き出す
+    orjson = None
+
+JSON_MIMETYPE = 'application/json'
+COLUMNAR_MIMETYPE = 'application/vnd.saleslist.columnar+json'
+
+
+# ========================
+# 高速な JSON プロバイダ
+# ========================
+
+class FastJSONProvider(DefaultJSONProvider):
+    """orjson で書き出す JSON プロバイダ（orjson がなければ既定のプロバイダと同じ）"""
+
+    def _orjson_dumps(self, obj, indent=False):
+        # 日付は既定のプロバイダと同じ形式（HTTP 日付）にするため default に回す
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.get('cls') is not None:
+            return super().dumps(obj, **kwargs)
+        return self._orjson_dumps(obj, indent=kwargs.get('indent')).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._orjson_dumps(obj, indent=indent) + b'\n', mimetype=self.mimetype)
+
+
+def init_app(app):
+    """JSON_PROVIDER の設定に合わせて app.json を差し替える"""
+    app.config.setdefault('JSON_PROVIDER', os.getenv('JSON_PROVIDER', 'orjson'))
+    if app.config['JSON_PROVIDER'] == 'orjson':
+        app.json = FastJSONProvider(app)
+
+
+# ========================
+# 列形式（columnar）のレスポンス
+# ========================
+
+def to_columnar(value):
+    """dict の配列をキーごとの配列に組み替える（入れ子の dict・配列にも適用）"""
+    if isinstance(value, dict):
+        return {key: to_columnar(item) for key, item in value.items()}
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        keys = []
+        for item in value:
+            keys.extend(key for key in item if key not in keys)
+        return {key: [to_columnar(item.get(key)) for item in value] for key in keys}
+    if isinstance(value, list):
+        return [to_columnar(item) for item in value]
+    return value
+
+
+def from_columnar(columns):
+    """to_columnar で組み替えた1つの配列を dict の配列に戻す（入れ子は戻さない）"""
+    keys = list(columns)
+    length = len(columns[keys[0]]) if keys else 0
+    return [{key: columns[key][index] for key in keys} for index in range(length)]
+
+
+def wants_columnar(accept_mimetypes=None):
+    """Accept で列形式が通常の JSON より優先されているか（省略時は実行中のリクエストの Accept）"""
+    if accept_mimetypes is None:
+        accept_mimetypes = request.accept_mimetypes
+    best = accept_mimetypes.best_match([JSON_MIMETYPE, COLUMNAR_MIMETYPE], default=JSON_MIMETYPE)
+    return best == COLUMNAR_MIMETYPE
+
+
+def negotiate(payload, accept_mimetypes=None):
+    """Accept に合わせた (書き出す内容, mimetype)"""
+    if wants_columnar(accept_mimetypes):
+        return dict(to_columnar(payload), format='columnar'), COLUMNAR_MIMETYPE
+    return payload, JSON_MIMETYPE
+
+
+def negotiated_jsonify(payload):
+    """Accept に合わせて通常の JSON か列形式で返す（キャッシュのため Vary: Accept を付ける）"""
+    body, mimetype = negotiate(payload)
+    response = jsonify(body)
+    response.mimetype = mimetype
+    response.vary.add('Accept')
+    return response
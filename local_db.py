@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ローカルSQLiteでアプリを動かすためのデータ投入・ベンチマークツール
+
+本番の MySQL（192.168.0.133）がなくても、同じスキーマのローカルファイルに
+大量データを投入して real_data_app / excel_only_app / hellowork_app を
+起動・計測できるようにする。
+
+使い方:
+    # companies 100万件のローカルDBを作成（ハローワーク用DBも作成）
+    python local_db.py seed --companies 1000000
+
+    # ローカルDBでアプリを起動（Flask-SQLAlchemy は相対パスを instance/ 基準で
+    # 解釈するため、SQLite のパスは絶対パスで指定する）
+    DATABASE_URL=sqlite:///$PWD/local_sales_list.db python real_data_app.py
+    HELLOWORK_DATABASE_URL=sqlite:///$PWD/local_hellowork.db python hellowork_app.py
+
+    # 主要ルートのレスポンス時間とSQL発行数を計測
+    python local_db.py bench --repeat 5
+"""
+
+import argparse
+import importlib
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert
+
+DEFAULT_URL = 'sqlite:///local_sales_list.db'
+DEFAULT_HELLOWORK_URL = 'sqlite:///local_hellowork.db'
+
+
+def absolute_sqlite_url(url):
+    """
+    相対パスの SQLite URL を絶対パスに変換する
+
+    Flask-SQLAlchemy は相対パスを instance フォルダ基準で解釈するため、
+    ツールとアプリが同じファイルを開くようにカレントディレクトリ基準で固定する。
+    """
+    prefix = 'sqlite:///'
+    if url.startswith(prefix) and not url.startswith(prefix + '/') and url != prefix + ':memory:':
+        return prefix + os.path.abspath(url[len(prefix):])
+    return url
+
+
+def load_app_module(module_name, database_url, hellowork_database_url=None):
+    """接続先を差し替えてアプリモジュールを読み込む（.env より優先）"""
+    os.environ['DATABASE_URL'] = database_url
+    if hellowork_database_url:
+        os.environ['HELLOWORK_DATABASE_URL'] = hellowork_database_url
+    return importlib.import_module(module_name)
+
+
+def _batched(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ========================
+# データ投入
+# ========================
+
+def seed_sales_list(engine, areas=7, accounts_per_area=4, companies_per_account=3, days=5, batch_size=10000):
+    """
+    sales_list 相当のテーブル（fm_areas / fm_accounts / fm_area_accounts / companies）を
+    作り直してデータを投入する
+
+    companies は 新規(2) → 更新(1) → 振り分けなし(0) の順に繰り返し、作成日は
+    今日から days 日前までに分散させる（乱数は使わず、同じ引数なら同じデータになる）。
+    """
+    import real_data_app as m
+
+    tables = [m.FmArea.__table__, m.FmAccount.__table__, m.FmAreaAccount.__table__, m.Company.__table__]
+    m.db.metadata.drop_all(engine, tables=tables)
+    m.db.metadata.create_all(engine, tables=tables)
+
+    now = datetime.now().replace(microsecond=0)
+    area_rows = []
+    account_rows = []
+    relation_rows = []
+    account_id = 0
+    for area_id in range(1, areas + 1):
+        area_rows.append({
+            'id': area_id, 'area_name_ja': f'支店{area_id}', 'area_name_en': f'area{area_id}',
+            'fm_login_account_id': 'login', 'fm_login_account_pass': 'pass'
+        })
+        for _ in range(accounts_per_area):
+            account_id += 1
+            account_rows.append({
+                'id': account_id, 'department_name': f'部署{account_id}', 'sort_order': account_id,
+                'needs_hellowork': 1, 'needs_tabelog': 0, 'needs_kanri': 1
+            })
+            relation_rows.append({'fm_area_id': area_id, 'fm_account_id': account_id, 'is_related': 1})
+
+    def company_rows():
+        for relation in relation_rows:
+            for n in range(companies_per_account):
+                result = (2, 1, 0)[n % 3]
+                created = now - timedelta(days=n % days, hours=1)
+                yield {
+                    'fm_area_id': relation['fm_area_id'],
+                    'imported_fm_account_id': relation['fm_account_id'] if result else None,
+                    'company_name': f"会社{relation['fm_account_id']}-{n}",
+                    'job_detail': f'求人詳細 {n}',
+                    'fm_import_result': result,
+                    'created_at': created,
+                    'updated_at': created + timedelta(minutes=30) if result == 1 else created
+                }
+
+    with engine.begin() as conn:
+        if area_rows:
+            conn.execute(insert(m.FmArea.__table__), area_rows)
+        if account_rows:
+            conn.execute(insert(m.FmAccount.__table__), account_rows)
+            conn.execute(insert(m.FmAreaAccount.__table__), relation_rows)
+        for batch in _batched(company_rows(), batch_size):
+            conn.execute(insert(m.Company.__table__), batch)
+
+    return len(relation_rows) * companies_per_account
+
+
+def seed_hellowork(engine, areas=4, accounts_per_area=2, rows_per_account=3, days=30, batch_size=10000):
+    """hellowork_app のテーブル（fm_areas / fm_accounts / hellowork_data / user）を作り直してデータを投入"""
+    import hellowork_app as m
+
+    m.db.metadata.drop_all(engine)
+    m.db.metadata.create_all(engine)
+
+    today = date.today()
+    area_rows = []
+    account_rows = []
+    account_id = 0
+    for area_id in range(1, areas + 1):
+        area_rows.append({'id': area_id, 'name': f'支店{area_id}', 'code': f'AREA{area_id}'})
+        for _ in range(accounts_per_area):
+            account_id += 1
+            account_rows.append({'id': account_id, 'area_id': area_id, 'name': f'アカウント{account_id}', 'is_active': True})
+
+    def data_rows():
+        for account in account_rows:
+            for n in range(rows_per_account):
+                yield {
+                    'fm_account_id': account['id'],
+                    'data_type': '新規' if n % 2 == 0 else '更新',
+                    'company_name': f"会社{account['id']}-{n}",
+                    'sent_date': today - timedelta(days=n % days)
+                }
+
+    with engine.begin() as conn:
+        if area_rows:
+            conn.execute(insert(m.FmArea.__table__), area_rows)
+        if account_rows:
+            conn.execute(insert(m.FmAccount.__table__), account_rows)
+        for batch in _batched(data_rows(), batch_size):
+            conn.execute(insert(m.HelloworkData.__table__), batch)
+
+    return len(account_rows) * rows_per_account
+
+
+# ========================
+# ベンチマーク
+# ========================
+
+# (アプリ, メソッド, パス, リクエスト引数)
+BENCH_ROUTES = [
+    ('real_data_app', 'GET', '/', {}),
+    ('real_data_app', 'POST', '/api/filtered-data', {'json': {'date_filter': 'today'}}),
+    ('real_data_app', 'POST', '/api/filtered-data', {'json': {'date_filter': 'month'}}),
+    ('real_data_app', 'POST', '/api/date-range-data', {'json': {'start_date': '2000-01-01', 'end_date': '2100-01-01'}}),
+    ('real_data_app', 'POST', '/api/export-mapping', {'json': {'date_filter': 'month'}}),
+    ('real_data_app', 'GET', '/api/mapping', {}),
+    ('excel_only_app', 'GET', '/', {}),
+    ('excel_only_app', 'POST', '/api/export-excel', {}),
+    ('hellowork_app', 'GET', '/api/daily-report', {}),
+]
+
+
+def bench_route(module, method, path, kwargs, repeat):
+    """ルートを repeat 回実行し、(中央値ミリ秒, SQL発行数, ステータス) を返す"""
+    client = module.app.test_client()
+    with module.app.app_context():
+        engine = module.db.engine
+
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    timings = []
+    status = None
+    event.listen(engine, 'before_cursor_execute', _count)
+    try:
+        for _ in range(repeat):
+            statements.clear()
+            started = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            timings.append((time.perf_counter() - started) * 1000)
+            status = response.status_code
+    finally:
+        event.remove(engine, 'before_cursor_execute', _count)
+    return statistics.median(timings), len(statements), status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ローカルSQLiteのデータ投入・ベンチマーク')
+    parser.add_argument('--url', default=DEFAULT_URL, help='sales_list 用のDB URL')
+    parser.add_argument('--hellowork-url', default=DEFAULT_HELLOWORK_URL, help='ハローワーク用のDB URL')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    seed = sub.add_parser('seed', help='テーブルを作り直してデータを投入')
+    seed.add_argument('--companies', type=int, default=100000, help='companies の件数（目安）')
+    seed.add_argument('--areas', type=int, default=7)
+    seed.add_argument('--accounts-per-area', type=int, default=4)
+    seed.add_argument('--days', type=int, default=365, help='作成日を分散させる日数')
+
+    bench = sub.add_parser('bench', help='主要ルートのレスポンス時間とSQL発行数を計測')
+    bench.add_argument('--repeat', type=int, default=3)
+
+    args = parser.parse_args(argv)
+    args.url = absolute_sqlite_url(args.url)
+    args.hellowork_url = absolute_sqlite_url(args.hellowork_url)
+
+    if args.command == 'seed':
+        accounts = max(1, args.areas * args.accounts_per_area)
+        per_account = max(1, args.companies // accounts)
+        load_app_module('real_data_app', args.url, args.hellowork_url)
+
+        started = time.perf_counter()
+        total = seed_sales_list(
+            create_engine(args.url), areas=args.areas, accounts_per_area=args.accounts_per_area,
+            companies_per_account=per_account, days=args.days
+        )
+        print(f'companies: {total:,}件を投入しました（{time.perf_counter() - started:.1f}秒）: {args.url}')
+
+        total = seed_hellowork(create_engine(args.hellowork_url), areas=args.areas, accounts_per_area=args.accounts_per_area)
+        print(f'hellowork_data: {total:,}件を投入しました: {args.hellowork_url}')
+        return 0
+
+    if args.command == 'bench':
+        print(f'{"app":<16}{"route":<40}{"median ms":>10}{"SQL":>6}{"status":>8}')
+        for module_name, method, path, kwargs in BENCH_ROUTES:
+            module = load_app_module(module_name, args.url, args.hellowork_url)
+            median_ms, statement_count, status = bench_route(module, method, path, kwargs, args.repeat)
+            label = f'{method} {path}'
+            if kwargs.get('json'):
+                label += ' ' + ','.join(str(v) for v in kwargs['json'].values())
+            print(f'{module_name:<16}{label[:39]:<40}{median_ms:>10.1f}{statement_count:>6}{status:>8}')
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
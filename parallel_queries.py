@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+互いに独立した読み取りクエリの並列実行
+
+集計を1本のクエリにまとめきれない箇所（新規件数と更新件数のグループ集計、支店・アカウントの
+マッピングと振り分けなし件数など）は、これまで1つのセッションで順番に実行していたため、
+待ち時間はクエリの合計になっていた。run() に渡した関数を上限付きのスレッドプールで同時に実行し、
+待ち時間を一番遅いクエリ程度にする。
+
+    各関数はワーカースレッドで新しいアプリケーションコンテキスト（リクエスト中ならリクエスト
+    コンテキストの写し）を push して呼ぶ。Flask-SQLAlchemy のセッションはアプリケーション
+    コンテキストごとなので、関数ごとに別のセッション・プールの別の接続を使い、コンテキストを
+    pop したときにセッションを片付ける（接続はプールに戻る）。
+    ステートメントタイムアウト（query_timeouts）の上限はワーカーにも引き継ぎ、ワーカーで
+    タイムアウトしたことと、使った期間集計の計算日時（stale_while_revalidate の computed_at）は
+    呼び出し側に伝える。
+
+別々の接続で読むため、関数どうしは同じ時点のスナップショットを見るとは限らない
+（画面の件数のように数秒のずれが問題にならない集計にだけ使う）。書き込みには使わない。
+ワーカーの中から run() を呼んだ場合は、プールを使い切らないよう順番に実行する。
+
+スレッドプールはプロセスで1つを全リクエストが共有する。空いているワーカーの数だけを
+ワーカーに回し、残りの関数は呼び出し側のスレッドで（リクエストがすでに持っている接続で）
+順番に実行するため、混んでいるときはプールの空きを待たずに順番に実行するのと同じになる。
+1プロセスが使う接続は多くても「同時に処理するリクエストの数 + PARALLEL_QUERY_WORKERS」本で、
+これが接続プールに収まるようにする。
+
+設定（環境変数 または app.config）:
+    PARALLEL_QUERY_WORKERS          同時に実行するクエリの数（既定: 4。1 以下で順番に実行）
+    PARALLEL_QUERY_REQUEST_THREADS  1プロセスが同時に処理するリクエストの数（gunicorn の --threads など。
+                                    接続プールの大きさの確認に使う。既定: 8）
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import copy_current_request_context, current_app, g, has_request_context
+
+import query_timeouts
+import stale_while_revalidate
+
+_worker = threading.local()
+
+
+class ParallelQueries:
+    def __init__(self, app, max_workers=4):
+        self.app = app
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='parallel-query') \
+            if max_workers > 1 else None
+        self._lock = threading.Lock()
+        self._idle = max_workers
+
+    def _reserve(self, count):
+        """空いているワーカーを count 本まで押さえ、押さえた数を返す"""
+        with self._lock:
+            reserved = min(count, self._idle)
+            self._idle -= reserved
+            return reserved
+
+    def _release(self):
+        with self._lock:
+            self._idle += 1
+
+    def _bind(self, call):
+        """
+        call をワーカースレッドで呼べる形にする
+
+        戻り値: (成功したか, 値または例外, タイムアウトしたか, 使った期間集計の計算日時)
+        """
+        timeout_ms = query_timeouts.current_timeout_ms()
+
+        def task():
+            _worker.active = True
+            g.statement_timeout_ms = timeout_ms
+            g.statement_timed_out = False
+            try:
+                try:
+                    ok, value = True, call()
+                except Exception as e:
+                    ok, value = False, e
+                return ok, value, g.statement_timed_out, g.get('aggregates_computed_at')
+            finally:
+                _worker.active = False
+
+        if has_request_context():
+            bound = copy_current_request_context(task)
+        else:
+            def bound():
+                with self.app.app_context():
+                    return task()
+
+        def release_when_done():
+            try:
+                return bound()
+            finally:
+                self._release()
+        return release_when_done
+
+    def run(self, *calls, return_exceptions=False):
+        """
+        引数なしの関数を同時に実行し、結果を渡した順に返す
+
+        空いているワーカーが足りなければ、残りの関数は呼び出し側のスレッドで順番に実行する。
+        return_exceptions=False なら最初に失敗した関数の例外を（全部終わってから）送出する。
+        True なら例外を結果の位置にそのまま入れて返す。
+        """
+        if self._executor is None or len(calls) <= 1 or getattr(_worker, 'active', False):
+            return _run_sequentially(calls, return_exceptions)
+
+        # 1本は呼び出し側のスレッドで実行するので、ワーカーに回すのは多くても len(calls) - 1 本
+        offloaded = self._reserve(len(calls) - 1)
+        if not offloaded:
+            return _run_sequentially(calls, return_exceptions)
+        futures = [self._executor.submit(self._bind(call)) for call in calls[:offloaded]]
+        inline = _run_sequentially(calls[offloaded:], return_exceptions=True)
+
+        results = []
+        for future in futures:
+            ok, value, timed_out, computed_at = future.result()
+            if has_request_context():
+                if timed_out:
+                    g.statement_timed_out = True
+                if computed_at is not None:
+                    stale_while_revalidate.record_computed_at(computed_at)
+            results.append(value if ok else _Failed(value))
+        results.extend(_Failed(value) if isinstance(value, Exception) else value for value in inline)
+
+        if not return_exceptions:
+            for value in results:
+                if isinstance(value, _Failed):
+                    raise value.error
+        return [value.error if isinstance(value, _Failed) else value for value in results]
+
+
+class _Failed:
+    """例外を返した関数の結果（戻り値として例外を返す関数と区別する）"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _run_sequentially(calls, return_exceptions):
+    results = []
+    for call in calls:
+        try:
+            results.append(call())
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(e)
+    return results
+
+
+def run(*calls, return_exceptions=False):
+    """現在のアプリの ParallelQueries で calls を同時に実行（init_app していなければ順番に実行）"""
+    parallel = current_app.extensions.get('parallel_queries')
+    if parallel is None:
+        return _run_sequentially(calls, return_exceptions)
+    return parallel.run(*calls, return_exceptions=return_exceptions)
+
+
+def init_app(app, db):
+    """独立した読み取りクエリの並列実行を有効にする"""
+    app.config.setdefault('PARALLEL_QUERY_WORKERS', int(os.getenv('PARALLEL_QUERY_WORKERS', '4')))
+    app.config.setdefault('PARALLEL_QUERY_REQUEST_THREADS', int(os.getenv('PARALLEL_QUERY_REQUEST_THREADS', '8')))
+    parallel = ParallelQueries(app, app.config['PARALLEL_QUERY_WORKERS'])
+    app.extensions['parallel_queries'] = parallel
+
+    # 各リクエストが1本ずつ接続を持ったうえで、ワーカーが最大 max_workers 本を追加で使う
+    with app.app_context():
+        pool = db.engine.pool
+        pool_size = getattr(pool, 'size', lambda: None)()
+        max_overflow = getattr(pool, '_max_overflow', 0)
+    needed = app.config['PARALLEL_QUERY_REQUEST_THREADS'] + (parallel.max_workers if parallel.max_workers > 1 else 0)
+    if pool_size is not None and max_overflow >= 0 and needed > pool_size + max_overflow:
+        print(f'同時に処理するリクエスト({app.config["PARALLEL_QUERY_REQUEST_THREADS"]}) + '
+              f'PARALLEL_QUERY_WORKERS({parallel.max_workers}) が接続プールの上限'
+              f'({pool_size} + {max_overflow})より大きいため、混雑時に接続を待ちます')
+    return parallel
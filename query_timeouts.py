@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ルートごとのステートメントタイムアウトと、タイムアウト時の前回値での応答
+
+遅い集計はこれまでクライアントが諦めるまでリクエストを塞ぎ、ルート内の広い except が
+0件（'period': '...(エラー)' など）を返して、本物のデータのように見えていた。
+limited を付けたルートでは、SQL 1本ごとに実行時間の上限をかける。
+
+    MySQL   … SELECT に /*+ MAX_EXECUTION_TIME(ミリ秒) */ ヒントを付ける（接続の状態は変えない）
+    SQLite  … 進捗ハンドラで上限を過ぎたステートメントを中断する（ローカル検証用）
+
+ルートの途中でタイムアウトした場合は、ルートが返したレスポンス（0件で埋めたものを含む）を
+捨て、同じリクエストで前回成功したレスポンスに stale: true と computed_at（計算した日時）を
+付けて返す。前回の値がなければ 504 とエラーを返す（0件は返さない）。
+前回値として保持するのは JSON（画面の集計）だけで、Excel などの大きなファイルは保持せず、
+タイムアウトしたら 504 を返す。保持する本文の合計は LAST_GOOD_MAX_BYTES までにする。
+
+設定（環境変数 または app.config）:
+    STATEMENT_TIMEOUT_MS   ステートメント1本の上限（既定: 10000。0 で無効）
+    STATEMENT_TIMEOUTS     ルート（エンドポイント名）ごとの上限
+                           例: get_filtered_data=15000,export_mapping=30000
+    LAST_GOOD_MAX_ENTRIES  前回値を保持するリクエストの数（既定: 256）
+    LAST_GOOD_MAX_BYTES    保持する本文の合計バイト数（既定: 33554432 = 32MB）
+"""
+
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app, g, has_request_context, jsonify, make_response, request
+from sqlalchemy import event
+
+import http_cache
+import json_formats
+import single_flight
+
+# MySQL: ER_QUERY_TIMEOUT（maximum statement execution time exceeded）
+MYSQL_QUERY_TIMEOUT = 3024
+# SQLite の進捗ハンドラを呼ぶ間隔（VM 命令数）
+SQLITE_PROGRESS_STEPS = 1000
+
+SELECT_HEAD = re.compile(r'^\s*SELECT\b', re.IGNORECASE)
+
+
+def add_max_execution_time(statement, timeout_ms):
+    """SELECT に MAX_EXECUTION_TIME ヒントを付ける（SELECT 以外・付与済みはそのまま）"""
+    if 'MAX_EXECUTION_TIME' in statement:
+        return statement
+    return SELECT_HEAD.sub(f'SELECT /*+ MAX_EXECUTION_TIME({int(timeout_ms)}) */', statement, count=1)
+
+
+def is_timeout_error(error):
+    """DBAPI の例外がステートメントタイムアウトによるものか"""
+    args = getattr(error, 'args', ())
+    if args and args[0] == MYSQL_QUERY_TIMEOUT:
+        return True
+    return type(error).__name__ == 'OperationalError' and 'interrupted' in str(error)
+
+
+def current_timeout_ms():
+    """実行中のリクエストにかかっている上限（limited の外・無効なら None）"""
+    if not has_request_context():
+        return None
+    return g.get('statement_timeout_ms')
+
+
+# ========================
+# エンジンへの組み込み
+# ========================
+
+def attach(engine):
+    """エンジンにタイムアウト用のイベントリスナーを登録"""
+
+    def _clear_progress_handler(conn):
+        if conn.info.pop('statement_deadline', None) is not None:
+            conn.connection.dbapi_connection.set_progress_handler(None, 0)
+
+    @event.listens_for(engine, 'before_cursor_execute', retval=True)
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        timeout_ms = current_timeout_ms()
+        if conn.dialect.name == 'sqlite':
+            _clear_progress_handler(conn)
+            if timeout_ms:
+                deadline = time.monotonic() + timeout_ms / 1000
+                conn.info['statement_deadline'] = deadline
+                # 0 以外を返すとステートメントが中断される（OperationalError: interrupted）
+                conn.connection.dbapi_connection.set_progress_handler(
+                    lambda: int(time.monotonic() > deadline), SQLITE_PROGRESS_STEPS
+                )
+        elif timeout_ms and conn.dialect.name == 'mysql':
+            statement = add_max_execution_time(statement, timeout_ms)
+        return statement, parameters
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if conn.dialect.name == 'sqlite':
+            _clear_progress_handler(conn)
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(context):
+        if context.connection is not None and context.connection.dialect.name == 'sqlite':
+            _clear_progress_handler(context.connection)
+        if is_timeout_error(context.original_exception) and has_request_context():
+            g.statement_timed_out = True
+
+
+# ========================
+# 前回成功したレスポンス
+# ========================
+
+JSON_MIMETYPES = (json_formats.JSON_MIMETYPE, json_formats.COLUMNAR_MIMETYPE)
+
+
+class LastGoodCache:
+    """リクエストごとに直近の成功レスポンスを保持する（件数か本文の合計が上限を超えたら古いものから捨てる）"""
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def put(self, key, snapshot):
+        size = len(snapshot[2])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= len(previous[0][2])
+            self._entries[key] = (snapshot, datetime.now())
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (dropped, _) = self._entries.popitem(last=False)
+                self.total_bytes -= len(dropped[2])
+
+    def get(self, key):
+        """(snapshot, 計算した日時)（なければ None）"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+def stale_response(snapshot, computed_at, reason):
+    """
+    保持していたレスポンスに stale の印を付けて返す
+
+    ヘッダー（Content-Type・Vary など）はそのまま使い、JSON（列形式も含む）なら本文にも印を付ける。
+    本文に集計した時刻（computed_at）があればそちらを優先する。
+    """
+    status, headers, body = snapshot
+    response = current_app.response_class(body, status=status, headers=headers)
+    if response.mimetype in JSON_MIMETYPES:
+        payload = json.loads(body)
+        payload.update(stale=True, stale_reason=reason,
+                       computed_at=payload.get('computed_at') or computed_at.isoformat(timespec='seconds'))
+        response.set_data(current_app.json.dumps(payload))
+    response.headers['X-Stale'] = 'true'
+    response.headers['X-Computed-At'] = computed_at.isoformat(timespec='seconds')
+    return response
+
+
+def route_timeout_ms(default_ms=None):
+    """このルートの上限（STATEMENT_TIMEOUTS の指定 > デコレータの既定 > STATEMENT_TIMEOUT_MS）"""
+    per_route = current_app.config['STATEMENT_TIMEOUTS']
+    if request.endpoint in per_route:
+        return per_route[request.endpoint]
+    return default_ms if default_ms is not None else current_app.config['STATEMENT_TIMEOUT_MS']
+
+
+def limited(default_ms=None):
+    """ステートメントに上限をかけ、タイムアウトしたら前回のレスポンスを stale として返すデコレータ"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            last_good = current_app.extensions.get('last_good')
+            if last_good is None:
+                return view(*args, **kwargs)
+            g.statement_timeout_ms = route_timeout_ms(default_ms) or None
+            g.statement_timed_out = False
+            try:
+                try:
+                    response = make_response(view(*args, **kwargs))
+                except Exception as e:
+                    # ルートが拾わなかった例外でも、タイムアウトなら前回値で応答する
+                    if not g.statement_timed_out:
+                        raise
+                    print(f'ステートメントタイムアウト（{request.endpoint}）: {e}')
+            finally:
+                timeout_ms, g.statement_timeout_ms = g.statement_timeout_ms, None
+
+            key = http_cache.request_key()
+            if not g.statement_timed_out:
+                # エラー（400・500）と JSON 以外（Excel などの大きなファイル）は前回値として保持しない
+                if response.status_code != 200 or response.mimetype not in JSON_MIMETYPES:
+                    return response
+                snapshot = single_flight.snapshot_response(response)
+                last_good.put(key, snapshot)
+                return current_app.response_class(snapshot[2], status=snapshot[0], headers=snapshot[1])
+
+            cached = last_good.get(key)
+            if cached is not None:
+                return stale_response(*cached, reason='timeout')
+            return jsonify({
+                'status': 'error',
+                'message': f'集計が時間内（{timeout_ms}ms）に終わりませんでした。期間を短くするか、しばらくしてから再度お試しください',
+                'timeout': True
+            }), 504
+        return wrapper
+    return decorator
+
+
+def parse_route_timeouts(value):
+    """'endpoint=ms,endpoint=ms' を {endpoint: ms} に"""
+    timeouts = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            endpoint, ms = item.split('=', 1)
+            timeouts[endpoint.strip()] = int(ms)
+    return timeouts
+
+
+def init_app(app, db):
+    """エンジンにタイムアウトを組み込み、前回値の保持を有効にする"""
+    app.config.setdefault('STATEMENT_TIMEOUT_MS', int(os.getenv('STATEMENT_TIMEOUT_MS', '10000')))
+    app.config.setdefault('STATEMENT_TIMEOUTS', parse_route_timeouts(os.getenv('STATEMENT_TIMEOUTS')))
+    app.config.setdefault('LAST_GOOD_MAX_ENTRIES', int(os.getenv('LAST_GOOD_MAX_ENTRIES', '256')))
+    app.config.setdefault('LAST_GOOD_MAX_BYTES', int(os.getenv('LAST_GOOD_MAX_BYTES', str(32 * 1024 * 1024))))
+
+    last_good = LastGoodCache(app.config['LAST_GOOD_MAX_ENTRIES'], app.config['LAST_GOOD_MAX_BYTES'])
+    app.extensions['last_good'] = last_good
+    with app.app_context():
+        attach(db.engine)
+    return last_good
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+トップページのテンプレート描画コストのベンチマーク
+
+各アプリの / を1回実行して描画に渡された値を取り出し、描画だけを繰り返して比較する。
+
+    inline   … 以前の方式。CSS/JS を埋め込んだテンプレート文字列を render_template_string で
+               毎回パース・コンパイルして描画
+    cached   … templates/ のファイルを render_template で描画（コンパイル済みをローダーのキャッシュから使う）
+
+HTML のサイズは1リクエストで返す本文の大きさ（CSS/JS は static/ から別に配信され、ブラウザにキャッシュされる）。
+
+使い方:
+    python local_db.py seed --companies 100000
+    python render_benchmark.py --repeat 200
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+from flask import render_template, render_template_string, template_rendered
+
+import local_db
+
+APPS = [
+    ('real_data_app', 'real_data/index.html'),
+    ('excel_only_app', 'excel_only/index.html'),
+    ('hellowork_app', 'hellowork/index.html'),
+]
+
+STYLESHEET = re.compile(r'<link rel="stylesheet" href="\{\{ asset_url\(\'(?P<path>[^\']+)\'\) \}\}">')
+SCRIPT = re.compile(r'<script src="\{\{ asset_url\(\'(?P<path>[^\']+)\'\) \}\}"></script>')
+
+
+def inline_source(app, template_name):
+    """テンプレートファイルに static/ の CSS/JS を埋め戻した、以前と同じ形のテンプレート文字列"""
+    source, _, _ = app.jinja_loader.get_source(app.jinja_env, template_name)
+
+    def read_static(match):
+        with open(os.path.join(app.static_folder, match.group('path')), encoding='utf-8') as f:
+            return f.read()
+
+    source = STYLESHEET.sub(lambda m: f'<style>\n{read_static(m)}</style>', source)
+    return SCRIPT.sub(lambda m: f'<script>\n{read_static(m)}</script>', source)
+
+
+def capture_context(module):
+    """/ を1回実行し、テンプレートに渡された値を取り出す"""
+    captured = {}
+
+    def on_rendered(sender, template, context, **extra):
+        captured.update({key: value for key, value in context.items() if key not in ('g', 'request', 'session')})
+
+    with template_rendered.connected_to(on_rendered, module.app):
+        response = module.app.test_client().get('/')
+    if response.status_code != 200 or not captured:
+        raise RuntimeError(f'{module.__name__} の / を描画できませんでした: {response.status_code}')
+    return captured
+
+
+def time_render(render, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        html = render()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(html.encode('utf-8'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='トップページのテンプレート描画コストを比較')
+    parser.add_argument('--url', default=local_db.DEFAULT_URL, help='sales_list 用のDB URL')
+    parser.add_argument('--hellowork-url', default=local_db.DEFAULT_HELLOWORK_URL, help='ハローワーク用のDB URL')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args(argv)
+    url = local_db.absolute_sqlite_url(args.url)
+    hellowork_url = local_db.absolute_sqlite_url(args.hellowork_url)
+
+    print(f'{"app":<16}{"inline ms":>11}{"cached ms":>11}{"speedup":>9}{"inline KB":>11}{"cached KB":>11}')
+    for module_name, template_name in APPS:
+        module = local_db.load_app_module(module_name, url, hellowork_url)
+        app = module.app
+        context = capture_context(module)
+        source = inline_source(app, template_name)
+        with app.test_request_context('/'):
+            inline_ms, inline_bytes = time_render(lambda: render_template_string(source, **context), args.repeat)
+            cached_ms, cached_bytes = time_render(lambda: render_template(template_name, **context), args.repeat)
+        print(
+            f'{module_name:<16}{inline_ms:>11.3f}{cached_ms:>11.3f}{inline_ms / cached_ms:>8.1f}x'
+            f'{inline_bytes / 1024:>11.1f}{cached_bytes / 1024:>11.1f}'
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+テーブル全体・グループ別の件数の概算
+
+ヘッダーの「約72万件」や /api/test のデータ件数のように、画面に出すだけの件数のために
+companies 全体を COUNT(*) したり、支店と外部結合して GROUP BY したりするのは重い。
+ここでは次の順に件数を答え、概算かどうか（approximate）と出どころ（source）を添えて返す。
+
+    1. 件数テーブル（row_count_estimates）… refresh で定期的に数え直した値（グループ別にも対応）
+    2. テーブル統計 … MySQL の information_schema.TABLES.TABLE_ROWS（テーブル全体のみ）
+    3. 正確な COUNT … 上のどちらも使えないとき、または exact=True を指定したとき
+
+使い方:
+    # 件数テーブルを作り直す（cron などで定期的に実行）
+    python row_estimates.py refresh
+    python row_estimates.py show
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Integer, MetaData, String, Table, create_engine, select, text
+)
+
+import db_dialect
+
+COUNTER_TABLE = Table(
+    'row_count_estimates', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('table_name', String(64), nullable=False, index=True),
+    Column('group_column', String(64), nullable=False),  # '' はテーブル全体
+    Column('group_value', Integer),
+    Column('row_count', BigInteger, nullable=False),
+    Column('refreshed_at', DateTime, nullable=False)
+)
+
+# 件数テーブルの存在を確認済みの接続先（一度作られたら消えない前提で、ある場合だけ覚える）
+_counter_table_seen = set()
+
+# refresh で数え直す (テーブル, グループ列) … グループ列 '' はテーブル全体
+DEFAULT_TARGETS = [('companies', ''), ('companies', 'fm_area_id')]
+
+
+def _result(source, as_of=None, **values):
+    return dict(
+        values,
+        approximate=source != 'exact',
+        source=source,
+        as_of=as_of.isoformat(timespec='seconds') if as_of else None
+    )
+
+
+def counter_available(bind):
+    """件数テーブルがあるか（あった接続先は覚えておき、2回目からは確認しない）"""
+    connection = db_dialect.connection_of(bind)
+    key = connection.engine.url.render_as_string(hide_password=True)
+    if key not in _counter_table_seen:
+        if not db_dialect.table_exists(connection, COUNTER_TABLE.name):
+            return False
+        _counter_table_seen.add(key)
+    return True
+
+
+def counter_subquery(table, group_column):
+    """件数テーブルの (group_value, row_count, refreshed_at) … アプリのクエリに外部結合して使う"""
+    return select(COUNTER_TABLE.c.group_value, COUNTER_TABLE.c.row_count, COUNTER_TABLE.c.refreshed_at).where(
+        COUNTER_TABLE.c.table_name == table,
+        COUNTER_TABLE.c.group_column == group_column
+    ).subquery()
+
+
+def is_fresh(refreshed_at, max_age_seconds):
+    """件数テーブルの値が使える新しさか（max_age_seconds が None なら古さは問わない）"""
+    if refreshed_at is None:
+        return False
+    return max_age_seconds is None or (datetime.now() - refreshed_at).total_seconds() <= max_age_seconds
+
+
+def _counter_rows(connection, table, group_column, max_age_seconds):
+    """件数テーブルの行（なければ、または max_age_seconds より古ければ None）"""
+    if not counter_available(connection):
+        return None
+    rows = connection.execute(select(counter_subquery(table, group_column))).fetchall()
+    if not rows or not is_fresh(min(row.refreshed_at for row in rows), max_age_seconds):
+        return None
+    return rows
+
+
+def table_total(bind, table, exact=False, max_age_seconds=None):
+    """
+    テーブル全体の件数
+
+    戻り値: {'count', 'approximate', 'source', 'as_of'}
+    source は 'counter_table' / 'statistics' / 'exact'
+    """
+    connection = db_dialect.connection_of(bind)
+    if not exact:
+        rows = _counter_rows(connection, table, '', max_age_seconds)
+        if rows:
+            return _result('counter_table', rows[0].refreshed_at, count=rows[0].row_count)
+        if db_dialect.is_mysql(connection):
+            # InnoDB の統計値（ANALYZE TABLE のたびに更新される推定値）
+            row = connection.execute(text(
+                'SELECT TABLE_ROWS, UPDATE_TIME FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :name'
+            ), {'name': table}).fetchone()
+            if row is not None and row[0] is not None:
+                return _result('statistics', row[1], count=int(row[0]))
+    count = connection.execute(text(f'SELECT COUNT(*) FROM {table}')).scalar()
+    return _result('exact', count=count)
+
+
+def group_counts(bind, table, group_column, exact=False, max_age_seconds=None):
+    """
+    グループ列の値ごとの件数
+
+    戻り値: {'counts': {値: 件数}, 'approximate', 'source', 'as_of'}
+    テーブル統計はグループ別の件数を持たないため、件数テーブルがなければ正確に数える。
+    """
+    connection = db_dialect.connection_of(bind)
+    if not exact:
+        rows = _counter_rows(connection, table, group_column, max_age_seconds)
+        if rows:
+            return _result(
+                'counter_table', min(row.refreshed_at for row in rows),
+                counts={row.group_value: row.row_count for row in rows}
+            )
+    rows = connection.execute(
+        text(f'SELECT {group_column}, COUNT(*) FROM {table} GROUP BY {group_column}')
+    ).fetchall()
+    return _result('exact', counts={row[0]: row[1] for row in rows})
+
+
+# ========================
+# 件数テーブルの更新
+# ========================
+
+def refresh(engine, targets=DEFAULT_TARGETS):
+    """件数テーブルを数え直す（対象ごとに1トランザクションで入れ替える）。書き込んだ行数を返す"""
+    COUNTER_TABLE.create(engine, checkfirst=True)
+    written = 0
+    for table, group_column in targets:
+        with engine.begin() as connection:
+            now = datetime.now()
+            if group_column:
+                counts = group_counts(connection, table, group_column, exact=True)['counts']
+            else:
+                counts = {None: table_total(connection, table, exact=True)['count']}
+            connection.execute(COUNTER_TABLE.delete().where(
+                COUNTER_TABLE.c.table_name == table,
+                COUNTER_TABLE.c.group_column == group_column
+            ))
+            connection.execute(COUNTER_TABLE.insert(), [
+                {
+                    'table_name': table, 'group_column': group_column, 'group_value': value,
+                    'row_count': count, 'refreshed_at': now
+                } for value, count in counts.items()
+            ])
+            written += len(counts)
+    return written
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='件数の概算（件数テーブルの更新・表示）')
+    parser.add_argument('--url', default=os.getenv('DATABASE_URL'), help='対象DBのURL（既定: DATABASE_URL）')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('refresh', help='件数テーブルを数え直す')
+    sub.add_parser('show', help='概算と正確な件数を並べて表示')
+    args = parser.parse_args(argv)
+    engine = create_engine(args.url)
+
+    if args.command == 'refresh':
+        rows = refresh(engine)
+        print(f'件数テーブルを更新しました: {rows}行')
+    elif args.command == 'show':
+        with engine.connect() as connection:
+            for table, group_column in DEFAULT_TARGETS:
+                if group_column:
+                    estimate = group_counts(connection, table, group_column)
+                    exact = group_counts(connection, table, group_column, exact=True)
+                    total, exact_total = sum(estimate['counts'].values()), sum(exact['counts'].values())
+                else:
+                    estimate = table_total(connection, table)
+                    total = estimate['count']
+                    exact_total = table_total(connection, table, exact=True)['count']
+                label = f'{table}.{group_column}' if group_column else table
+                print(f"{label}: 概算 {total:,}（{estimate['source']}, {estimate['as_of']}） / 正確 {exact_total:,}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+遅いリクエスト向けの常時稼働サンプリングプロファイラ
+
+PROFILER_ENABLED=1 のときだけ動作する。バックグラウンドスレッドが処理中の
+リクエストのスタックを一定間隔でサンプリングし、レイテンシが閾値を超えた
+リクエストのサンプルだけをルート別の collapsed-stack ファイル
+（flamegraph.pl / speedscope 互換）に集約する。
+
+設定（環境変数 または app.config）:
+    PROFILER_ENABLED       1 で有効（既定: 0）
+    PROFILER_THRESHOLD_MS  記録対象とするレイテンシの閾値（既定: 1000）
+    PROFILER_INTERVAL_MS   サンプリング間隔（既定: 10）
+    PROFILER_WINDOW        ルートごとに保持する直近の遅いリクエスト数（既定: 50）
+    PROFILER_DIR           collapsed-stack ファイルの出力先（既定: profiles）
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from flask import Response, g, jsonify, request
+
+
+class SamplingProfiler:
+    """処理中リクエストのスタックを定期的に採取するプロファイラ"""
+
+    def __init__(self, interval=0.01, threshold=1.0, window=50, output_dir='profiles', max_depth=64):
+        self.interval = interval
+        self.threshold = threshold
+        self.window = window
+        self.output_dir = output_dir
+        self.max_depth = max_depth
+
+        # スレッドID -> そのリクエストで採取したスタックのカウンタ
+        self._active = {}
+        # ルート -> 直近の遅いリクエストのサンプル（ローリングウィンドウ）
+        self._recent = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+        self.sample_seconds = 0.0
+
+    # ------------------------
+    # サンプリングスレッド
+    # ------------------------
+
+    def start(self):
+        """サンプリングスレッドを起動（起動済みなら何もしない）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            # 処理中のリクエストがなければフレームを取得しない（アイドル時のコストはほぼゼロ）
+            if not self._active:
+                continue
+            started = time.perf_counter()
+            frames = sys._current_frames()
+            for thread_id, samples in list(self._active.items()):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[self._fold(frame)] += 1
+            del frames
+            self.sample_seconds += time.perf_counter() - started
+
+    def _fold(self, frame):
+        """フレームを 'module:function;module:function' 形式（外側→内側）に変換"""
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            module = frame.f_globals.get('__name__', '?')
+            names.append(f'{module}:{code.co_name}')
+            frame = frame.f_back
+        names.reverse()
+        return ';'.join(names)
+
+    # ------------------------
+    # リクエスト単位の記録
+    # ------------------------
+
+    def begin_request(self):
+        self._active[threading.get_ident()] = Counter()
+
+    def end_request(self, route, elapsed):
+        samples = self._active.pop(threading.get_ident(), None)
+        if not samples or elapsed < self.threshold:
+            return
+        with self._lock:
+            recent = self._recent.setdefault(route, deque(maxlen=self.window))
+            recent.append(samples)
+            merged = self._merge(recent)
+        self._write(route, merged)
+
+    def _merge(self, recent):
+        merged = Counter()
+        for samples in recent:
+            merged.update(samples)
+        return merged
+
+    def collapsed(self, route):
+        """ルートの集約済みスタックを collapsed-stack 形式の文字列で返す"""
+        with self._lock:
+            recent = self._recent.get(route)
+            if not recent:
+                return None
+            merged = self._merge(recent)
+        return ''.join(f'{stack} {count}\n' for stack, count in merged.most_common())
+
+    def routes(self):
+        with self._lock:
+            return {
+                route: {
+                    'slow_requests': len(recent),
+                    'samples': sum(sum(samples.values()) for samples in recent),
+                    'file': self.file_path(route)
+                } for route, recent in self._recent.items()
+            }
+
+    def file_path(self, route):
+        return os.path.join(self.output_dir, route_key(route) + '.folded')
+
+    def _write(self, route, merged):
+        """一時ファイルに書いてからリネームし、読み手が書きかけを見ないようにする"""
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = self.file_path(route)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for stack, count in merged.most_common():
+                    f.write(f'{stack} {count}\n')
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"プロファイル書き込みエラー: {route}: {e}")
+
+
+def route_key(route):
+    """ルート（'/api/date-summary/<date_str>' など）をファイル名に使える形に変換"""
+    return re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+
+
+def init_app(app):
+    """アプリにプロファイラのフックと管理用エンドポイントを登録"""
+    app.config.setdefault('PROFILER_ENABLED', os.getenv('PROFILER_ENABLED', '0') == '1')
+    app.config.setdefault('PROFILER_THRESHOLD_MS', int(os.getenv('PROFILER_THRESHOLD_MS', '1000')))
+    app.config.setdefault('PROFILER_INTERVAL_MS', int(os.getenv('PROFILER_INTERVAL_MS', '10')))
+    app.config.setdefault('PROFILER_WINDOW', int(os.getenv('PROFILER_WINDOW', '50')))
+    app.config.setdefault('PROFILER_DIR', os.getenv('PROFILER_DIR', 'profiles'))
+
+    profiler = SamplingProfiler(
+        interval=app.config['PROFILER_INTERVAL_MS'] / 1000,
+        threshold=app.config['PROFILER_THRESHOLD_MS'] / 1000,
+        window=app.config['PROFILER_WINDOW'],
+        output_dir=app.config['PROFILER_DIR']
+    )
+    app.extensions['sampling_profiler'] = profiler
+
+    @app.before_request
+    def _profiler_begin():
+        if not app.config['PROFILER_ENABLED']:
+            return
+        # スレッドは最初のリクエストで起動（リローダーの親プロセスでは動かさない）
+        profiler.start()
+        g._profiler_started = time.perf_counter()
+        profiler.begin_request()
+
+    @app.teardown_request
+    def _profiler_end(exc=None):
+        started = g.pop('_profiler_started', None)
+        if started is None:
+            return
+        route = request.url_rule.rule if request.url_rule else request.path
+        profiler.end_request(route, time.perf_counter() - started)
+
+    @app.route('/api/admin/profiles')
+    def admin_profiles():
+        """遅いリクエストのプロファイル一覧"""
+        return jsonify({
+            'status': 'success',
+            'enabled': app.config['PROFILER_ENABLED'],
+            'threshold_ms': app.config['PROFILER_THRESHOLD_MS'],
+            'interval_ms': app.config['PROFILER_INTERVAL_MS'],
+            'sampling_seconds': round(profiler.sample_seconds, 3),
+            'routes': [
+                dict(route=route, key=route_key(route), **info)
+                for route, info in profiler.routes().items()
+            ]
+        })
+
+    @app.route('/api/admin/profiles/<key>')
+    def admin_profile_detail(key):
+        """ルート別の collapsed-stack（flamegraph.pl にそのまま渡せる形式）"""
+        for route in profiler.routes():
+            if route_key(route) == key:
+                return Response(profiler.collapsed(route), mimetype='text/plain')
+        return jsonify({'status': 'error', 'message': f'プロファイルがありません: {key}'}), 404
+
+    return profiler
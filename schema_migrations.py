@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+バージョン管理付きのスキーマ移行ツール（インデックス・生成列）
+
+companies / fm_area_accounts に、アプリの実際の絞り込み条件に合わせたインデックスと
+日付の生成列を追加する。適用済みの版は schema_migrations テーブルに記録し、
+適用（apply）・検証（verify）・巻き戻し（rollback）ができる。
+plan では各インデックスがどのアプリのクエリに効くかを表示する。
+
+MySQL ではインデックスを ALGORITHM=INPLACE, LOCK=NONE（オンラインDDL）で追加する。
+STORED の生成列の追加はテーブルの再構築になるため、plan の注意書きを確認してから適用すること。
+SQLite は ALTER TABLE で STORED の生成列を追加できないため VIRTUAL で追加する（インデックスは張れる）。
+
+使い方:
+    python schema_migrations.py plan
+    python schema_migrations.py apply            # 未適用の版をすべて適用
+    python schema_migrations.py apply --to 3     # 3 まで適用
+    python schema_migrations.py verify
+    python schema_migrations.py rollback         # 最後の1版を巻き戻す
+    python schema_migrations.py rollback --to 0  # すべて巻き戻す
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, inspect, text
+
+VERSION_TABLE = Table(
+    'schema_migrations', MetaData(),
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(255), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+class Migration:
+    """
+    1つの版の変更内容（宣言的に書き、方言ごとのDDLと巻き戻し・検証はここから作る）
+
+    generated_columns: [(テーブル, 列名, 元の日時列)] … 日付の生成列
+    indexes: [(インデックス名, テーブル, [列])]
+    serves: このインデックスが効くアプリのクエリ（plan で表示）
+    """
+
+    def __init__(self, version, name, indexes=(), generated_columns=(), serves=(), note=None):
+        self.version = version
+        self.name = name
+        self.indexes = list(indexes)
+        self.generated_columns = list(generated_columns)
+        self.serves = list(serves)
+        self.note = note
+
+    def steps(self, dialect):
+        """(適用SQL, 巻き戻しSQL) の組を適用順に返す"""
+        steps = []
+        for table, column, source in self.generated_columns:
+            if dialect == 'mysql':
+                add = f'ALTER TABLE {table} ADD COLUMN {column} DATE GENERATED ALWAYS AS (DATE({source})) STORED'
+            else:
+                add = f'ALTER TABLE {table} ADD COLUMN {column} DATE GENERATED ALWAYS AS (date({source})) VIRTUAL'
+            steps.append((add, f'ALTER TABLE {table} DROP COLUMN {column}'))
+        for name, table, columns in self.indexes:
+            column_list = ', '.join(columns)
+            if dialect == 'mysql':
+                steps.append((
+                    f'ALTER TABLE {table} ADD INDEX {name} ({column_list}), ALGORITHM=INPLACE, LOCK=NONE',
+                    f'ALTER TABLE {table} DROP INDEX {name}'
+                ))
+            else:
+                steps.append((f'CREATE INDEX {name} ON {table} ({column_list})', f'DROP INDEX {name}'))
+        return steps
+
+    def problems(self, connection):
+        """適用済みのはずのオブジェクトが揃っているか確認し、足りないものを返す"""
+        inspector = inspect(connection)
+        problems = []
+        for table, column, _ in self.generated_columns:
+            if column not in {col['name'] for col in inspector.get_columns(table)}:
+                problems.append(f'列がありません: {table}.{column}')
+        for name, table, columns in self.indexes:
+            found = {index['name']: index['column_names'] for index in inspector.get_indexes(table)}
+            if name not in found:
+                problems.append(f'インデックスがありません: {table}.{name}')
+            elif list(found[name]) != list(columns):
+                problems.append(f'インデックスの列が異なります: {table}.{name} {found[name]} != {columns}')
+        return problems
+
+
+MIGRATIONS = [
+    Migration(
+        1, 'companies_area_account_result_created',
+        indexes=[('idx_companies_area_account_result_created', 'companies',
+                  ['fm_area_id', 'imported_fm_account_id', 'fm_import_result', 'created_at'])],
+        serves=[
+            'real_data_app.get_companies_data_by_period … 支店・アカウント別の新規件数（created_at の期間）',
+        ]
+    ),
+    Migration(
+        2, 'companies_area_account_result_updated',
+        indexes=[('idx_companies_area_account_result_updated', 'companies',
+                  ['fm_area_id', 'imported_fm_account_id', 'fm_import_result', 'updated_at'])],
+        serves=[
+            'real_data_app.get_companies_data_by_period … 支店・アカウント別の更新件数（updated_at の期間）',
+        ]
+    ),
+    Migration(
+        3, 'companies_result_period',
+        indexes=[
+            ('idx_companies_result_created', 'companies',
+             ['fm_import_result', 'created_at', 'fm_area_id', 'imported_fm_account_id']),
+            ('idx_companies_result_updated', 'companies',
+             ['fm_import_result', 'updated_at', 'fm_area_id', 'imported_fm_account_id']),
+        ],
+        serves=[
+            'real_data_app.get_unassigned_counts_by_area … 振り分けなし（fm_import_result = 0）の期間集計',
+            'real_data_app.get_companies_counts_by_period … 新規・更新件数を期間の範囲スキャンで集計（カバリング）',
+            'real_data_app /api/debug-unassigned … 振り分けなしの件数',
+            'count_cube.daily_aggregate … 日別集計（今日分の再読み込みを範囲スキャンで）',
+        ]
+    ),
+    Migration(
+        4, 'companies_generated_dates',
+        generated_columns=[('companies', 'created_date', 'created_at'), ('companies', 'updated_date', 'updated_at')],
+        indexes=[
+            ('idx_companies_created_date_result', 'companies', ['created_date', 'fm_import_result']),
+            ('idx_companies_updated_date_result', 'companies', ['updated_date', 'fm_import_result']),
+        ],
+        serves=[
+            'check_data_distribution.py … DATE(created_at) での日付分布',
+        ],
+        note='MySQL では STORED 列の追加でテーブルが再構築される（ALGORITHM=COPY）。業務時間外に適用すること。'
+    ),
+    Migration(
+        5, 'fm_area_accounts_related_area',
+        indexes=[('idx_fm_area_accounts_related_area', 'fm_area_accounts', ['is_related', 'fm_area_id'])],
+        serves=[
+            'real_data_app.get_area_account_mapping … is_related = 1 の支店・アカウント対応（全ルート共通）',
+        ]
+    ),
+    Migration(
+        6, 'companies_created_updated_window',
+        indexes=[
+            ('idx_companies_created_result', 'companies', ['created_at', 'fm_import_result']),
+            ('idx_companies_updated_created', 'companies', ['updated_at', 'created_at']),
+        ],
+        serves=[
+            'excel_only_app.get_companies_summary_by_date / /api/date-summary … 前日〜翌日の created_at の窓（カバリング）',
+            'excel_only_app.get_companies_summary … 今月初め（または7日前）以降の created_at と今月の updated_at の窓'
+            '（OR は MySQL のインデックスマージで2本を使う）',
+        ]
+    ),
+]
+
+
+# ========================
+# 適用・検証・巻き戻し
+# ========================
+
+def applied_versions(connection):
+    VERSION_TABLE.create(connection, checkfirst=True)
+    return {row.version: row.name for row in connection.execute(VERSION_TABLE.select())}
+
+
+def _run_steps(connection, statements):
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def apply(engine, target=None, migrations=MIGRATIONS):
+    """未適用の版を target まで順に適用し、適用した版番号のリストを返す"""
+    done = []
+    with engine.connect() as connection:
+        applied = applied_versions(connection)
+        connection.commit()
+        dialect = connection.dialect.name
+        for migration in migrations:
+            if migration.version in applied or (target is not None and migration.version > target):
+                continue
+            completed = []
+            try:
+                for up, down in migration.steps(dialect):
+                    _run_steps(connection, [up])
+                    completed.append(down)
+                connection.execute(VERSION_TABLE.insert().values(
+                    version=migration.version, name=migration.name, applied_at=datetime.now()
+                ))
+                connection.commit()
+            except Exception:
+                # MySQL の DDL はトランザクションで戻せないため、実行済みの手順を逆順に取り消す
+                connection.rollback()
+                for down in reversed(completed):
+                    try:
+                        _run_steps(connection, [down])
+                        connection.commit()
+                    except Exception as e:
+                        print(f'取り消しに失敗しました（手動で確認してください）: {down}: {e}')
+                raise
+            done.append(migration.version)
+    return done
+
+
+def rollback(engine, target=None, migrations=MIGRATIONS):
+    """適用済みの版を新しい順に巻き戻す（target 省略時は最後の1版のみ）。巻き戻した版番号を返す"""
+    done = []
+    with engine.connect() as connection:
+        applied = applied_versions(connection)
+        connection.commit()
+        if not applied:
+            return done
+        if target is None:
+            target = max(applied) - 1
+        dialect = connection.dialect.name
+        for migration in sorted(migrations, key=lambda m: m.version, reverse=True):
+            if migration.version not in applied or migration.version <= target:
+                continue
+            _run_steps(connection, [down for _, down in reversed(migration.steps(dialect))])
+            connection.execute(VERSION_TABLE.delete().where(VERSION_TABLE.c.version == migration.version))
+            connection.commit()
+            done.append(migration.version)
+    return done
+
+
+def verify(engine, migrations=MIGRATIONS):
+    """[(版, 名前, 適用済みか, 問題のリスト)] を返す（未適用なのにオブジェクトがある場合も報告）"""
+    results = []
+    with engine.connect() as connection:
+        applied = applied_versions(connection)
+        connection.commit()
+        for migration in migrations:
+            problems = migration.problems(connection)
+            if migration.version in applied:
+                results.append((migration.version, migration.name, True, problems))
+            else:
+                missing_all = len(problems) == len(migration.indexes) + len(migration.generated_columns)
+                results.append((
+                    migration.version, migration.name, False,
+                    [] if missing_all else ['未適用ですが一部のオブジェクトが既に存在します']
+                ))
+    return results
+
+
+def plan(engine, migrations=MIGRATIONS):
+    """各版の状態・DDL・効くクエリを表示用の行で返す"""
+    lines = []
+    with engine.connect() as connection:
+        applied = applied_versions(connection)
+        connection.commit()
+        dialect = connection.dialect.name
+    for migration in migrations:
+        status = '適用済み' if migration.version in applied else '未適用'
+        lines.append(f'[{migration.version}] {migration.name}（{status}）')
+        for up, _ in migration.steps(dialect):
+            lines.append(f'    {up};')
+        for query in migration.serves:
+            lines.append(f'    → {query}')
+        if migration.note:
+            lines.append(f'    ⚠️ {migration.note}')
+    return lines
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='スキーマ移行（インデックス・生成列）')
+    parser.add_argument('--url', default=os.getenv('DATABASE_URL'), help='対象DBのURL（既定: DATABASE_URL）')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('plan', help='各版のDDLと、効くアプリのクエリを表示')
+    apply_parser = sub.add_parser('apply', help='未適用の版を適用')
+    apply_parser.add_argument('--to', type=int, help='この版まで適用')
+    sub.add_parser('verify', help='適用済みの版のインデックス・列が揃っているか確認')
+    rollback_parser = sub.add_parser('rollback', help='適用済みの版を巻き戻す')
+    rollback_parser.add_argument('--to', type=int, help='この版まで戻す（省略時は最後の1版）')
+
+    args = parser.parse_args(argv)
+    engine = create_engine(args.url)
+
+    if args.command == 'plan':
+        print('\n'.join(plan(engine)))
+    elif args.command == 'apply':
+        versions = apply(engine, target=args.to)
+        print(f'適用しました: {versions}' if versions else '適用する版はありません')
+    elif args.command == 'rollback':
+        versions = rollback(engine, target=args.to)
+        print(f'巻き戻しました: {versions}' if versions else '巻き戻す版はありません')
+    elif args.command == 'verify':
+        ok = True
+        for version, name, applied, problems in verify(engine):
+            mark = '✅' if not problems else '❌'
+            print(f'{mark} [{version}] {name}（{"適用済み" if applied else "未適用"}）')
+            for problem in problems:
+                print(f'    {problem}')
+            ok = ok and not problems
+        return 0 if ok else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
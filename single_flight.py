@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+同じ内容の同時リクエストを1回の計算にまとめる（single-flight）
+
+朝9時に複数人が同じ期間の「Excel出力」を押すと、同じ集計と同じブックの作成が並行して
+走り、DBの負荷が人数分になる。coalesce を付けたルートは、同じリクエスト（メソッド・パス・
+クエリ・Accept・本文が同じ）が処理中であれば新たに計算せず、処理中の計算の完了を待って
+同じレスポンス（状態・ヘッダー・本文）を受け取る。
+
+    プロセス内   … スレッド間で共有（既定）
+    プロセス間   … SINGLE_FLIGHT_DIR を指定すると、キーごとのロックファイル（flock）で
+                   ワーカープロセス間でも1回にまとめる。先に終わったプロセスの結果を
+                   SINGLE_FLIGHT_SHARE_SECONDS 秒のあいだ他のプロセスが使う（POSIX のみ）。
+                   古くなった結果・ロックファイルは書き出しのついでに SWEEP_SECONDS ごとに消す。
+                   共有できる結果はレスポンス（状態・ヘッダー・本文）だけで、結果ファイルは
+                   JSON のヘッダー行と本文そのままで書く（pickle は読み込みでコードを実行できるため使わない）
+
+レスポンスには X-Single-Flight: leader（自分で計算）/ shared（他の計算の結果）を付ける。
+
+設定（環境変数 または app.config）:
+    SINGLE_FLIGHT_ENABLED        0 で無効（既定: 1）
+    SINGLE_FLIGHT_DIR            プロセス間で共有するロック・結果ファイルの置き場（既定: なし）
+    SINGLE_FLIGHT_SHARE_SECONDS  プロセス間で結果を使い回す秒数（既定: 2）
+"""
+
+import functools
+import hashlib
+import os
+import json
+import tempfile
+import threading
+import time
+
+from flask import current_app, make_response
+
+import http_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows ではプロセス間の共有を使わない
+    fcntl = None
+
+# プロセス間の結果・ロックファイルを掃除する間隔（これより古いロックファイルも消す）
+SWEEP_SECONDS = 60
+
+
+class _Call:
+    """処理中の1回の計算"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, lock_dir=None, share_seconds=2.0):
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self.share_seconds = share_seconds
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._swept_at = 0.0
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def in_flight(self, key):
+        """処理中の計算を待っている数（処理中でなければ None）"""
+        with self._lock:
+            call = self._calls.get(key)
+            return call.waiters if call else None
+
+    def do(self, key, compute):
+        """(結果, 他の計算の結果を受け取ったか)。計算の例外は待っていた全員に送る"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        shared = False
+        try:
+            if self.lock_dir:
+                call.result, shared = self._do_across_processes(key, compute)
+            else:
+                call.result = compute()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, shared
+
+    # ------------------------
+    # プロセス間
+    # ------------------------
+
+    def _do_across_processes(self, key, compute):
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        lock_path = os.path.join(self.lock_dir, f'{digest}.lock')
+        result_path = os.path.join(self.lock_dir, f'{digest}.result')
+        with open(lock_path, 'a+b') as lock_file:
+            # 他のプロセスが計算中ならここで終わるのを待つ
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                recent = self._read_recent(result_path)
+                if recent is not None:
+                    return recent, True
+                result = compute()
+                self._write(result_path, result)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self.sweep()
+        return result, False
+
+    def sweep(self, force=False):
+        """
+        キーごとに増える結果・ロックファイルを消す（SWEEP_SECONDS に1回まで）
+
+        結果ファイルは share_seconds を過ぎたもの、ロックファイルは SWEEP_SECONDS より古く
+        どのプロセスも持っていないもの、一時ファイルは SWEEP_SECONDS より古いものを消す。
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._swept_at < SWEEP_SECONDS:
+                return
+            self._swept_at = now
+        try:
+            names = os.listdir(self.lock_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.lock_dir, name)
+            try:
+                age = now - os.stat(path).st_mtime
+                if name.endswith('.result'):
+                    if age > self.share_seconds:
+                        os.remove(path)
+                elif name.endswith('.tmp'):
+                    if age > SWEEP_SECONDS:
+                        os.remove(path)
+                elif name.endswith('.lock') and age > SWEEP_SECONDS:
+                    self._remove_unheld_lock(path)
+            except OSError:
+                continue  # 他のプロセスが先に消した
+
+    @staticmethod
+    def _remove_unheld_lock(path):
+        with open(path, 'a+b') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # 計算中
+            os.remove(path)
+
+    def _read_recent(self, path):
+        try:
+            if time.time() - os.stat(path).st_mtime > self.share_seconds:
+                return None
+            with open(path, 'rb') as f:
+                return decode_snapshot(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path, result):
+        try:
+            data = encode_snapshot(result)
+            fd, tmp_path = tempfile.mkstemp(dir=self.lock_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            # 共有できなくても自分のレスポンスは返せる
+            print(f'single-flight の結果を書き出せませんでした: {e}')
+
+
+def encode_snapshot(snapshot):
+    """(状態, ヘッダー, 本文) を「JSON のヘッダー行 + 改行 + 本文」のバイト列にする"""
+    status, headers, body = snapshot
+    if not isinstance(status, int) or not isinstance(body, bytes):
+        raise TypeError('共有できるのはレスポンス（状態・ヘッダー・本文）だけです')
+    meta = {'status': status, 'headers': [[str(name), str(value)] for name, value in headers]}
+    return json.dumps(meta, ensure_ascii=False).encode('utf-8') + b'\n' + body
+
+
+def decode_snapshot(data):
+    """encode_snapshot の逆（形式が違えば ValueError）"""
+    line, separator, body = data.partition(b'\n')
+    if not separator:
+        raise ValueError('single-flight の結果ファイルの形式が違います')
+    meta = json.loads(line.decode('utf-8'))
+    if not isinstance(meta, dict) or not isinstance(meta.get('status'), int) or \
+            not isinstance(meta.get('headers'), list):
+        raise ValueError('single-flight の結果ファイルの形式が違います')
+    return meta['status'], [(str(name), str(value)) for name, value in meta['headers']], body
+
+
+# ========================
+# Flask
+# ========================
+
+def snapshot_response(response):
+    """ファイル送信（send_file）も含めて本文を読み切り、使い回せる形にする"""
+    response.direct_passthrough = False
+    headers = [(name, value) for name, value in response.headers if name.lower() != 'content-length']
+    return response.status_code, headers, response.get_data()
+
+
+def coalesce(view):
+    """同じリクエストが処理中なら、その結果を待って受け取るデコレータ"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        flight = current_app.extensions.get('single_flight')
+        if flight is None:
+            return view(*args, **kwargs)
+        (status, headers, body), shared = flight.do(
+            http_cache.request_key(), lambda: snapshot_response(make_response(view(*args, **kwargs)))
+        )
+        response = current_app.response_class(body, status=status, headers=headers)
+        response.headers['X-Single-Flight'] = 'shared' if shared else 'leader'
+        return response
+    return wrapper
+
+
+def init_app(app):
+    """single-flight を有効にする（SINGLE_FLIGHT_ENABLED=0 なら coalesce はそのままビューを呼ぶ）"""
+    app.config.setdefault('SINGLE_FLIGHT_ENABLED', os.getenv('SINGLE_FLIGHT_ENABLED', '1') == '1')
+    app.config.setdefault('SINGLE_FLIGHT_DIR', os.getenv('SINGLE_FLIGHT_DIR') or None)
+    app.config.setdefault('SINGLE_FLIGHT_SHARE_SECONDS', float(os.getenv('SINGLE_FLIGHT_SHARE_SECONDS', '2')))
+    if app.config['SINGLE_FLIGHT_ENABLED']:
+        app.extensions['single_flight'] = SingleFlight(
+            app.config['SINGLE_FLIGHT_DIR'], share_seconds=app.config['SINGLE_FLIGHT_SHARE_SECONDS']
+        )
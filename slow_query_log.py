@@ -0,0 +1,174 @@
+"""
+スロークエリログ（EXPLAIN 自動取得付き）
+
+エンジンの全ステートメントの実行時間を計測し、閾値を超えた SELECT について
+同じ接続で EXPLAIN を実行して実行計画を取得する。MySQL では EXPLAIN、
+SQLite（ローカル検証用）では EXPLAIN QUERY PLAN を使う。
+記録はメモリ上の直近分とローテーションするログファイル（JSON Lines）に残し、
+/api/admin/slow-queries で参照できる。
+
+設定（環境変数 または app.config）:
+    SLOW_QUERY_ENABLED        0 で無効（既定: 1）
+    SLOW_QUERY_THRESHOLD_MS   記録する実行時間の閾値（既定: 500）
+    SLOW_QUERY_LOG_PATH       ログファイル（既定: logs/slow_query.log）
+    SLOW_QUERY_MAX_BYTES      ローテーションするサイズ（既定: 5MB）
+    SLOW_QUERY_BACKUP_COUNT   残す世代数（既定: 5）
+    SLOW_QUERY_MAX_ENTRIES    メモリに保持する件数（既定: 200）
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import has_request_context, jsonify, request
+from sqlalchemy import event
+
+
+def explain_statement(dbapi_connection, dialect_name, statement, parameters):
+    """
+    ステートメントの実行計画を取得する
+
+    DBAPI レベルのカーソルを使うため SQLAlchemy のイベントは発火しない。
+    戻り値は (実行計画の行リスト, 推定読み取り行数)。行数が得られない方言では None。
+    """
+    if dialect_name == 'sqlite':
+        explain_sql = 'EXPLAIN QUERY PLAN ' + statement
+    else:
+        explain_sql = 'EXPLAIN ' + statement
+
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(explain_sql, parameters or ())
+        columns = [col[0] for col in cursor.description]
+        plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+    rows_examined = None
+    if dialect_name == 'mysql':
+        rows_examined = sum(int(row.get('rows') or 0) for row in plan)
+    return plan, rows_examined
+
+
+def is_explainable(statement):
+    return statement.lstrip().upper().startswith('SELECT')
+
+
+def current_route():
+    """実行中のリクエストのルート（リクエスト外なら None）"""
+    if not has_request_context():
+        return None
+    rule = request.url_rule.rule if request.url_rule else request.path
+    return f'{request.method} {rule}'
+
+
+class SlowQueryLog:
+    """閾値を超えたステートメントを記録する"""
+
+    def __init__(self, threshold=0.5, max_entries=200, log_path=None, max_bytes=5 * 1024 * 1024, backup_count=5):
+        self.threshold = threshold
+        self.entries = deque(maxlen=max_entries)
+        self.statement_count = 0
+        self._lock = threading.Lock()
+        self._logger = None
+        if log_path:
+            self._logger = logging.getLogger(f'slow_query.{os.path.abspath(log_path)}')
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            if not self._logger.handlers:
+                os.makedirs(os.path.dirname(log_path) or '.', exist_ok=True)
+                self._logger.addHandler(logging.handlers.RotatingFileHandler(
+                    log_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+                ))
+
+    def attach(self, engine):
+        """エンジンに計測用のイベントリスナーを登録"""
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            context._slow_query_started = time.perf_counter()
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = getattr(context, '_slow_query_started', None)
+            if started is None:
+                return
+            elapsed = time.perf_counter() - started
+            self.statement_count += 1
+            if elapsed < self.threshold:
+                return
+            self.record(conn, statement, parameters, elapsed, executemany)
+
+    def record(self, conn, statement, parameters, elapsed, executemany=False):
+        plan = None
+        rows_examined = None
+        if not executemany and is_explainable(statement):
+            try:
+                plan, rows_examined = explain_statement(
+                    conn.connection, conn.dialect.name, statement, parameters
+                )
+            except Exception as e:
+                plan = [{'error': str(e)}]
+
+        entry = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'duration_ms': round(elapsed * 1000, 2),
+            'route': current_route(),
+            'statement': statement,
+            'parameters': parameters if not executemany else f'{len(parameters)} rows',
+            'plan': plan,
+            'rows_examined': rows_examined
+        }
+        with self._lock:
+            self.entries.append(entry)
+        if self._logger is not None:
+            self._logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+        return entry
+
+    def recent(self, limit=None):
+        with self._lock:
+            entries = list(self.entries)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+
+def init_app(app, db):
+    """アプリのエンジンにスロークエリログを組み込み、管理用エンドポイントを登録"""
+    app.config.setdefault('SLOW_QUERY_ENABLED', os.getenv('SLOW_QUERY_ENABLED', '1') == '1')
+    app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', int(os.getenv('SLOW_QUERY_THRESHOLD_MS', '500')))
+    app.config.setdefault('SLOW_QUERY_LOG_PATH', os.getenv('SLOW_QUERY_LOG_PATH', 'logs/slow_query.log'))
+    app.config.setdefault('SLOW_QUERY_MAX_BYTES', int(os.getenv('SLOW_QUERY_MAX_BYTES', str(5 * 1024 * 1024))))
+    app.config.setdefault('SLOW_QUERY_BACKUP_COUNT', int(os.getenv('SLOW_QUERY_BACKUP_COUNT', '5')))
+    app.config.setdefault('SLOW_QUERY_MAX_ENTRIES', int(os.getenv('SLOW_QUERY_MAX_ENTRIES', '200')))
+
+    slow_log = SlowQueryLog(
+        threshold=app.config['SLOW_QUERY_THRESHOLD_MS'] / 1000,
+        max_entries=app.config['SLOW_QUERY_MAX_ENTRIES'],
+        log_path=app.config['SLOW_QUERY_LOG_PATH'],
+        max_bytes=app.config['SLOW_QUERY_MAX_BYTES'],
+        backup_count=app.config['SLOW_QUERY_BACKUP_COUNT']
+    )
+    app.extensions['slow_query_log'] = slow_log
+
+    if app.config['SLOW_QUERY_ENABLED']:
+        with app.app_context():
+            slow_log.attach(db.engine)
+
+    @app.route('/api/admin/slow-queries')
+    def admin_slow_queries():
+        """閾値を超えたクエリの一覧（新しい順）"""
+        limit = request.args.get('limit', type=int)
+        return jsonify({
+            'status': 'success',
+            'enabled': app.config['SLOW_QUERY_ENABLED'],
+            'threshold_ms': app.config['SLOW_QUERY_THRESHOLD_MS'],
+            'statements_timed': slow_log.statement_count,
+            'entries': json.loads(json.dumps(slow_log.recent(limit), default=str))
+        })
+
+    return slow_log
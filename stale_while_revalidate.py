@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+期間集計の stale-while-revalidate キャッシュ
+
+ダッシュボードの利用者は、集計を待つより少し古い数字がすぐ出るほうを好む。
+/api/filtered-data・/api/date-range-data の裏にある期間集計（支店・アカウント別の新規・更新件数、
+支店別の振り分けなし件数）を (集計の種類, 開始日, 終了日) ごとに保持し、
+
+    fresh_seconds 未満      … 保持している値をそのまま返す
+    stale_seconds 未満      … 保持している値をすぐ返し、裏のスレッドで計算し直す
+    それ以上・値がない       … その場で計算する
+
+リクエスト中に使った集計のうち最も古い計算日時を computed_at としてレスポンスに付ける。
+
+設定（環境変数 または app.config）:
+    AGGREGATE_FRESH_SECONDS       計算し直さずに返す秒数（既定: 30）
+    AGGREGATE_STALE_SECONDS       古い値を返しつつ計算し直す秒数の上限（既定: 600）
+    AGGREGATE_REVALIDATE_WORKERS  計算し直すスレッドの数（既定: 2）
+    AGGREGATE_MAX_ENTRIES         保持する集計の数（既定: 512）
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import g, has_request_context
+
+
+class _Entry:
+    def __init__(self, value):
+        self.value = value
+        self.computed_at = datetime.now()
+        self.computed_monotonic = time.monotonic()
+
+    def age_seconds(self):
+        return time.monotonic() - self.computed_monotonic
+
+
+class StaleWhileRevalidateCache:
+    def __init__(self, app, fresh_seconds=30, stale_seconds=600, workers=2, max_entries=512):
+        self.app = app
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='aggregate-revalidate')
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._revalidating = set()
+        self.hits = {'fresh': 0, 'stale': 0, 'miss': 0}
+
+    def get(self, key, compute):
+        """集計の値（必要なら裏で計算し直す）。compute はアプリケーションコンテキスト内で呼ばれる"""
+        with self._lock:
+            entry = self._entries.get(key)
+            age = entry.age_seconds() if entry else None
+            if entry is not None and age < self.fresh_seconds:
+                self.hits['fresh'] += 1
+            elif entry is not None and age < self.stale_seconds:
+                self.hits['stale'] += 1
+                if key not in self._revalidating:
+                    self._revalidating.add(key)
+                    self._executor.submit(self._revalidate, key, compute)
+            else:
+                self.hits['miss'] += 1
+                entry = None
+
+        if entry is None:
+            entry = self._store(key, compute())
+        record_computed_at(entry.computed_at)
+        return entry.value
+
+    def _store(self, key, value):
+        entry = _Entry(value)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _revalidate(self, key, compute):
+        try:
+            with self.app.app_context():
+                self._store(key, compute())
+        except Exception as e:
+            # 失敗しても古い値を返し続ける（次に stale で読まれたときに再試行）
+            print(f'期間集計の再計算に失敗しました {key}: {e}')
+        finally:
+            with self._lock:
+                self._revalidating.discard(key)
+
+    def wait_for_revalidation(self, timeout=10):
+        """裏の再計算が終わるまで待つ（テスト・ベンチマーク用）"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._revalidating:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# ========================
+# レスポンスに付ける計算日時
+# ========================
+
+def record_computed_at(computed_at):
+    """リクエスト中に使った集計のうち最も古い計算日時を覚える"""
+    if not has_request_context():
+        return
+    oldest = g.get('aggregates_computed_at')
+    if oldest is None or computed_at < oldest:
+        g.aggregates_computed_at = computed_at
+
+
+def computed_at():
+    """このリクエストで使った集計の計算日時（ISO 形式。集計を使っていなければ現在時刻）"""
+    value = g.get('aggregates_computed_at') if has_request_context() else None
+    return (value or datetime.now()).isoformat(timespec='seconds')
+
+
+def init_app(app):
+    app.config.setdefault('AGGREGATE_FRESH_SECONDS', float(os.getenv('AGGREGATE_FRESH_SECONDS', '30')))
+    app.config.setdefault('AGGREGATE_STALE_SECONDS', float(os.getenv('AGGREGATE_STALE_SECONDS', '600')))
+    app.config.setdefault('AGGREGATE_REVALIDATE_WORKERS', int(os.getenv('AGGREGATE_REVALIDATE_WORKERS', '2')))
+    app.config.setdefault('AGGREGATE_MAX_ENTRIES', int(os.getenv('AGGREGATE_MAX_ENTRIES', '512')))
+    cache = StaleWhileRevalidateCache(
+        app,
+        fresh_seconds=app.config['AGGREGATE_FRESH_SECONDS'],
+        stale_seconds=app.config['AGGREGATE_STALE_SECONDS'],
+        workers=app.config['AGGREGATE_REVALIDATE_WORKERS'],
+        max_entries=app.config['AGGREGATE_MAX_ENTRIES']
+    )
+    app.extensions['aggregate_cache'] = cache
+    return cache
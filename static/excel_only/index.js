@@ -0,0 +1,144 @@
+async function checkDateData() {
+    const targetDate = document.getElementById('targetDate').value;
+    const summaryDiv = document.getElementById('dateSummary');
+
+    if (!targetDate) {
+        alert('日付を選択してください。');
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/date-summary/${targetDate}`);
+        const result = await response.json();
+
+        if (result.status === 'success') {
+            const data = result.data;
+            summaryDiv.innerHTML = `
+                <h4>📊 ${data.target_date_jp} のデータ状況</h4>
+                <p><strong>新規:</strong> ${data.target_new}件</p>
+                <p><strong>更新:</strong> ${data.target_updated}件</p>
+                <p><strong>合計:</strong> ${data.target_new + data.target_updated}件</p>
+                <hr>
+                <small>
+                前日(${data.prev_date}): 新規${data.prev_new}件 / 更新${data.prev_updated}件<br>
+                翌日(${data.next_date}): 新規${data.next_new}件 / 更新${data.next_updated}件
+                </small>
+            `;
+            summaryDiv.className = 'date-summary';
+            summaryDiv.style.display = 'block';
+        } else {
+            summaryDiv.innerHTML = `<p>❌ エラー: ${result.message}</p>`;
+            summaryDiv.className = 'date-summary error';
+            summaryDiv.style.display = 'block';
+        }
+    } catch (error) {
+        summaryDiv.innerHTML = `<p>❌ データ取得エラー: ${error.message}</p>`;
+        summaryDiv.className = 'date-summary error';
+        summaryDiv.style.display = 'block';
+    }
+}
+
+async function exportExcelByDate() {
+    const targetDate = document.getElementById('targetDate').value;
+    const btn = document.getElementById('exportByDateBtn');
+    const loading = document.getElementById('loadingMsg');
+    const success = document.getElementById('successMsg');
+
+    if (!targetDate) {
+        alert('日付を選択してください。');
+        return;
+    }
+
+    // ボタン無効化とローディング表示
+    if (btn) btn.disabled = true;
+    if (loading) {
+        loading.style.display = 'block';
+        loading.innerHTML = `📈 ${targetDate} のExcel ファイルを生成中...`;
+    }
+    if (success) success.style.display = 'none';
+
+    try {
+        const response = await fetch('/api/export-excel-by-date', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ date: targetDate })
+        });
+
+        if (response.ok) {
+            const blob = await response.blob();
+            const url = window.URL.createObjectURL(blob);
+            const a = document.createElement('a');
+            a.href = url;
+            a.download = `hellowork_hierarchical_report_${targetDate.replace(/-/g, '')}.xlsx`;
+            document.body.appendChild(a);
+            a.click();
+            document.body.removeChild(a);
+            window.URL.revokeObjectURL(url);
+
+            // 成功メッセージ表示
+            if (success) {
+                success.innerHTML = `✅ ${targetDate} のExcel ファイルの出力が完了しました！`;
+                success.style.display = 'block';
+                setTimeout(() => {
+                    success.style.display = 'none';
+                }, 5000);
+            }
+        } else {
+            const errorData = await response.json();
+            alert(`Excel出力に失敗しました: ${errorData.message}`);
+        }
+    } catch (error) {
+        alert('エラーが発生しました: ' + error.message);
+    } finally {
+        // ボタン復元
+        if (btn) btn.disabled = false;
+        if (loading) loading.style.display = 'none';
+    }
+}
+
+async function exportExcel() {
+    const btn = document.getElementById('exportBtn');
+    const loading = document.getElementById('loadingMsg');
+    const success = document.getElementById('successMsg');
+
+    // ボタン無効化とローディング表示
+    btn.disabled = true;
+    btn.innerHTML = '⏳ 生成中...';
+    loading.style.display = 'block';
+    success.style.display = 'none';
+
+    try {
+        const response = await fetch('/api/export-excel', {
+            method: 'POST'
+        });
+
+        if (response.ok) {
+            const blob = await response.blob();
+            const url = window.URL.createObjectURL(blob);
+            const a = document.createElement('a');
+            a.href = url;
+            a.download = `hellowork_hierarchical_report_${new Date().toISOString().split('T')[0].replace(/-/g, '')}.xlsx`;
+            document.body.appendChild(a);
+            a.click();
+            document.body.removeChild(a);
+            window.URL.revokeObjectURL(url);
+
+            // 成功メッセージ表示
+            success.style.display = 'block';
+            setTimeout(() => {
+                success.style.display = 'none';
+            }, 5000);
+        } else {
+            alert('Excel出力に失敗しました。もう一度お試しください。');
+        }
+    } catch (error) {
+        alert('エラーが発生しました: ' + error.message);
+    } finally {
+        // ボタン復元
+        btn.disabled = false;
+        btn.innerHTML = '📊 Excel ファイル出力';
+        loading.style.display = 'none';
+    }
+}
@@ -0,0 +1,87 @@
+// レポート読み込み
+async function loadReport() {
+    const form = document.getElementById('reportForm');
+    const formData = new FormData(form);
+    const params = new URLSearchParams();
+
+    for (let [key, value] of formData.entries()) {
+        params.append(key, value);
+    }
+
+    document.getElementById('reportContent').innerHTML = '<div class="loading">データを読み込み中...</div>';
+
+    try {
+        const response = await fetch(`/api/daily-report?${params}`);
+        const data = await response.json();
+
+        if (data.status === 'success') {
+            displayReport(data.data);
+        } else {
+            document.getElementById('reportContent').innerHTML = 
+                `<div class="status-error">エラー: ${data.message}</div>`;
+        }
+    } catch (error) {
+        document.getElementById('reportContent').innerHTML = 
+            '<div class="status-error">データの読み込みに失敗しました</div>';
+    }
+}
+
+// レポート表示
+function displayReport(data) {
+    if (data.length === 0) {
+        document.getElementById('reportContent').innerHTML = 
+            '<div class="loading">指定された期間にデータがありません</div>';
+        return;
+    }
+
+    let html = '<div class="table-container"><table><thead><tr>';
+    html += '<th>送信日</th><th>支店</th><th>アカウント</th><th>種別</th><th>件数</th>';
+    html += '</tr></thead><tbody>';
+
+    data.forEach(row => {
+        html += `<tr>
+            <td>${row.sent_date}</td>
+            <td>${row.area_name}</td>
+            <td>${row.account_name}</td>
+            <td><span class="status-${row.data_type === '新規' ? 'success' : 'info'}">${row.data_type}</span></td>
+            <td><strong>${row.count}</strong></td>
+        </tr>`;
+    });
+
+    html += '</tbody></table></div>';
+    document.getElementById('reportContent').innerHTML = html;
+}
+
+// Excel出力
+async function exportExcel() {
+    const form = document.getElementById('reportForm');
+    const formData = new FormData(form);
+
+    try {
+        const response = await fetch('/api/export-excel', {
+            method: 'POST',
+            body: formData
+        });
+
+        if (response.ok) {
+            const blob = await response.blob();
+            const url = window.URL.createObjectURL(blob);
+            const a = document.createElement('a');
+            a.href = url;
+            a.download = `hellowork_report_${new Date().toISOString().split('T')[0]}.xlsx`;
+            document.body.appendChild(a);
+            a.click();
+            document.body.removeChild(a);
+            window.URL.revokeObjectURL(url);
+        } else {
+            alert('Excel出力に失敗しました');
+        }
+    } catch (error) {
+        alert('Excel出力でエラーが発生しました');
+    }
+}
+
+// 初期読み込み
+window.onload = function() {
+    loadReport();
+};
@@ -0,0 +1,511 @@
+async function exportHierarchicalReport() {
+    try {
+        const response = await fetch('/api/export-mapping', {
+            method: 'POST'
+        });
+
+        if (response.ok) {
+            const blob = await response.blob();
+            const url = window.URL.createObjectURL(blob);
+            const a = document.createElement('a');
+            a.href = url;
+            a.download = `hellowork_hierarchical_report_${new Date().toISOString().split('T')[0].replace(/-/g, '')}.xlsx`;
+            document.body.appendChild(a);
+            a.click();
+            document.body.removeChild(a);
+            window.URL.revokeObjectURL(url);
+            alert('階層構造レポートのExcel出力が完了しました！\n\n構造:\n支店 → アカウント → 新規/更新 → 件数');
+        } else {
+            alert('Excel出力に失敗しました');
+        }
+    } catch (error) {
+        alert('Excel出力でエラーが発生しました: ' + error.message);
+    }
+}
+
+// 期間指定Excel出力機能
+async function exportWithFilter() {
+    const dateFilter = document.getElementById('dateFilter').value;
+    const startDate = document.getElementById('startDate').value;
+    const endDate = document.getElementById('endDate').value;
+
+    // カスタム期間の場合は日付チェック
+    if (dateFilter === 'custom' && (!startDate || !endDate)) {
+        alert('カスタム期間を選択した場合は、開始日と終了日を入力してください。');
+        return;
+    }
+
+    const requestData = {
+        date_filter: dateFilter,
+        start_date: startDate || null,
+        end_date: endDate || null
+    };
+
+    try {
+        const response = await fetch('/api/export-mapping', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(requestData)
+        });
+
+        if (response.ok) {
+            const blob = await response.blob();
+            const url = window.URL.createObjectURL(blob);
+            const a = document.createElement('a');
+            a.href = url;
+            a.download = `hellowork_data_${dateFilter}_${new Date().toISOString().split('T')[0]}.xlsx`;
+            document.body.appendChild(a);
+            a.click();
+            document.body.removeChild(a);
+            window.URL.revokeObjectURL(url);
+
+            let periodText = '';
+            switch(dateFilter) {
+                case 'today': periodText = '今日'; break;
+                case 'week': periodText = '1週間'; break;
+                case 'month': periodText = '1ヶ月'; break;
+                case 'year': periodText = '1年'; break;
+                case 'custom': periodText = `${startDate}〜${endDate}`; break;
+            }
+            alert(`${periodText}のデータでExcel出力が完了しました！\n\n実際のデータベースから取得したデータです。`);
+        } else {
+            alert('Excel出力に失敗しました');
+        }
+    } catch (error) {
+        alert('Excel出力でエラーが発生しました: ' + error.message);
+    }
+}
+
+// 期間選択の表示制御（要素存在チェック付き）
+const dateFilterElement = document.getElementById('dateFilter');
+if (dateFilterElement) {
+    dateFilterElement.addEventListener('change', function() {
+        const customRange = document.getElementById('customDateRange');
+        if (customRange && this.value === 'custom') {
+            customRange.style.display = 'block';
+        } else if (customRange) {
+            customRange.style.display = 'none';
+        }
+    });
+}
+
+// 期間フィルタ機能
+async function loadDataWithFilter() {
+    const dataFilter = document.getElementById('dataFilter').value;
+    const loadingIndicator = document.getElementById('loadingIndicator');
+    const currentPeriod = document.getElementById('currentPeriod');
+    const currentCount = document.getElementById('currentCount');
+
+    // ローディング表示
+    loadingIndicator.style.display = 'block';
+
+    try {
+        const response = await fetch('/api/filtered-data', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                date_filter: dataFilter
+            })
+        });
+
+        if (response.ok) {
+            const data = await response.json();
+
+            if (data.status === 'success') {
+                // 統計情報を更新
+                currentPeriod.textContent = data.period + 'のデータ';
+                if (data.stale) {
+                    // 集計がタイムアウトしたため、前回計算した値を表示している
+                    currentPeriod.innerHTML += ` <span style="color: #f44336; font-weight: bold;">⚠️ 集計が時間内に終わらなかったため ${data.computed_at.replace('T', ' ')} 時点の値を表示しています</span>`;
+                } else if (data.computed_at) {
+                    // 集計は数分以内に計算した値を使い回す
+                    currentPeriod.textContent += `（${data.computed_at.replace('T', ' ')} 時点の値）`;
+                }
+                currentCount.innerHTML = `
+                    合計: ${data.total_companies.toLocaleString()}件
+                    <span style="margin-left: 15px; color: #4CAF50; font-weight: bold;">新規: ${data.total_new}件</span>
+                    <span style="margin-left: 10px; color: #2196F3;">更新: ${data.total_update}件</span>
+                    <span style="margin-left: 10px; color: #FF9800;">振り分けなし: ${data.total_unassigned}件</span>
+                `;
+
+                // 支店別データテーブルを更新（階層構造）
+                updateAreaTable(data.areas);
+
+                // マッピング情報を更新
+                updateMappingSection(data.areas);
+
+                //alert(`✅ ${data.period_text}のデータを読み込みました（合計: ${data.total_companies.toLocaleString()}件, 新規: ${data.total_new}件, 更新: ${data.total_update}件）`);
+            } else {
+                alert('❌ データ読み込みエラー: ' + data.message);
+            }
+        } else if (response.status === 503) {
+            // 重い集計が混み合っている（Retry-After 秒後に再試行できる）
+            const data = await response.json();
+            alert('⏳ ' + data.message);
+        } else {
+            alert('❌ サーバーエラーが発生しました');
+        }
+    } catch (error) {
+        alert('❌ データ読み込みでエラーが発生しました: ' + error.message);
+    } finally {
+        loadingIndicator.style.display = 'none';
+    }
+}
+
+// 現在の設定で再読み込み
+function loadCurrentData() {
+    loadDataWithFilter();
+}
+
+// テーブル更新関数（データベース構造に忠実な階層表示）
+function updateAreaTable(areas) {
+    const tbody = document.querySelector('#areaTable tbody');
+    if (tbody) {
+        tbody.innerHTML = '';
+
+        areas.forEach(area => {
+            // 支店ヘッダー行
+            const areaRow = tbody.insertRow();
+            areaRow.classList.add('area-header');
+
+            if (area.accounts && area.accounts.length > 0) {
+                // アカウントがある支店
+                areaRow.innerHTML = `
+                    <td colspan="4" style="background-color: #e8f4fd; font-weight: bold; padding: 12px;">
+                        📍 ${area.name} (ID: ${area.id})
+                        <span style="float: right;">
+                            新規: ${area.new_count}件 | 更新: ${area.update_count}件 | 振り分けなし: ${area.unassigned_count}件 | 合計: ${area.total_count}件
+                        </span>
+                    </td>
+                `;
+
+                // アカウント詳細行
+                area.accounts.forEach((account, index) => {
+                    const accountRow = tbody.insertRow();
+                    accountRow.classList.add('account-detail');
+
+                    const isLast = index === area.accounts.length - 1;
+                    const treeChar = isLast ? '└─' : '├─';
+
+                    // needs_helloworkの値に応じて表示を切り替え
+                    let helloworkBadge;
+                    switch(account.needs_hellowork) {
+                        case 0:
+                            helloworkBadge = '<span style="background: #DC3545; color: white; padding: 2px 6px; border-radius: 3px; font-size: 11px;">営業なし</span>';
+                            break;
+                        case 1:
+                            helloworkBadge = '<span style="background: #00FF00; color: black; padding: 2px 6px; border-radius: 3px; font-size: 11px;">WEBなし</span>';
+                            break;
+                        case 2:
+                            helloworkBadge = '<span style="background: #FFC107; color: white; padding: 2px 6px; border-radius: 3px; font-size: 11px;">WEBあり</span>';
+                            break;
+                        case 3:
+                            helloworkBadge = '<span style="background: #007BFF; color: white; padding: 2px 6px; border-radius: 3px; font-size: 11px;">両方対応</span>';
+                            break;
+                        default:
+                            helloworkBadge = '<span style="background: #6C757D; color: white; padding: 2px 6px; border-radius: 3px; font-size: 11px;">不明</span>';
+                    }
+
+                    accountRow.innerHTML = `
+                        <td style="padding-left: 20px;">${treeChar} ${account.name}</td>
+                        <td>${helloworkBadge}</td>
+                        <td>
+                            <div>新規: <strong style="font-weight: bold;">${account.new_count}</strong>件</div>
+                            <div>更新: ${account.update_count}件</div>
+                        </td>
+                        <td>${account.new_count + account.update_count}件</td>
+                    `;
+                });
+
+                // 支店合計行（複数アカウントがある場合のみ）
+                if (area.accounts.length > 1) {
+                    const totalRow = tbody.insertRow();
+                    totalRow.classList.add('area-total');
+                    totalRow.innerHTML = `
+                        <td colspan="3" style="padding-left: 20px; font-weight: bold; color: #2196F3;">
+                            【${area.name} 合計】
+                        </td>
+                        <td style="font-weight: bold; color: #2196F3;">
+                            ${area.new_count + area.update_count}件
+                        </td>
+                    `;
+                }
+            } else {
+                // アカウントがない支店
+                areaRow.innerHTML = `
+                    <td colspan="4" style="background-color: #f5f5f5; font-weight: bold; padding: 12px; color: #666;">
+                        📍 ${area.name} (ID: ${area.id})
+                        <span style="float: right; color: #999;">
+                            関連アカウントなし
+                        </span>
+                    </td>
+                `;
+
+                // 説明行
+                const noAccountRow = tbody.insertRow();
+                noAccountRow.innerHTML = `
+                    <td colspan="4" style="padding-left: 20px; color: #999; font-style: italic;">
+                        └─ この支店には関連するアカウントが設定されていません
+                    </td>
+                `;
+            }
+
+            // 区切り行
+            const separatorRow = tbody.insertRow();
+            separatorRow.innerHTML = `
+                <td colspan="4" style="height: 10px; border: none;"></td>
+            `;
+        });
+    }
+}
+
+function updateAccountTable(accounts) {
+    const tbody = document.querySelector('#accountTable tbody');
+    if (tbody) {
+        tbody.innerHTML = '';
+        accounts.forEach(account => {
+            const row = tbody.insertRow();
+            if (account.needs_hellowork) {
+                row.classList.add('hellowork-enabled');
+            }
+            row.innerHTML = `
+                <td>${account.id}</td>
+                <td><strong>${account.name}</strong></td>
+                <td>${account.needs_hellowork ? '<span class="status-success">✅</span>' : '<span class="status-error">❌</span>'}</td>
+                <td>${account.needs_tabelog ? '<span class="status-success">✅</span>' : '<span class="status-error">❌</span>'}</td>
+                <td>${account.needs_kanri ? '<span class="status-success">✅</span>' : '<span class="status-error">❌</span>'}</td>
+                <td>${account.area_count}支店</td>
+            `;
+        });
+    }
+}
+
+function updateMappingSection(mapping) {
+    // マッピングセクションの更新（簡略化）
+    const mappingSection = document.querySelector('#mappingSection');
+    if (mappingSection && mapping.length > 0) {
+        let html = '<h3>更新済み</h3><ul>';
+        mapping.slice(0, 5).forEach(item => {
+            html += `<li><strong>${item.account_name}</strong> (${item.area_name})</li>`;
+        });
+        html += '</ul>';
+        mappingSection.innerHTML = html;
+    }
+}
+
+// ページ読み込み時の処理（軽量化）
+document.addEventListener('DOMContentLoaded', function() {
+    // 自動読み込みを3秒後に遅延（ページ表示を高速化）
+    setTimeout(loadDataWithFilter, 3000);
+
+    // 今日の日付を初期設定
+    const today = new Date().toISOString().split('T')[0];
+    const startDateElement = document.getElementById('startDate');
+    const endDateElement = document.getElementById('endDate');
+
+    if (startDateElement) startDateElement.value = today;
+    if (endDateElement) endDateElement.value = today;
+});
+
+// 日付範囲設定関数
+function setDateRange(range) {
+    const today = new Date();
+    const startDateInput = document.getElementById('startDate');
+    const endDateInput = document.getElementById('endDate');
+
+    if (range === 'today') {
+        const todayStr = today.toISOString().split('T')[0];
+        startDateInput.value = todayStr;
+        endDateInput.value = todayStr;
+    } else if (range === 'week') {
+        const weekAgo = new Date(today);
+        weekAgo.setDate(today.getDate() - 7);
+        startDateInput.value = weekAgo.toISOString().split('T')[0];
+        endDateInput.value = today.toISOString().split('T')[0];
+    } else if (range === 'month') {
+        const monthAgo = new Date(today);
+        monthAgo.setDate(today.getDate() - 30);
+        startDateInput.value = monthAgo.toISOString().split('T')[0];
+        endDateInput.value = today.toISOString().split('T')[0];
+    }
+}
+
+// 日付範囲でデータ表示
+async function loadDataByDateRange() {
+    const startDate = document.getElementById('startDate').value;
+    const endDate = document.getElementById('endDate').value;
+
+    if (!startDate || !endDate) {
+        alert('開始日と終了日を選択してください。');
+        return;
+    }
+
+    const displayArea = document.getElementById('dateRangeResults');
+    const titleElement = document.getElementById('dateRangeTitle');
+    const contentElement = document.getElementById('dateRangeContent');
+
+    displayArea.style.display = 'block';
+    titleElement.textContent = 'データ読み込み中...';
+    contentElement.innerHTML = '<div style="text-align: center; padding: 20px;">📊 データを取得しています...</div>';
+
+    try {
+        // GET にしておくと、締まった期間はブラウザが ETag で確認し 304 で済む
+        const params = new URLSearchParams({ start_date: startDate, end_date: endDate });
+        const response = await fetch(`/api/date-range-data?${params}`);
+
+        if (response.ok) {
+            const data = await response.json();
+
+            if (data.status === 'success') {
+                titleElement.textContent = `📊 ${data.period_text}のデータ（総計: ${data.total_all}件）`;
+
+                let html = `
+                    <div style="margin-bottom: 20px; padding: 15px; background-color: #e7f3ff; border-radius: 5px;">
+                        <h4>📈 期間別集計</h4>
+                        <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(150px, 1fr)); gap: 15px; margin-top: 10px;">
+                            <div style="text-align: center; padding: 10px; background-color: #d4edda; border-radius: 5px;">
+                                <div style="font-size: 1.5em; font-weight: bold; color: #155724;">${data.total_new}</div>
+                                <div style="color: #155724; font-weight: bold;">新規データ</div>
+                            </div>
+                            <div style="text-align: center; padding: 10px; background-color: #f8f9fa; border-radius: 5px;">
+                                <div style="font-size: 1.5em; color: #856404;">${data.total_update}</div>
+                                <div style="color: #856404;">更新データ</div>
+                            </div>
+                            <div style="text-align: center; padding: 10px; background-color: #fde2e4; border-radius: 5px;">
+                                <div style="font-size: 1.5em; color: #721c24;">${data.total_unassigned}</div>
+                                <div style="color: #721c24;">振り分けなし</div>
+                            </div>
+                            <div style="text-align: center; padding: 10px; background-color: #d1ecf1; border-radius: 5px;">
+                                <div style="font-size: 1.5em; color: #0c5460;">${data.total_all}</div>
+                                <div style="color: #0c5460;">合計</div>
+                            </div>
+                        </div>
+                    </div>
+                `;
+
+                // 支店別詳細
+                html += '<div style="margin-top: 20px;"><h4>🏢 支店別詳細</h4>';
+
+                data.areas.forEach(area => {
+                    html += `
+                        <div style="margin-bottom: 15px; border: 1px solid #ddd; border-radius: 5px; overflow: hidden;">
+                            <div style="background-color: #f8f9fa; padding: 10px; font-weight: bold; border-bottom: 1px solid #ddd;">
+                                ${area.area_name} (新規: ${area.area_new_total}件、更新: ${area.area_update_total}件、振り分けなし: ${area.area_unassigned_total}件、合計: ${area.area_total}件)
+                            </div>
+                            <div style="padding: 10px;">
+                                <table style="width: 100%; border-collapse: collapse;">
+                                    <thead>
+                                        <tr style="background-color: #f0f0f0;">
+                                            <th style="padding: 8px; border: 1px solid #ddd; text-align: left;">アカウント</th>
+                                            <th style="padding: 8px; border: 1px solid #ddd; text-align: center;">新規</th>
+                                            <th style="padding: 8px; border: 1px solid #ddd; text-align: center;">更新</th>
+                                            <th style="padding: 8px; border: 1px solid #ddd; text-align: center;">合計</th>
+                                        </tr>
+                                    </thead>
+                                    <tbody>
+                    `;
+
+                    area.accounts.forEach(account => {
+                        html += `
+                            <tr>
+                                <td style="padding: 8px; border: 1px solid #ddd;">${account.account_name}</td>
+                                <td style="padding: 8px; border: 1px solid #ddd; text-align: center; background-color: #d4edda;"><strong>${account.new_count}</strong></td>
+                                <td style="padding: 8px; border: 1px solid #ddd; text-align: center;">${account.update_count}</td>
+                                <td style="padding: 8px; border: 1px solid #ddd; text-align: center;">${account.total_count}</td>
+                            </tr>
+                        `;
+                    });
+
+                    html += `
+                                    </tbody>
+                                </table>
+                            </div>
+                        </div>
+                    `;
+                });
+
+                html += '</div>';
+                contentElement.innerHTML = html;
+
+            } else {
+                titleElement.textContent = 'エラーが発生しました';
+                contentElement.innerHTML = `<div style="color: #dc3545; padding: 20px;">❌ ${data.message}</div>`;
+            }
+        } else if (response.status === 503) {
+            const data = await response.json();
+            titleElement.textContent = '混み合っています';
+            contentElement.innerHTML = `<div style="color: #dc3545; padding: 20px;">⏳ ${data.message}</div>`;
+        } else {
+            titleElement.textContent = 'データ取得エラー';
+            contentElement.innerHTML = '<div style="color: #dc3545; padding: 20px;">❌ サーバーエラーが発生しました</div>';
+        }
+    } catch (error) {
+        titleElement.textContent = 'エラーが発生しました';
+        contentElement.innerHTML = `<div style="color: #dc3545; padding: 20px;">❌ ${error.message}</div>`;
+    }
+}
+
+// 日付範囲でExcel出力
+async function exportExcelByDateRange() {
+    const startDate = document.getElementById('startDate').value;
+    const endDate = document.getElementById('endDate').value;
+
+    if (!startDate || !endDate) {
+        alert('開始日と終了日を選択してください。');
+        return;
+    }
+
+    try {
+        const response = await fetch('/api/export-date-range', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                start_date: startDate,
+                end_date: endDate
+            })
+        });
+
+        if (response.ok) {
+            const blob = await response.blob();
+            const url = window.URL.createObjectURL(blob);
+            const a = document.createElement('a');
+            a.href = url;
+            a.download = `hellowork_data_${startDate}_to_${endDate}.xlsx`;
+            document.body.appendChild(a);
+            a.click();
+            document.body.removeChild(a);
+            window.URL.revokeObjectURL(url);
+
+            alert(`✅ ${startDate}〜${endDate}のデータでExcel出力が完了しました！`);
+        } else {
+            alert('❌ Excel出力に失敗しました');
+        }
+    } catch (error) {
+        alert('❌ Excel出力でエラーが発生しました: ' + error.message);
+    }
+}
+
+// アコーディオン機能
+function toggleAccordion(sectionId) {
+    const section = document.getElementById(sectionId);
+    const icon = document.getElementById('branchToggleIcon');
+
+    if (section.style.display === 'none') {
+        section.style.display = 'block';
+        icon.textContent = '▲';
+    } else {
+        section.style.display = 'none';
+        icon.textContent = '▼';
+    }
+}
+
+// 旧関数との互換性維持
+async function exportMapping() {
+    return await exportHierarchicalReport();
+}
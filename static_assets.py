@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+内容ハッシュ付きファイル名での静的ファイル配信
+
+static/ の CSS/JS を起動時に読み込み、内容のハッシュをファイル名に入れた URL
+（例: /assets/real_data/index.3f2a9c1b0d.js）で配信する。内容が変われば URL も変わるので、
+ブラウザには Cache-Control: immutable で1年キャッシュさせ、2回目以降の表示では取り直させない。
+
+gzip / brotli に圧縮した本文も起動時に1回だけ作っておき（static/ に build で書き出した
+.gz / .br があればそれを使う）、Accept-Encoding に合わせて返す。brotli は Brotli パッケージが
+入っている場合だけ使う。
+
+テンプレートでは asset_url('real_data/index.js') で URL を得る。
+
+設定（環境変数 または app.config）:
+    STATIC_ASSET_MAX_AGE   ハッシュ付き URL のキャッシュ秒数（既定: 31536000 = 1年）
+    STATIC_ASSETS_RELOAD   1 で static/ の更新を検知して読み直す（既定: デバッグ時のみ）
+
+使い方:
+    # .gz / .br を static/ に書き出す（nginx などの前段で gzip_static / brotli_static を使う場合）
+    python static_assets.py build
+    python static_assets.py show
+"""
+
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import sys
+import threading
+
+from flask import Response, abort, request, url_for
+
+try:
+    import brotli
+except ImportError:  # Brotli が入っていない環境では gzip だけを返す
+    brotli = None
+
+# ハッシュを付けて配信する拡張子
+ASSET_EXTENSIONS = ('.css', '.js')
+HASH_LENGTH = 10
+
+# Accept-Encoding で選ぶ順（先にあるものを優先）
+ENCODINGS = ('br', 'gzip')
+
+
+def fingerprint(filename, data):
+    """'real_data/index.js' -> 'real_data/index.<ハッシュ>.js'"""
+    stem, ext = os.path.splitext(filename)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def compress(data, encoding):
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(data, quality=11)
+    return None
+
+
+class Asset:
+    """1ファイル分の本文・圧縮済みの本文・ハッシュ付きの名前"""
+
+    def __init__(self, filename, path):
+        self.filename = filename
+        self.path = path
+        self.mtime = os.stat(path).st_mtime
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        self.fingerprinted = fingerprint(filename, self.data)
+        self.etag = self.fingerprinted.rsplit('.', 2)[-2]
+        self.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        self.encoded = {}
+        for encoding, suffix in (('gzip', '.gz'), ('br', '.br')):
+            body = self._read_precompressed(path + suffix)
+            if body is None:
+                body = compress(self.data, encoding)
+            # 圧縮しても小さくならないものは元の本文を返す
+            if body is not None and len(body) < len(self.data):
+                self.encoded[encoding] = body
+
+    def _read_precompressed(self, path):
+        """build で書き出したファイルが元のファイルより新しければ使う"""
+        if not os.path.exists(path) or os.stat(path).st_mtime < self.mtime:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def body_for(self, accept_encodings):
+        """(本文, Content-Encoding)"""
+        for encoding in ENCODINGS:
+            if encoding in self.encoded and accept_encodings[encoding]:
+                return self.encoded[encoding], encoding
+        return self.data, None
+
+
+class AssetManifest:
+    """static/ の CSS/JS の一覧（元の名前 -> Asset、ハッシュ付きの名前 -> Asset）"""
+
+    def __init__(self, static_folder, reload=False):
+        self.static_folder = static_folder
+        self.reload = reload
+        self._lock = threading.Lock()
+        self.by_name = {}
+        self.by_fingerprint = {}
+        self.build()
+
+    def _walk(self):
+        for root, _, files in os.walk(self.static_folder):
+            for name in sorted(files):
+                if name.endswith(ASSET_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, self.static_folder).replace(os.sep, '/'), path
+
+    def build(self):
+        assets = [Asset(filename, path) for filename, path in self._walk()]
+        with self._lock:
+            self.by_name = {asset.filename: asset for asset in assets}
+            self.by_fingerprint = {asset.fingerprinted: asset for asset in assets}
+
+    def _changed(self):
+        current = dict(self._walk())
+        if current.keys() != self.by_name.keys():
+            return True
+        return any(os.stat(path).st_mtime != self.by_name[name].mtime for name, path in current.items())
+
+    def _reload_if_changed(self):
+        if self.reload and self._changed():
+            self.build()
+
+    def url_name(self, filename):
+        """ハッシュ付きの名前（対象外のファイルは None）"""
+        self._reload_if_changed()
+        asset = self.by_name.get(filename)
+        return asset.fingerprinted if asset else None
+
+    def lookup(self, fingerprinted):
+        self._reload_if_changed()
+        return self.by_fingerprint.get(fingerprinted)
+
+
+def write_precompressed(static_folder):
+    """static/ の CSS/JS の .gz / .br を書き出す。書き出したファイル数を返す"""
+    written = 0
+    for filename, path in AssetManifest(static_folder)._walk():
+        with open(path, 'rb') as f:
+            data = f.read()
+        for encoding, suffix in (('gzip', '.gz'), ('br', '.br')):
+            body = compress(data, encoding)
+            if body is None:
+                continue
+            with open(path + suffix, 'wb') as f:
+                f.write(body)
+            written += 1
+    return written
+
+
+def init_app(app):
+    """/assets/<ハッシュ付きの名前> と テンプレート関数 asset_url を登録"""
+    app.config.setdefault('STATIC_ASSET_MAX_AGE', int(os.getenv('STATIC_ASSET_MAX_AGE', '31536000')))
+    reload_default = '1' if app.debug else '0'
+    app.config.setdefault('STATIC_ASSETS_RELOAD', os.getenv('STATIC_ASSETS_RELOAD', reload_default) == '1')
+
+    manifest = AssetManifest(app.static_folder, reload=app.config['STATIC_ASSETS_RELOAD'])
+    app.extensions['static_assets'] = manifest
+
+    @app.route('/assets/<path:filename>')
+    def fingerprinted_asset(filename):
+        """ハッシュ付きの名前で CSS/JS を返す（内容が変われば URL が変わるので immutable）"""
+        asset = manifest.lookup(filename)
+        if asset is None:
+            abort(404)
+        if asset.etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            body, encoding = asset.body_for(request.accept_encodings)
+            response = Response(body, mimetype=asset.mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(asset.etag)
+        response.headers['Cache-Control'] = f"public, max-age={app.config['STATIC_ASSET_MAX_AGE']}, immutable"
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    @app.template_global()
+    def asset_url(filename):
+        """CSS/JS のハッシュ付き URL（一覧にないファイルは通常の /static/ の URL）"""
+        name = manifest.url_name(filename)
+        if name is None:
+            return url_for('static', filename=filename)
+        return url_for('fingerprinted_asset', filename=name)
+
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='静的ファイルのハッシュ付きの名前・圧縮済みファイル')
+    parser.add_argument('--static', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build', help='.gz / .br を書き出す')
+    sub.add_parser('show', help='ハッシュ付きの名前とサイズを表示')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        written = write_precompressed(args.static)
+        note = '' if brotli is not None else '（Brotli 未インストールのため .br は省略）'
+        print(f'圧縮済みファイルを書き出しました: {written}件{note}')
+    elif args.command == 'show':
+        manifest = AssetManifest(args.static)
+        for asset in manifest.by_name.values():
+            sizes = ' '.join(f'{encoding} {len(body):,}B' for encoding, body in asset.encoded.items())
+            print(f'{asset.fingerprinted}: {len(asset.data):,}B {sizes}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+受け付け制御のテスト（ローカルSQLite）
+
+重いリクエストの同時実行数が枠で抑えられ、あふれたものは待つか 503 + Retry-After になること、
+軽いリクエストは重いリクエストで枠が埋まっていてもそのまま実行されることを確認する。
+"""
+
+import threading
+import time
+
+import pytest
+
+import admission
+import real_data_app
+
+
+def test_heavy_slots_queue_then_reject():
+    controller = admission.AdmissionController(per_worker=1, queue_seconds=2, max_queue=1)
+    entered = []
+
+    def second():
+        with controller.heavy_slot() as waited:
+            entered.append(waited)
+
+    with controller.heavy_slot():
+        waiter = threading.Thread(target=second)
+        waiter.start()
+        while controller.waiting == 0:
+            time.sleep(0.01)
+        # 待ちが上限に達しているので3本目はすぐ拒否
+        with pytest.raises(admission.AdmissionRejected) as rejected:
+            with controller.heavy_slot():
+                pass
+        assert rejected.value.reason == 'queue_full'
+        time.sleep(0.05)
+    waiter.join()
+
+    assert len(entered) == 1 and entered[0] >= 0.05
+    assert controller.stats()['admitted']['heavy'] == 2 and controller.stats()['rejected'] == 1
+    assert controller.running == 0
+
+
+def test_queue_timeout():
+    controller = admission.AdmissionController(per_worker=1, queue_seconds=0.05)
+    with controller.heavy_slot():
+        with pytest.raises(admission.AdmissionRejected) as rejected:
+            with controller.heavy_slot():
+                pass
+    assert rejected.value.reason == 'queue_timeout'
+
+
+@pytest.mark.skipif(admission.fcntl is None, reason='flock が使えない環境')
+def test_host_slots_are_shared_between_workers(tmp_path):
+    # 同じロックディレクトリを使う2つのコントローラを、別々のワーカープロセスに見立てる
+    first = admission.AdmissionController(per_host=1, host_dir=str(tmp_path), queue_seconds=0.1)
+    second = admission.AdmissionController(per_host=1, host_dir=str(tmp_path), queue_seconds=0.1)
+    with first.heavy_slot():
+        with pytest.raises(admission.AdmissionRejected) as rejected:
+            with second.heavy_slot():
+                pass
+    assert rejected.value.reason == 'host_busy'
+    with second.heavy_slot():
+        pass
+
+
+@pytest.fixture
+def saturated():
+    """重いリクエストの枠を埋めた状態にする（待ちは短く）"""
+    controller = real_data_app.app.extensions['admission']
+    original = controller.per_worker, controller.queue_seconds
+    controller.per_worker, controller.queue_seconds = 1, 0.05
+    with controller.heavy_slot():
+        yield controller
+    controller.per_worker, controller.queue_seconds = original
+
+
+def test_heavy_requests_are_rejected_while_light_lane_stays_open(sales_list_db, saturated):
+    client = real_data_app.app.test_client()
+    with real_data_app.app.app_context():
+        pairs = real_data_app.compute_mapping_size()
+    assert pairs * real_data_app.app.config['ADMISSION_ALL_DAYS'] >= saturated.heavy_cost > pairs
+
+    heavy = client.post('/api/filtered-data', json={'date_filter': 'all'})
+    assert heavy.status_code == 503
+    assert heavy.headers['Retry-After'] == str(saturated.retry_after)
+    assert heavy.get_json()['reason'] == 'queue_timeout'
+
+    light = client.post('/api/filtered-data', json={'date_filter': 'today'})
+    assert light.status_code == 200 and light.headers['X-Admission'] == 'light'
+
+    stats = client.get('/api/admin/admission').get_json()
+    assert stats['running_heavy'] == 1 and stats['rejected'] >= 1
+
+
+def test_long_custom_range_is_heavy(sales_list_db):
+    client = real_data_app.app.test_client()
+    response = client.post('/api/date-range-data', json={'start_date': '2000-01-01', 'end_date': '2025-01-01'})
+    assert response.status_code == 200
+    assert response.headers['X-Admission'] == 'heavy' and 'X-Admission-Wait-Ms' in response.headers
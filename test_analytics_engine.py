@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+DuckDB 分析用バックエンドのテスト（ローカルSQLite + Parquet スナップショット）
+
+長い期間で DuckDB に切り替えても generate_hierarchical_excel_data の出力が
+MySQL（SQLite）で集計した場合と完全に一致することを確認する。
+"""
+
+import json
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import pytest
+
+pytest.importorskip('duckdb')
+pytest.importorskip('pyarrow')
+
+import analytics_engine
+import companies_snapshot
+import count_cube
+import real_data_app
+from conftest import count_statements, seed_sales_list
+
+TODAY = date.today()
+
+
+@pytest.fixture
+def analytics(tmp_path, monkeypatch):
+    m = real_data_app
+    seed_sales_list(areas=3, accounts_per_area=3, companies_per_account=20)
+    with m.app.app_context():
+        companies_snapshot.export(m.db.engine, m.Company.__table__, str(tmp_path))
+    backend = analytics_engine.DuckDBAnalytics(str(tmp_path), min_range_days=90)
+    monkeypatch.setattr(m, 'analytics', backend)
+    monkeypatch.setitem(m.app.config, 'ANALYTICS_ENABLED', True)
+    return backend
+
+
+def test_router_uses_duckdb_only_for_long_ranges(analytics):
+    assert analytics.use_for(None, None)
+    assert analytics.use_for(TODAY - timedelta(days=365), TODAY)
+    assert not analytics.use_for(TODAY - timedelta(days=30), TODAY)
+    assert not analytics_engine.DuckDBAnalytics('/nonexistent').use_for(None, None)
+
+
+def test_router_skips_lagging_snapshot_for_ranges_including_today(analytics, tmp_path):
+    lagging = analytics_engine.DuckDBAnalytics(str(tmp_path), min_range_days=90, max_lag_seconds=900)
+    assert lagging.use_for(None, None)
+
+    # 最後のエクスポートが1時間前なら、それ以降に追加された行を落とさないよう MySQL で数える
+    state_path = tmp_path / companies_snapshot.WATERMARK_FILE
+    state = json.loads(state_path.read_text(encoding='utf-8'))
+    state['exported_at'] = (datetime.now() - timedelta(hours=1)).isoformat(timespec='seconds')
+    state_path.write_text(json.dumps(state), encoding='utf-8')
+
+    assert not lagging.use_for(None, None)
+    assert not lagging.use_for(TODAY - timedelta(days=365), TODAY)
+    assert lagging.use_for(TODAY - timedelta(days=365), TODAY - timedelta(days=1))
+
+
+@pytest.mark.parametrize('date_filter', ['year', 'all'])
+def test_hierarchical_output_matches_mysql_path(analytics, monkeypatch, date_filter):
+    m = real_data_app
+    with m.app.app_context():
+        with count_statements(m.db.engine) as counter:
+            via_duckdb = m.generate_hierarchical_excel_data(date_filter)
+        assert not [s for s in counter.statements if 'companies' in s and 'count(' in s.lower()]
+
+        monkeypatch.setitem(m.app.config, 'ANALYTICS_ENABLED', False)
+        via_sql = m.generate_hierarchical_excel_data(date_filter)
+
+    assert via_duckdb == via_sql
+
+
+def test_unassigned_and_daily_aggregate_match_sql(analytics, monkeypatch):
+    m = real_data_app
+    monkeypatch.setitem(m.app.config, 'ANALYTICS_ENABLED', False)
+    start = TODAY - timedelta(days=365)
+    with m.app.app_context():
+        assert analytics.unassigned_counts_by_area(start, TODAY) == m.get_unassigned_counts_by_area('year')
+        expected = count_cube.daily_aggregate(m.db.session, m.Company)
+
+    assert Counter(analytics.daily_aggregate()) == Counter(tuple(row) for row in expected)
+    pivot = analytics.daily_pivot()
+    assert sum(day['new_count'] + day['update_count'] + day['unassigned_count'] for day in pivot.values()) == 180
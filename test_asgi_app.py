@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ASGI 版データAPIのテスト（ローカルSQLite + aiosqlite）
+
+同期版（Flask）と同じレスポンスを返すこと、列形式のネゴシエーションとエラーの応答、
+SQL の応答待ちの間に他のリクエストが進む（待ちが重なる）ことを確認する。
+"""
+
+import asyncio
+import json
+import time
+from datetime import date, timedelta
+
+import pytest
+
+import asgi_app
+import hellowork_app
+import json_formats
+import real_data_app
+from async_load_test import StatementLatency, call_asgi
+
+MONTH_AGO = str(date.today() - timedelta(days=30))
+
+
+async def request(method, path, query=b'', body=b'', headers=()):
+    """ASGI アプリを直接呼び、(ステータス, ヘッダー, 本文) を返す"""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'headers': list(headers)}
+    await asgi_app.app(scope, receive, send)
+    headers = {name.decode(): value.decode() for name, value in messages[0]['headers']}
+    return messages[0]['status'], headers, messages[1]['body']
+
+
+def run(*coroutines):
+    """コルーチンを同時に実行し、最後にエンジンを閉じる（テストごとにイベントループが変わるため）"""
+    async def main():
+        try:
+            return await asyncio.gather(*coroutines)
+        finally:
+            await asgi_app.app.databases.dispose()
+    return asyncio.run(main())
+
+
+def without_computed_at(payload):
+    return dict(payload, computed_at=None)
+
+
+def test_async_database_url():
+    url = asgi_app.async_database_url('mysql+pymysql://u:p@db/sales_list?charset=utf8mb4')
+    assert url.render_as_string(hide_password=False) == 'mysql+aiomysql://u:p@db/sales_list?charset=utf8mb4'
+    assert str(asgi_app.async_database_url('sqlite:////tmp/a.db')) == 'sqlite+aiosqlite:////tmp/a.db'
+    with pytest.raises(ValueError):
+        asgi_app.async_database_url('postgresql://db/sales_list')
+
+
+@pytest.mark.parametrize('module,method,path,query,body', [
+    (real_data_app, 'POST', '/api/filtered-data', '', {'date_filter': 'month'}),
+    (real_data_app, 'POST', '/api/filtered-data', '', {'date_filter': 'all'}),
+    (real_data_app, 'GET', '/api/date-range-data', f'start_date={MONTH_AGO}&end_date={date.today()}', None),
+    (real_data_app, 'POST', '/api/date-range-data', '', {'start_date': MONTH_AGO, 'end_date': str(date.today())}),
+    (real_data_app, 'GET', '/api/mapping', '', None),
+    (hellowork_app, 'GET', '/api/daily-report', '', None),
+])
+def test_same_response_as_flask(sales_list_db, hellowork_db, module, method, path, query, body):
+    expected = module.app.test_client().open(path, method=method, query_string=query, json=body)
+    status, headers, content = run(request(
+        method, path, query.encode(), json.dumps(body).encode() if body else b''
+    ))[0]
+
+    assert status == expected.status_code == 200
+    assert headers['content-type'] == 'application/json' and headers['vary'] == 'Accept'
+    assert without_computed_at(json.loads(content)) == without_computed_at(expected.get_json())
+
+
+def test_columnar_is_negotiated_by_accept(sales_list_db):
+    (status, headers, content), = run(request(
+        'GET', '/api/mapping', headers=[(b'accept', json_formats.COLUMNAR_MIMETYPE.encode())]
+    ))
+    plain = real_data_app.app.test_client().get('/api/mapping').get_json()
+    assert status == 200 and headers['content-type'] == json_formats.COLUMNAR_MIMETYPE
+    assert json.loads(content) == dict(json_formats.to_columnar(plain), format='columnar')
+
+
+def test_errors(sales_list_db):
+    missing, wrong_method, no_dates = run(
+        request('GET', '/api/unknown'),
+        request('GET', '/api/filtered-data'),
+        request('GET', '/api/date-range-data'),
+    )
+    assert missing[0] == 404
+    assert wrong_method[0] == 405 and wrong_method[1]['allow'] == 'POST'
+    assert no_dates[0] == 400 and json.loads(no_dates[2])['status'] == 'error'
+
+
+def test_statement_waits_overlap(sales_list_db):
+    # SQL 1本ごとに 100ms 待たせても、16本のリクエストの待ちは重なる（順番なら 1.6秒以上）
+    latency = StatementLatency(0.1)
+    latency.install_async(asgi_app.app.databases.engine('sales_list'))
+
+    started = time.monotonic()
+    statuses = run(*(call_asgi(asgi_app.app, 'GET', '/api/mapping', b'', b'') for _ in range(16)))
+    elapsed = time.monotonic() - started
+
+    assert statuses == [200] * 16
+    assert latency.peak >= 8 and elapsed < 0.8
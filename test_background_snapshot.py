@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+トップページの統計スナップショットのテスト（ローカルSQLite）
+
+スナップショットがあればトップページはSQLを発行せずに描画し、集計時刻と古さを表示すること、
+期間ごとの件数が集計関数と一致すること、更新スレッドが周期的に計算し直すことを確認する。
+"""
+
+import time
+
+import pytest
+
+import background_snapshot
+import real_data_app
+from conftest import count_statements
+
+
+def test_index_renders_from_warm_snapshot(sales_list_db):
+    m = real_data_app
+    stats = m.dashboard_stats
+    with m.app.app_context():
+        engine = m.db.engine
+        snapshot = stats.refresh()
+        expected_today = m.get_companies_counts_by_period('today')
+    original_interval = stats.interval_seconds
+    stats.interval_seconds = 3600
+    try:
+        with count_statements(engine) as counter:
+            page = m.app.test_client().get('/').get_data(as_text=True)
+    finally:
+        stats.interval_seconds = original_interval
+        stats.reset()
+    assert counter.count == 0, counter.statements
+
+    today = snapshot['period_totals']['today']
+    assert today['new_count'] == sum(c['new_count'] for c in expected_today.values())
+    assert today['total'] == today['new_count'] + today['update_count'] + today['unassigned_count']
+    assert f"<strong>今日:</strong> {today['total']:,}件" in page
+    assert '時点の集計（0秒前）' in page
+    assert '5,101件' not in page
+
+
+def test_refresher_thread_recomputes_on_interval():
+    m = real_data_app
+    calls = []
+
+    def compute():
+        calls.append(time.monotonic())
+        return len(calls)
+
+    snapshot = background_snapshot.BackgroundSnapshot(m.app, compute, interval_seconds=0.05, name='test-snapshot')
+    snapshot.start()
+    try:
+        deadline = time.monotonic() + 5
+        while len(calls) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        value, computed_at, age = snapshot.get()
+    finally:
+        snapshot.stop()
+    assert len(calls) >= 3
+    assert value >= 3 and computed_at is not None and age < 5
+
+
+def test_failed_refresh_keeps_previous_value():
+    m = real_data_app
+    fail = []
+
+    def compute():
+        if fail:
+            raise RuntimeError('DB停止')
+        return 1
+
+    snapshot = background_snapshot.BackgroundSnapshot(m.app, compute, interval_seconds=0, enabled=False)
+    assert snapshot.get()[0] == 1
+    fail.append(True)
+    with pytest.raises(RuntimeError):
+        snapshot.refresh()
+    assert snapshot.last_error == 'RuntimeError: DB停止'
+    assert snapshot._value == 1
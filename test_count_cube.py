@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+件数キューブ・スナップショットのテスト（ローカルSQLite）
+
+キューブの各期間の集計が SQL の GROUP BY 集計と一致すること、
+今日分の再読み込みで新しい行が反映されること、スナップショットを
+memmap で開いても同じ結果になり、新しい版に差し替わることを確認する。
+"""
+
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+import count_cube
+import cube_snapshot
+import real_data_app
+from conftest import count_statements, seed_sales_list
+
+TODAY = date.today()
+
+PERIODS = [
+    ('today', None, None),
+    ('week', None, None),
+    ('month', None, None),
+    ('year', None, None),
+    ('all', None, None),
+    ('custom', TODAY - timedelta(days=3), TODAY - timedelta(days=1)),
+]
+
+
+@pytest.fixture
+def cube_enabled():
+    real_data_app.count_cube_store.reset()
+    real_data_app.app.config['COUNT_CUBE_ENABLED'] = True
+    yield real_data_app.count_cube_store
+    real_data_app.app.config['COUNT_CUBE_ENABLED'] = False
+    real_data_app.count_cube_store.reset()
+
+
+@pytest.mark.parametrize('date_filter,start_date,end_date', PERIODS)
+def test_cube_windows_match_sql(sales_list_db, date_filter, start_date, end_date):
+    m = real_data_app
+    with m.app.app_context():
+        expected_counts = m.get_companies_counts_by_period(date_filter, start_date, end_date)
+        expected_unassigned = m.get_unassigned_counts_by_area(date_filter, start_date, end_date)
+
+        cube = count_cube.CountCube.load(m.db.session, m.Company)
+        start, end = m.get_period_range(date_filter, start_date, end_date)
+        assert cube.covers(start, end)
+        assert cube.account_counts(start, end) == expected_counts
+        assert cube.unassigned_counts(start, end) == expected_unassigned
+
+
+def test_cube_does_not_cover_days_after_its_end():
+    # 昨日までのキューブ（更新が止まった）で今日を含む期間に 0件を返さない
+    cube = count_cube.CountCube.from_rows(
+        [(TODAY - timedelta(days=2), 1, 1, count_cube.RESULT_NEW, 3)], end_day=TODAY - timedelta(days=1)
+    )
+    assert cube.covers(TODAY - timedelta(days=2), TODAY - timedelta(days=1))
+    assert not cube.covers(TODAY, TODAY)
+    assert not cube.covers(TODAY - timedelta(days=7), TODAY)
+    assert not cube.covers(None, None)
+
+
+def test_refresh_day_picks_up_new_rows(sales_list_db):
+    m = real_data_app
+    with m.app.app_context():
+        cube = count_cube.CountCube.load(m.db.session, m.Company)
+        before = cube.pair_counts(1, 1, TODAY, TODAY)['new_count']
+        week_before = cube.pair_counts(1, 1, TODAY - timedelta(days=7), TODAY)['new_count']
+
+        now = datetime.now()
+        m.db.session.add(m.Company(
+            fm_area_id=1, imported_fm_account_id=1, company_name='追加', job_detail='',
+            fm_import_result=2, created_at=now, updated_at=now
+        ))
+        m.db.session.commit()
+
+        cube.refresh_day(m.db.session, m.Company)
+        assert cube.pair_counts(1, 1, TODAY, TODAY)['new_count'] == before + 1
+        assert cube.pair_counts(1, 1, TODAY - timedelta(days=7), TODAY)['new_count'] == week_before + 1
+
+
+def test_filtered_data_served_from_cube(sales_list_db, cube_enabled):
+    seed_sales_list(areas=3, accounts_per_area=3, companies_per_account=6)
+    client = real_data_app.app.test_client()
+
+    real_data_app.app.config['COUNT_CUBE_ENABLED'] = False
+    expected = client.post('/api/filtered-data', json={'date_filter': 'month'}).get_json()
+
+    real_data_app.app.config['COUNT_CUBE_ENABLED'] = True
+    client.post('/api/filtered-data', json={'date_filter': 'month'})  # キューブの読み込み
+    with real_data_app.app.app_context():
+        engine = real_data_app.db.engine
+    with count_statements(engine) as counter:
+        actual = client.post('/api/filtered-data', json={'date_filter': 'month'}).get_json()
+
+    # computed_at（計算した時刻）以外は同じ
+    assert dict(actual, computed_at=None) == dict(expected, computed_at=None)
+    assert not [s for s in counter.statements if 'companies' in s and 'count(' in s.lower()]
+
+
+# ========================
+# スナップショット
+# ========================
+
+def test_snapshot_round_trip_is_read_only_memmap(sales_list_db, tmp_path):
+    m = real_data_app
+    path = str(tmp_path / 'count_cube.snap')
+    with m.app.app_context():
+        cube = count_cube.CountCube.load(m.db.session, m.Company)
+
+    assert cube_snapshot.publish(cube, path) == 1
+    snapshot, version = cube_snapshot.open_snapshot(path)
+    assert version == 1
+    assert isinstance(snapshot.cumulative, np.memmap)
+    with pytest.raises(ValueError):
+        snapshot.cumulative[0, 0, 0, 0] = 1
+
+    for date_filter, start_date, end_date in PERIODS:
+        start, end = m.get_period_range(date_filter, start_date, end_date)
+        assert snapshot.account_counts(start, end) == cube.account_counts(start, end)
+        assert snapshot.unassigned_counts(start, end) == cube.unassigned_counts(start, end)
+
+
+def test_reader_picks_up_new_version(sales_list_db, tmp_path):
+    m = real_data_app
+    path = str(tmp_path / 'count_cube.snap')
+    reader = cube_snapshot.SnapshotReader(path, check_seconds=0)
+    assert reader.get() is None
+
+    with m.app.app_context():
+        cube = count_cube.CountCube.load(m.db.session, m.Company)
+    cube_snapshot.publish(cube, path)
+    first = reader.get()
+    assert reader.version == 1
+
+    seed_sales_list(areas=3, accounts_per_area=3, companies_per_account=6)
+    with m.app.app_context():
+        cube = count_cube.CountCube.load(m.db.session, m.Company)
+    assert cube_snapshot.publish(cube, path) == 2
+    second = reader.get()
+    assert reader.version == 2
+    assert len(second.area_ids) == 3
+    # 差し替え前に開いていた版も引き続き読める
+    assert first.account_counts(None, None)
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+
+
+def test_app_serves_from_snapshot_without_loading(sales_list_db, cube_enabled, tmp_path, monkeypatch):
+    m = real_data_app
+    path = str(tmp_path / 'count_cube.snap')
+    with m.app.app_context():
+        expected = m.get_companies_counts_by_period('all')
+        cube_snapshot.publish(count_cube.CountCube.load(m.db.session, m.Company), path)
+    cube_enabled.reset()
+
+    monkeypatch.setitem(m.app.config, 'COUNT_CUBE_SNAPSHOT_PATH', path)
+    monkeypatch.setattr(m, 'count_cube_snapshot', cube_snapshot.SnapshotReader(path))
+    with m.app.app_context():
+        with count_statements(m.db.engine) as counter:
+            assert m.get_companies_counts_by_period('all') == expected
+    assert counter.count == 0
+    assert cube_enabled.cube is None
+
+
+def test_stale_snapshot_falls_back_to_sql(sales_list_db, cube_enabled, tmp_path, monkeypatch):
+    m = real_data_app
+    path = str(tmp_path / 'count_cube.snap')
+    with m.app.app_context():
+        expected = m.get_companies_counts_by_period('today')
+        cube = count_cube.CountCube.load(m.db.session, m.Company)
+    cube.refreshed_at -= 600  # 書き込み側が10分前に止まった
+    cube_snapshot.publish(cube, path)
+    cube_enabled.reset()
+
+    reader = cube_snapshot.SnapshotReader(path, max_age_seconds=300)
+    monkeypatch.setitem(m.app.config, 'COUNT_CUBE_SNAPSHOT_PATH', path)
+    monkeypatch.setattr(m, 'count_cube_snapshot', reader)
+    with m.app.app_context():
+        with count_statements(m.db.engine) as counter:
+            assert m.get_companies_counts_by_period('today') == expected
+    assert reader.get() is None and reader.is_stale()
+    assert counter.count > 0
+    # プロセス内でのキューブの読み込みもしない
+    assert cube_enabled.cube is None
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+db_dialect のテスト（ローカルSQLite）
+"""
+
+from datetime import date
+
+from sqlalchemy import func
+
+import db_dialect
+import excel_only_app
+import real_data_app
+
+
+def test_table_introspection_on_sqlite(sales_list_db):
+    with real_data_app.app.app_context():
+        session = real_data_app.db.session
+        assert db_dialect.dialect_name(session) == 'sqlite'
+        assert db_dialect.table_exists(session, 'companies')
+        assert not db_dialect.table_exists(session, 'no_such_table')
+
+        columns = {col['Field']: col for col in db_dialect.describe_table(session, 'companies')}
+        assert columns['id']['Key'] == 'PRI'
+        assert 'fm_import_result' in columns
+        assert db_dialect.server_version(session).startswith('SQLite ')
+
+
+def test_date_of_groups_by_day_as_date(sales_list_db):
+    Company = real_data_app.Company
+    with real_data_app.app.app_context():
+        rows = real_data_app.db.session.query(
+            db_dialect.date_of(Company.created_at),
+            func.count(Company.id)
+        ).group_by(db_dialect.date_of(Company.created_at)).all()
+    assert rows
+    assert all(isinstance(day, date) for day, _ in rows)
+
+
+def test_debug_companies_runs_without_mysql(sales_list_db):
+    body = excel_only_app.app.test_client().get('/api/debug-companies').get_json()
+    assert body['status'] == 'success'
+    assert body['table_exists'] is True
+    assert body['total_count'] > 0
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+/healthz・/readyz のテスト（ローカルSQLite）
+
+/healthz はDBに触れないこと、/readyz は SELECT 1 だけを発行して結果を数秒使い回すこと、
+DBに接続できなければ 503 を返すことを確認する。
+"""
+
+import pytest
+from sqlalchemy import create_engine
+
+import excel_only_app
+import health
+import hellowork_app
+import real_data_app
+from conftest import count_statements
+
+
+def engine_of(module):
+    with module.app.app_context():
+        return module.db.engine
+
+
+@pytest.mark.parametrize('module', [real_data_app, excel_only_app, hellowork_app])
+def test_healthz_and_readyz(module):
+    client = module.app.test_client()
+    engine = engine_of(module)
+    module.app.extensions['readiness'].cache_seconds = 60
+    module.app.extensions['readiness']._result = None
+
+    with count_statements(engine) as counter:
+        assert client.get('/healthz').get_json() == {'status': 'ok'}
+    assert counter.count == 0
+
+    with count_statements(engine) as counter:
+        first = client.get('/readyz')
+        second = client.get('/readyz')
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.get_json()['status'] == 'ready' and not first.get_json()['cached']
+    assert second.get_json()['cached']
+    assert counter.statements == ['SELECT 1']
+
+
+def test_readiness_reports_unreachable_database(tmp_path):
+    readiness = health.ReadinessCheck(
+        create_engine(f"sqlite:///{tmp_path / 'missing' / 'db.sqlite'}"), cache_seconds=0
+    )
+    result, cached = readiness.check()
+    assert not result['ready'] and not cached
+    assert 'OperationalError' in result['error']
+
+    app = real_data_app.app
+    original = app.extensions['readiness']
+    app.extensions['readiness'] = readiness
+    try:
+        response = app.test_client().get('/readyz')
+    finally:
+        app.extensions['readiness'] = original
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'not_ready'
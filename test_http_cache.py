@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+レスポンス圧縮と条件付き GET のテスト（ローカルSQLite）
+
+閾値以上の JSON だけが圧縮されること、マスタと締まった期間のレスポンスに強い ETag が付き、
+If-None-Match が一致すればクエリを1本も発行せずに 304 を返すこと、
+データが変われば ETag も変わることを確認する。
+"""
+
+import gzip
+from datetime import date, timedelta
+
+import pytest
+
+import hellowork_app
+import http_cache
+import real_data_app
+from conftest import count_statements
+
+YESTERDAY = (date.today() - timedelta(days=1)).isoformat()
+TODAY = date.today().isoformat()
+
+
+def engine_of(module):
+    with module.app.app_context():
+        return module.db.engine
+
+
+@pytest.fixture
+def cached_fingerprints():
+    # テストでは毎回計算する設定なので、ここだけ使い回す（304 でクエリが出ないことを確かめる）
+    fingerprints = [
+        real_data_app.master_fingerprint, real_data_app.companies_fingerprint, hellowork_app.master_fingerprint
+    ]
+    for fingerprint in fingerprints:
+        fingerprint.ttl_seconds = 60
+        fingerprint.reset()
+    yield
+    for fingerprint in fingerprints:
+        fingerprint.ttl_seconds = 0
+        fingerprint.reset()
+
+
+def test_large_json_is_compressed(sales_list_db):
+    client = real_data_app.app.test_client()
+    plain = client.post('/api/filtered-data', json={'date_filter': 'all'})
+    compressed = client.post('/api/filtered-data', json={'date_filter': 'all'}, headers={'Accept-Encoding': 'gzip'})
+    assert len(plain.data) >= real_data_app.app.config['COMPRESS_MIN_BYTES']
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert 'Accept-Encoding' in compressed.vary
+
+    small = client.get('/healthz', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+
+
+@pytest.mark.parametrize('module,path', [
+    (real_data_app, '/api/areas'),
+    (real_data_app, '/api/accounts'),
+    (real_data_app, '/api/mapping'),
+    (real_data_app, f'/api/date-range-data?start_date=2020-01-01&end_date={YESTERDAY}'),
+    (hellowork_app, '/api/areas'),
+    (hellowork_app, '/api/accounts'),
+])
+def test_if_none_match_short_circuits_before_queries(sales_list_db, hellowork_db, cached_fingerprints, module, path):
+    client = module.app.test_client()
+    first = client.get(path)
+    etag, weak = first.get_etag()
+    assert first.status_code == 200 and etag and not weak
+
+    with count_statements(engine_of(module)) as counter:
+        second = client.get(path, headers={'If-None-Match': f'"{etag}"'})
+    assert second.status_code == 304 and second.get_etag() == (etag, False)
+    assert counter.count == 0
+
+    # 圧縮した本文の ETag（接尾辞付き）でも一致とみなす
+    compressed = client.get(path, headers={'Accept-Encoding': 'gzip'})
+    if compressed.headers.get('Content-Encoding') == 'gzip':
+        assert compressed.get_etag()[0] == f'{etag}-gzip'
+        revalidated = client.get(path, headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{etag}-gzip"'})
+        assert revalidated.status_code == 304
+
+
+def test_open_period_has_no_etag(sales_list_db):
+    client = real_data_app.app.test_client()
+    response = client.get(f'/api/date-range-data?start_date=2020-01-01&end_date={TODAY}')
+    assert response.status_code == 200 and response.get_etag() == (None, None)
+    assert client.post('/api/date-range-data', json={'start_date': '2020-01-01', 'end_date': TODAY}).status_code == 200
+
+
+def test_etag_changes_with_master_data(sales_list_db):
+    client = real_data_app.app.test_client()
+    before = client.get('/api/areas').get_etag()[0]
+    assert client.get('/api/areas').get_etag()[0] == before
+    with real_data_app.app.app_context():
+        area = real_data_app.FmArea.query.first()
+        area.area_name_ja = area.area_name_ja + '（改）'
+        real_data_app.db.session.commit()
+    after = client.get('/api/areas', headers={'If-None-Match': f'"{before}"'})
+    assert after.status_code == 200 and after.get_etag()[0] != before
+
+
+def test_companies_fingerprint_sees_deletes_and_updates_without_updated_at(sales_list_db):
+    m = real_data_app
+    with m.app.app_context():
+        before = m.compute_companies_fingerprint()
+
+        # 最大IDでも最終更新日時でもない行を消す
+        company = m.Company.query.order_by(m.Company.updated_at, m.Company.id).first()
+        m.db.session.delete(company)
+        m.db.session.commit()
+        after_delete = m.compute_companies_fingerprint()
+        assert after_delete != before
+
+        # updated_at を変えずに取込結果だけを書き換える
+        company = m.Company.query.filter(m.Company.fm_import_result == 2).first()
+        m.db.session.execute(
+            m.Company.__table__.update().where(m.Company.id == company.id).values(fm_import_result=1)
+        )
+        m.db.session.commit()
+        assert m.compute_companies_fingerprint() != after_delete
+
+
+def test_data_fingerprint_is_cached_for_ttl():
+    calls = []
+    fingerprint = http_cache.DataFingerprint(lambda: calls.append(1) or len(calls), ttl_seconds=60)
+    assert fingerprint.current() == fingerprint.current()
+    assert len(calls) == 1
+    fingerprint.reset()
+    fingerprint.current()
+    assert len(calls) == 2
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+インデックスアドバイザーのテスト（ローカルSQLite）
+
+ステートメントの分解で条件の列・演算子・パラメータ位置が取れること、
+インデックスのない companies に対してアプリのルートを実行すると全件走査が検出され、
+候補インデックスが提案されること（移行を適用すると提案されなくなること）を確認する。
+"""
+
+import os
+
+import pytest
+from sqlalchemy import create_engine
+
+import index_advisor
+import schema_migrations
+from conftest import seed_hellowork, seed_sales_list
+
+
+def test_parse_statement_extracts_conditions():
+    parsed = index_advisor.parse_statement(
+        'SELECT companies.fm_area_id, count(companies.id) FROM companies '
+        'WHERE companies.fm_import_result = ? AND companies.created_at >= ? AND companies.created_at < ? '
+        'AND (companies.imported_fm_account_id IS NULL OR companies.imported_fm_account_id = ?) '
+        'AND DATE(companies.updated_at) = ? '
+        'GROUP BY companies.fm_area_id ORDER BY companies.fm_area_id'
+    )
+    conditions = [(c['column'], c['op'], c['func'], c['params']) for c in parsed['conditions']]
+    assert conditions == [
+        ('fm_import_result', '=', None, [0]),
+        ('created_at', '>=', None, [1]),
+        ('created_at', '<', None, [2]),
+        ('updated_at', '=', 'DATE', [4]),
+    ]
+    assert parsed['group_by'] == [('companies', 'fm_area_id')]
+    assert index_advisor.candidate_columns(parsed, 'companies') == ['fm_import_result', 'created_at', 'fm_area_id']
+
+
+def test_unqualified_columns_use_single_table():
+    parsed = index_advisor.parse_statement("SELECT COUNT(*) FROM companies WHERE DATE(created_at) = '2025-10-08'")
+    assert [(c['table'], c['column'], c['func']) for c in parsed['conditions']] == [('companies', 'created_at', 'DATE')]
+
+
+@pytest.fixture
+def urls():
+    # アプリは conftest の一時SQLiteを向いて読み込み済みなので、同じDBに多めに投入する
+    seed_sales_list(areas=3, accounts_per_area=3, companies_per_account=40)
+    seed_hellowork()
+    return os.environ['DATABASE_URL'], os.environ['HELLOWORK_DATABASE_URL']
+
+
+def test_advisor_flags_full_scans_and_ranks_candidates(urls):
+    url, hellowork_url = urls
+    entries = index_advisor.capture_routes(index_advisor.ADVISOR_ROUTES, url, hellowork_url)
+    assert entries
+
+    flagged, ranked = index_advisor.analyze(entries, min_rows=100)
+    assert any(f['issue'] == 'full_scan' and f['table'] == 'companies' for e in flagged for f in e['findings'])
+    assert any('DATE(companies.created_at)' in e['nonsargable'] for e in flagged)
+    assert ranked and all(c['table'] == 'companies' and c['rows_saved'] > 0 for c in ranked)
+    assert [c['rows_saved'] for c in ranked] == sorted((c['rows_saved'] for c in ranked), reverse=True)
+    assert any('CREATE INDEX idx_companies_' in line for line in index_advisor.report_lines(flagged, ranked))
+
+    # 移行のインデックスがあれば、それで賄える候補は出さない
+    engine = create_engine(url)
+    schema_migrations.apply(engine)
+    try:
+        entries = index_advisor.capture_routes(index_advisor.ADVISOR_ROUTES, url, hellowork_url)
+        _, after = index_advisor.analyze(entries, min_rows=100)
+    finally:
+        schema_migrations.rollback(engine, target=0)
+    covered = {tuple(c['columns']) for c in after}
+    assert ('fm_import_result', 'created_at', 'fm_area_id', 'imported_fm_account_id') not in covered
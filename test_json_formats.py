@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+JSON プロバイダと列形式レスポンスのテスト（ローカルSQLite）
+
+列形式への組み替えが元に戻せること、Accept で列形式を求めたときだけ列形式で返すこと、
+orjson のプロバイダと標準のプロバイダで同じ内容になることを確認する。
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+import hellowork_app
+import json_formats
+import real_data_app
+
+COLUMNAR = {'Accept': json_formats.COLUMNAR_MIMETYPE}
+
+
+def test_to_columnar_groups_values_by_key():
+    rows = [
+        {'id': 1, 'name': '札幌', 'accounts': [{'id': 10, 'count': 3}, {'id': 11, 'count': 0}]},
+        {'id': 2, 'name': '仙台', 'accounts': [], 'extra': True},
+    ]
+    columnar = json_formats.to_columnar({'status': 'success', 'areas': rows})
+    assert columnar['status'] == 'success'
+    assert columnar['areas']['id'] == [1, 2]
+    assert columnar['areas']['extra'] == [None, True]
+    assert columnar['areas']['accounts'] == [{'id': [10, 11], 'count': [3, 0]}, []]
+    assert json_formats.from_columnar(columnar['areas'])[1]['name'] == '仙台'
+
+
+@pytest.mark.parametrize('module,method,path,kwargs', [
+    (real_data_app, 'GET', '/api/mapping', {}),
+    (real_data_app, 'POST', '/api/filtered-data', {'json': {'date_filter': 'all'}}),
+    (hellowork_app, 'GET', '/api/daily-report', {}),
+])
+def test_columnar_is_negotiated_by_accept(sales_list_db, hellowork_db, module, method, path, kwargs):
+    client = module.app.test_client()
+    plain = client.open(path, method=method, **kwargs)
+    browser = client.open(path, method=method, headers={'Accept': '*/*'}, **kwargs)
+    columnar = client.open(path, method=method, headers=COLUMNAR, **kwargs)
+
+    assert plain.mimetype == browser.mimetype == 'application/json'
+    # computed_at（集計した時刻）は秒の境目をまたぐとずれるので比べない
+    plain_body = dict(plain.get_json(), computed_at=None)
+    assert plain_body == dict(browser.get_json(), computed_at=None)
+    assert columnar.mimetype == json_formats.COLUMNAR_MIMETYPE
+    assert 'Accept' in plain.vary and 'Accept' in columnar.vary
+
+    body = json.loads(columnar.data)
+    assert body.pop('format') == 'columnar'
+    assert dict(body, computed_at=None) == json_formats.to_columnar(plain_body)
+    assert len(columnar.data) < len(plain.data)
+
+
+def test_fast_provider_matches_default_provider(monkeypatch):
+    payload = {'b': [1, 2], 'a': {'day': date(2025, 10, 8), 'at': datetime(2025, 10, 8, 9, 30), 'rate': Decimal('1.5')}}
+    provider = json_formats.FastJSONProvider(real_data_app.app)
+    monkeypatch.setattr(json_formats, 'orjson', None)
+    expected = json.loads(provider.dumps(payload))
+    monkeypatch.undo()
+
+    if json_formats.orjson is None:
+        pytest.skip('orjson が入っていない')
+    assert json.loads(provider.dumps(payload)) == expected
+    with real_data_app.app.app_context():
+        response = provider.response(payload)
+    assert response.mimetype == 'application/json'
+    assert json.loads(response.data) == expected
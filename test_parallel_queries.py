@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+独立した読み取りクエリの並列実行のテスト（ローカルSQLite）
+
+関数ごとに別のセッション・接続で同時に実行され、待ち時間が合計ではなく一番遅いもの程度に
+なること、リクエストの情報とタイムアウトの上限が引き継がれること、例外の扱いを確認する。
+"""
+
+import threading
+import time
+
+import pytest
+from flask import g, request
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import excel_only_app
+import parallel_queries
+import real_data_app
+
+
+def slow_query(seconds):
+    """sleep してから companies を数える（どのセッションで実行したかも返す）"""
+    def call():
+        time.sleep(seconds)
+        session = real_data_app.db.session()
+        return session, session.execute(text('SELECT COUNT(*) FROM companies')).scalar()
+    return call
+
+
+def test_wall_time_is_the_slowest_query(sales_list_db):
+    app = real_data_app.app
+    with app.app_context():
+        started = time.monotonic()
+        results = parallel_queries.run(slow_query(0.3), slow_query(0.3), slow_query(0.3))
+        elapsed = time.monotonic() - started
+        caller_session = real_data_app.db.session()
+
+    assert elapsed < 0.6
+    # 最後の1本は呼び出し側のスレッドで、リクエストがすでに持っているセッションで実行する
+    sessions = [id(session) for session, _ in results]
+    assert len(set(sessions)) == 3 and sessions[-1] == id(caller_session)
+    assert len({count for _, count in results}) == 1 and results[0][1] > 0
+
+
+def test_request_context_is_copied_and_nested_runs_are_sequential(sales_list_db):
+    app = real_data_app.app
+
+    def inner():
+        # ワーカーの中からの run() はプールを使わず順番に実行
+        return parallel_queries.run(lambda: request.path, lambda: request.path)
+
+    with app.test_request_context('/api/filtered-data'):
+        assert parallel_queries.run(lambda: request.path, inner) == \
+            ['/api/filtered-data', ['/api/filtered-data', '/api/filtered-data']]
+
+
+def test_exceptions_are_raised_or_returned(sales_list_db):
+    def broken():
+        raise ValueError('broken')
+
+    with real_data_app.app.app_context():
+        with pytest.raises(ValueError):
+            parallel_queries.run(lambda: 1, broken)
+        results = parallel_queries.run(lambda: 1, broken, return_exceptions=True)
+    assert results[0] == 1 and isinstance(results[1], ValueError)
+
+
+def test_statement_timeout_reaches_workers(sales_list_db):
+    from test_query_timeouts import SLOW_QUERY
+
+    app, db = real_data_app.app, real_data_app.db
+    with app.test_request_context('/'):
+        g.statement_timeout_ms = 50
+        g.statement_timed_out = False
+        with pytest.raises(OperationalError):
+            parallel_queries.run(lambda: 1, lambda: db.session.execute(SLOW_QUERY))
+        assert g.statement_timed_out
+
+
+def test_sequential_when_disabled(sales_list_db):
+    parallel = parallel_queries.ParallelQueries(real_data_app.app, max_workers=1)
+    with real_data_app.app.app_context():
+        caller_session = real_data_app.db.session()
+        (session, _), = parallel.run(slow_query(0))
+        assert session is caller_session
+
+
+def test_runs_inline_when_workers_are_busy(sales_list_db):
+    # 他のリクエストがワーカーを使い切っていれば、空くのを待たずに呼び出し側で順番に実行
+    parallel = parallel_queries.ParallelQueries(real_data_app.app, max_workers=2)
+    release = threading.Event()
+    busy = threading.Thread(target=lambda: parallel.run(release.wait, release.wait, release.wait))
+    busy.start()
+    try:
+        deadline = time.monotonic() + 5
+        while parallel._idle and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with real_data_app.app.app_context():
+            caller_session = real_data_app.db.session()
+            results = parallel.run(slow_query(0), slow_query(0))
+        assert [session for session, _ in results] == [caller_session, caller_session]
+    finally:
+        release.set()
+        busy.join()
+    assert parallel._idle == 2
+
+
+def test_computed_at_reaches_the_response(sales_list_db):
+    # ワーカーで読んだ期間集計の計算日時がレスポンスの computed_at になる（現在時刻にならない）
+    aggregate_cache = real_data_app.aggregate_cache
+    original = aggregate_cache.fresh_seconds, aggregate_cache.stale_seconds
+    aggregate_cache.clear()
+    aggregate_cache.fresh_seconds = aggregate_cache.stale_seconds = 600
+    try:
+        client = real_data_app.app.test_client()
+        first = client.post('/api/filtered-data', json={'date_filter': 'month'}).get_json()
+        time.sleep(1.1)
+        second = client.post('/api/filtered-data', json={'date_filter': 'month'}).get_json()
+        entries = list(aggregate_cache._entries.values())
+    finally:
+        aggregate_cache.fresh_seconds, aggregate_cache.stale_seconds = original
+        aggregate_cache.clear()
+
+    oldest = min(entry.computed_at for entry in entries).isoformat(timespec='seconds')
+    assert first['computed_at'] == second['computed_at'] == oldest
+
+
+def test_routes_match_sequential_results(sales_list_db):
+    client = real_data_app.app.test_client()
+    parallel = real_data_app.app.extensions['parallel_queries']
+    body = client.post('/api/filtered-data', json={'date_filter': 'month'}).get_json()
+
+    real_data_app.app.extensions['parallel_queries'] = parallel_queries.ParallelQueries(real_data_app.app, 1)
+    try:
+        sequential = client.post('/api/filtered-data', json={'date_filter': 'month'}).get_json()
+    finally:
+        real_data_app.app.extensions['parallel_queries'] = parallel
+    assert body['total_companies'] == sequential['total_companies'] > 0
+    assert body['areas'] == sequential['areas']
+
+    response = excel_only_app.app.test_client().post(
+        '/api/export-excel-by-date', json={'date': time.strftime('%Y-%m-%d')}
+    )
+    assert response.status_code == 200
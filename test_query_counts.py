@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+エンドポイントごとの発行SQL数の回帰テスト
+
+各ルートをローカルSQLiteで実行し、発行されるSQLの数が上限以内であること、
+支店・アカウントを増やしてもSQLの数が増えないこと（アカウント単位のループ
+クエリが紛れ込んでいないこと）を確認する。
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func
+
+import db_dialect
+import excel_only_app
+import hellowork_app
+import real_data_app
+from conftest import count_statements, seed_hellowork, seed_sales_list
+
+TODAY = date.today().isoformat()
+
+# (メソッド, パス, リクエスト引数, SQL数の上限)
+# 件数の概算を使うルート（/, /api/admin/diagnostics, /api/debug-companies）は、件数テーブル（row_estimates）が
+# ないこのテスト環境では有無の確認が1回多い
+# / はテストでは統計のスナップショットを毎回計算する（本番はバックグラウンドで計算し、リクエストは0件）ため、
+# 統計の計算全体（サマリー・マッピング・今日/1週間/1ヶ月の件数）を数える
+# ETag を付けるマスタのルートは、テストではフィンガープリント（マスタの各表を読む）も毎回計算する
+# （本番は FINGERPRINT_SECONDS の間使い回す）
+# 受け付け制御のある集計・出力ルートは、コスト見積もりのマッピング数も毎回数える（本番は ADMISSION_MAPPING_SECONDS）
+REAL_DATA_ROUTES = [
+    ('GET', '/', {}, 13),
+    ('GET', '/api/areas', {}, 4),
+    ('GET', '/api/accounts', {}, 4),
+    ('GET', '/api/mapping', {}, 4),
+    ('POST', '/api/filtered-data', {'json': {'date_filter': 'today'}}, 7),
+    ('POST', '/api/filtered-data', {'json': {'date_filter': 'week'}}, 7),
+    ('POST', '/api/filtered-data', {'json': {'date_filter': 'month'}}, 7),
+    ('POST', '/api/filtered-data', {'json': {'date_filter': 'all'}}, 7),
+    ('POST', '/api/date-range-data', {'json': {'start_date': '2020-01-01', 'end_date': TODAY}}, 5),
+    ('POST', '/api/export-mapping', {'json': {'date_filter': 'month'}}, 6),
+    ('POST', '/api/export-date-range', {'json': {'start_date': '2020-01-01', 'end_date': TODAY}}, 6),
+    ('GET', '/api/debug-unassigned', {}, 2),
+    ('GET', '/api/test', {}, 1),
+    ('GET', '/api/admin/diagnostics', {}, 4),
+    ('GET', '/healthz', {}, 0),
+]
+
+EXCEL_ONLY_ROUTES = [
+    ('GET', '/', {}, 1),
+    ('POST', '/api/export-excel', {}, 2),
+    ('POST', '/api/export-excel-by-date', {'json': {'date': TODAY}}, 2),
+    ('GET', f'/api/date-summary/{TODAY}', {}, 1),
+    ('GET', '/api/debug-companies', {}, 8),
+    ('GET', '/api/test', {}, 2),
+    ('GET', '/healthz', {}, 0),
+]
+
+HELLOWORK_ROUTES = [
+    ('GET', '/', {}, 5),
+    ('GET', '/api/areas', {}, 3),
+    ('GET', '/api/accounts', {}, 3),
+    ('GET', '/api/daily-report', {}, 1),
+    ('POST', '/api/export-excel', {'data': {}}, 1),
+    ('GET', '/api/test', {}, 1),
+    ('GET', '/healthz', {}, 0),
+]
+
+
+def run_route(module, method, path, kwargs):
+    client = module.app.test_client()
+    with module.app.app_context():
+        engine = module.db.engine
+    with count_statements(engine) as counter:
+        response = client.open(path, method=method, **kwargs)
+    assert response.status_code == 200, response.get_data(as_text=True)[:500]
+    return counter
+
+
+def assert_query_count_is_bounded(module, seed, method, path, kwargs, limit):
+    seed(areas=2, accounts_per_area=2)
+    small = run_route(module, method, path, kwargs)
+    assert small.count <= limit, small.statements
+
+    # 支店もアカウントも増やしてもSQLの数は変わらない
+    seed(areas=6, accounts_per_area=5)
+    large = run_route(module, method, path, kwargs)
+    assert large.count == small.count, large.statements
+
+
+@pytest.mark.parametrize('method,path,kwargs,limit', REAL_DATA_ROUTES)
+def test_real_data_app_query_count(method, path, kwargs, limit):
+    assert_query_count_is_bounded(real_data_app, seed_sales_list, method, path, kwargs, limit)
+
+
+@pytest.mark.parametrize('method,path,kwargs,limit', EXCEL_ONLY_ROUTES)
+def test_excel_only_app_query_count(method, path, kwargs, limit):
+    assert_query_count_is_bounded(excel_only_app, seed_sales_list, method, path, kwargs, limit)
+
+
+@pytest.mark.parametrize('method,path,kwargs,limit', HELLOWORK_ROUTES)
+def test_hellowork_app_query_count(method, path, kwargs, limit):
+    assert_query_count_is_bounded(hellowork_app, seed_hellowork, method, path, kwargs, limit)
+
+
+def test_real_data_counts_match_per_account_queries():
+    """集計クエリの結果がアカウント単位の個別クエリと一致する"""
+    seed_sales_list(areas=3, accounts_per_area=3, companies_per_account=6)
+    with real_data_app.app.app_context():
+        grouped = real_data_app.get_companies_counts_by_period(date_filter='week')
+        for item in real_data_app.get_area_account_mapping():
+            single = real_data_app.get_companies_data_by_period(
+                item['area_id'], item['account_id'], date_filter='week'
+            )
+            counts = grouped.get((item['area_id'], item['account_id']), {})
+            assert counts.get('new_count', 0) == single['new_count']
+            assert counts.get('update_count', 0) == single['update_count']
+
+
+def test_excel_only_summary_matches_per_count_queries():
+    """1回の走査の条件付き集計が、DATE() で1件ずつ数える従来のクエリと一致する"""
+    seed_sales_list(areas=3, accounts_per_area=3, companies_per_account=6)
+    m = excel_only_app
+    today = date.today()
+    with m.app.app_context():
+        m.company_total.reset()
+        created = db_dialect.date_of(m.Company.created_at)
+        updated = db_dialect.date_of(m.Company.updated_at)
+
+        def count(*conditions):
+            return m.db.session.query(func.count(m.Company.id)).filter(*conditions).scalar()
+
+        week_ago = today - timedelta(days=7)
+        month_start = today.replace(day=1)
+        summary = m.get_companies_summary(include_mapping_counts=True)
+        assert summary['total_companies'] == count()
+        assert summary['today_new'] == count(created == today, m.Company.fm_import_result == 2)
+        assert summary['week_updated'] == count(
+            created >= week_ago, created <= today, m.Company.fm_import_result == 1
+        )
+        assert summary['month_new'] == count(created >= month_start, created <= today)
+        assert summary['month_updated'] == count(updated >= month_start, updated <= today, created != updated)
+        mapping = m.get_area_account_mapping()
+        assert summary['total_areas'] == len({item['area_name'] for item in mapping})
+        assert summary['hellowork_accounts'] == len(mapping)
+
+        for day in (today - timedelta(days=2), today):
+            by_date = m.get_companies_summary_by_date(day)
+            assert by_date['total_companies'] == count()
+            assert by_date['target_new'] == count(created == day, m.Company.fm_import_result == 2)
+            assert by_date['prev_updated'] == count(
+                created == day - timedelta(days=1), m.Company.fm_import_result == 1
+            )
+
+
+def test_excel_only_export_uses_real_per_account_counts():
+    """Excel の各アカウントの件数が、支店・アカウントで絞った個別のクエリと一致する（按分ではない）"""
+    seed_sales_list(areas=3, accounts_per_area=3, companies_per_account=6)
+    m = excel_only_app
+    today = date.today()
+    with m.app.app_context():
+        created = db_dialect.date_of(m.Company.created_at)
+        rows = m.generate_hierarchical_excel_data_by_date(today)
+        counts = [row['件数'] for row in rows if row['種別'] in ('新規', '更新')]
+        expected = []
+        for item in m.get_area_account_mapping():
+            for result in (2, 1):
+                expected.append(m.db.session.query(func.count(m.Company.id)).filter(
+                    created == today,
+                    m.Company.fm_import_result == result,
+                    m.Company.fm_area_id == item['area_id'],
+                    m.Company.imported_fm_account_id == item['account_id']
+                ).scalar())
+        assert counts == expected
+        assert len(set(counts)) > 1
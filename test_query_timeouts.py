@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ステートメントタイムアウトのテスト（ローカルSQLite）
+
+上限を過ぎたステートメントが中断されること、タイムアウトしたルートは 0件を返さず、
+前回成功したレスポンスを stale: true で返すこと（前回値がなければ 504）を確認する。
+"""
+
+import json
+from datetime import date, timedelta
+
+import pytest
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import json_formats
+import query_timeouts
+import real_data_app
+
+# SQLite で数秒かかる再帰 CTE
+SLOW_QUERY = text(
+    'WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 50000000) SELECT COUNT(*) FROM n'
+)
+
+
+def test_mysql_hint_is_added_to_selects_only():
+    assert query_timeouts.add_max_execution_time('SELECT a FROM t', 1500) == \
+        'SELECT /*+ MAX_EXECUTION_TIME(1500) */ a FROM t'
+    assert query_timeouts.add_max_execution_time('  select count(*) from t', 10).startswith(
+        'SELECT /*+ MAX_EXECUTION_TIME(10) */ count(*)'
+    )
+    assert query_timeouts.add_max_execution_time('UPDATE t SET a = 1', 10) == 'UPDATE t SET a = 1'
+
+
+def test_timeout_errors_are_recognised():
+    class OperationalError(Exception):
+        pass
+
+    assert query_timeouts.is_timeout_error(OperationalError(3024, 'maximum statement execution time exceeded'))
+    assert query_timeouts.is_timeout_error(OperationalError('interrupted'))
+    assert not query_timeouts.is_timeout_error(OperationalError(2013, 'Lost connection'))
+
+
+def test_sqlite_statement_is_interrupted(sales_list_db):
+    app, db = real_data_app.app, real_data_app.db
+    with app.test_request_context('/'):
+        g.statement_timeout_ms = 50
+        with pytest.raises(OperationalError):
+            db.session.execute(SLOW_QUERY)
+        assert g.statement_timed_out
+        db.session.rollback()
+
+        # 上限のないステートメントは中断されない（進捗ハンドラが残っていない）
+        g.statement_timeout_ms = None
+        assert db.session.execute(text('SELECT COUNT(*) FROM companies')).scalar() > 0
+
+
+@pytest.fixture
+def slow_counts(monkeypatch):
+    """期間の集計を遅いクエリに差し替え、上限を 50ms にする"""
+    app = real_data_app.app
+    app.extensions['last_good'].clear()
+
+    def enable():
+        def slow(*args, **kwargs):
+            real_data_app.db.session.execute(SLOW_QUERY)
+            return {}
+        monkeypatch.setattr(real_data_app, 'get_companies_counts_by_period', slow)
+        monkeypatch.setitem(app.config, 'STATEMENT_TIMEOUTS', {'get_filtered_data': 50})
+
+    yield enable
+    app.extensions['last_good'].clear()
+
+
+def test_timeout_serves_last_good_value_as_stale(sales_list_db, slow_counts):
+    client = real_data_app.app.test_client()
+    fresh = client.post('/api/filtered-data', json={'date_filter': 'month'})
+    assert fresh.status_code == 200 and 'stale' not in fresh.get_json()
+
+    slow_counts()
+    stale = client.post('/api/filtered-data', json={'date_filter': 'month'})
+    body = stale.get_json()
+    assert stale.status_code == 200 and stale.headers['X-Stale'] == 'true'
+    assert body['stale'] is True and body['stale_reason'] == 'timeout' and body['computed_at']
+    assert body['total_companies'] == fresh.get_json()['total_companies'] > 0
+    assert body['areas'] == fresh.get_json()['areas']
+
+    # 前回値のないリクエストは 0件ではなくエラー
+    missing = client.post('/api/filtered-data', json={'date_filter': 'week'})
+    assert missing.status_code == 504
+    assert missing.get_json()['timeout'] is True and 'total_new' not in missing.get_json()
+
+
+def test_stale_closed_period_has_no_etag(sales_list_db, slow_counts, monkeypatch):
+    client = real_data_app.app.test_client()
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    path = f'/api/date-range-data?start_date={yesterday}&end_date={yesterday}'
+    fresh = client.get(path)
+    assert fresh.status_code == 200 and fresh.headers.get('ETag')
+
+    slow_counts()
+    monkeypatch.setitem(real_data_app.app.config, 'STATEMENT_TIMEOUTS', {'get_date_range_data': 50})
+    stale = client.get(path)
+    assert stale.status_code == 200 and stale.headers['X-Stale'] == 'true'
+    # 前回の値をブラウザが今の ETag で覚えると、以後の確認が 304 になり新しい値が届かない
+    assert 'ETag' not in stale.headers
+
+
+def test_stale_columnar_response_keeps_headers(sales_list_db, slow_counts):
+    client = real_data_app.app.test_client()
+    columnar = {'Accept': json_formats.COLUMNAR_MIMETYPE}
+    fresh = client.post('/api/filtered-data', json={'date_filter': 'month'}, headers=columnar)
+
+    slow_counts()
+    stale = client.post('/api/filtered-data', json={'date_filter': 'month'}, headers=columnar)
+    assert stale.mimetype == json_formats.COLUMNAR_MIMETYPE and 'Accept' in stale.vary
+    body = json.loads(stale.get_data())
+    assert body['stale'] is True and body['format'] == 'columnar'
+    assert body['computed_at'] == json.loads(fresh.get_data())['computed_at']
+    assert body['areas'] == json.loads(fresh.get_data())['areas']
+
+
+def test_only_json_is_kept_as_last_good(sales_list_db, slow_counts):
+    app = real_data_app.app
+    client = app.test_client()
+    today = date.today().isoformat()
+    export = client.post('/api/export-date-range', json={'start_date': '2020-01-01', 'end_date': today})
+    assert export.status_code == 200 and export.mimetype != 'application/json'
+    assert app.extensions['last_good'].total_bytes == 0
+
+    client.post('/api/filtered-data', json={'date_filter': 'month'})
+    assert app.extensions['last_good'].total_bytes > 0
+
+
+def test_last_good_is_capped_by_bytes():
+    cache = query_timeouts.LastGoodCache(max_entries=10, max_bytes=100)
+    cache.put('a', (200, [], b'x' * 60))
+    cache.put('b', (200, [], b'x' * 30))
+    cache.put('a', (200, [], b'x' * 40))
+    assert cache.total_bytes == 70 and cache.get('b') is not None
+
+    # 合計が上限を超えたら古いものから捨てる（上限より大きい本文は保持しない）
+    cache.put('c', (200, [], b'x' * 50))
+    assert cache.get('b') is None and cache.total_bytes == 90
+    cache.put('d', (200, [], b'x' * 101))
+    assert cache.get('d') is None and cache.total_bytes == 90
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+件数の概算（row_estimates）のテスト（ローカルSQLite）
+
+件数テーブルがなければ正確に数え、refresh 後は件数テーブルの値を概算として返すこと、
+?exact=1 では常に正確に数えること、件数テーブルがあると診断のSQLが増えないことを確認する。
+"""
+
+import pytest
+
+import excel_only_app
+import real_data_app
+import row_estimates
+from conftest import count_statements, seed_sales_list
+
+
+@pytest.fixture
+def engine(sales_list_db):
+    m = real_data_app
+    with m.app.app_context():
+        engine = m.db.engine
+    yield engine
+    # 後続のテストが古い件数テーブルを読まないように片付ける
+    row_estimates.COUNTER_TABLE.drop(engine, checkfirst=True)
+    row_estimates._counter_table_seen.clear()
+
+
+def add_companies(count):
+    m = real_data_app
+    with m.app.app_context():
+        for _ in range(count):
+            m.db.session.add(m.Company(fm_area_id=1, company_name='追加', job_detail='', fm_import_result=2))
+        m.db.session.commit()
+
+
+def test_estimates_fall_back_to_exact_then_use_counter_table(engine):
+    with engine.connect() as connection:
+        total = row_estimates.table_total(connection, 'companies')
+        assert total['source'] == 'exact' and not total['approximate']
+        exact_total = total['count']
+
+    row_estimates.refresh(engine)
+    add_companies(2)
+
+    with engine.connect() as connection:
+        estimate = row_estimates.table_total(connection, 'companies')
+        assert estimate['approximate'] and estimate['source'] == 'counter_table'
+        assert estimate['count'] == exact_total
+        assert row_estimates.table_total(connection, 'companies', exact=True)['count'] == exact_total + 2
+
+        by_area = row_estimates.group_counts(connection, 'companies', 'fm_area_id')
+        exact_by_area = row_estimates.group_counts(connection, 'companies', 'fm_area_id', exact=True)
+        assert by_area['approximate'] and sum(by_area['counts'].values()) == exact_total
+        assert exact_by_area['counts'][1] == by_area['counts'][1] + 2
+
+        # 古すぎる件数テーブルは使わない
+        assert row_estimates.table_total(connection, 'companies', max_age_seconds=-1)['source'] == 'exact'
+
+
+def test_app_routes_mark_approximate_counts(engine, monkeypatch):
+    m = real_data_app
+    row_estimates.refresh(engine)
+    add_companies(3)
+    client = m.app.test_client()
+
+    approximate = client.get('/api/admin/diagnostics').get_json()['data_summary']
+    exact = client.get('/api/admin/diagnostics?exact=1').get_json()['data_summary']
+    assert approximate['approximate'] and not exact['approximate']
+    assert exact['total_companies'] == approximate['total_companies'] + 3
+
+    # 件数テーブルがあれば、支店別件数は支店への外部結合1回で読む（バージョン・件数・アカウント）
+    with count_statements(engine) as counter:
+        client.get('/api/admin/diagnostics')
+    assert counter.count <= 3, counter.statements
+
+    page = client.get('/').get_data(as_text=True)
+    assert '約' + str(approximate['total_companies']) + '件の企業データ' in page
+
+    debug = excel_only_app.app.test_client().get('/api/debug-companies').get_json()
+    assert debug['total_count_approximate'] and debug['total_count_source'] == 'counter_table'
+    assert debug['total_count'] == approximate['total_companies']
+
+    # 古い件数テーブルは使わず正確に数える
+    monkeypatch.setitem(excel_only_app.app.config, 'ROW_ESTIMATE_MAX_AGE_SECONDS', -1)
+    debug = excel_only_app.app.test_client().get('/api/debug-companies').get_json()
+    assert debug['total_count_source'] == 'exact' and debug['total_count'] == exact['total_companies']
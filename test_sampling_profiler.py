@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+sampling_profiler のテスト（DB不要）
+"""
+
+import time
+
+from flask import Flask
+
+import sampling_profiler
+
+
+def slow_report_body():
+    time.sleep(0.15)
+    return 'ok'
+
+
+def make_app(tmp_path, threshold_ms):
+    app = Flask(__name__)
+    app.config['PROFILER_ENABLED'] = True
+    app.config['PROFILER_THRESHOLD_MS'] = threshold_ms
+    app.config['PROFILER_INTERVAL_MS'] = 2
+    app.config['PROFILER_DIR'] = str(tmp_path)
+    profiler = sampling_profiler.init_app(app)
+
+    @app.route('/slow/<int:n>')
+    def slow(n):
+        return slow_report_body()
+
+    @app.route('/fast')
+    def fast():
+        return 'ok'
+
+    return app, profiler
+
+
+def test_slow_request_is_recorded_per_route(tmp_path):
+    app, profiler = make_app(tmp_path, threshold_ms=50)
+    client = app.test_client()
+    try:
+        assert client.get('/slow/1').status_code == 200
+        assert client.get('/fast').status_code == 200
+
+        listing = client.get('/api/admin/profiles').get_json()
+        routes = {item['route']: item for item in listing['routes']}
+        assert list(routes) == ['/slow/<int:n>']
+        assert routes['/slow/<int:n>']['slow_requests'] == 1
+
+        key = routes['/slow/<int:n>']['key']
+        folded = client.get(f'/api/admin/profiles/{key}').get_data(as_text=True)
+        assert 'test_sampling_profiler:slow_report_body' in folded
+
+        # ファイルにも同じ内容が書き出されている
+        with open(routes['/slow/<int:n>']['file'], encoding='utf-8') as f:
+            assert f.read() == folded
+    finally:
+        profiler.stop()
+
+
+def test_rolling_window_keeps_recent_requests_only(tmp_path):
+    app, profiler = make_app(tmp_path, threshold_ms=50)
+    profiler.window = 2
+    client = app.test_client()
+    try:
+        for n in range(3):
+            client.get(f'/slow/{n}')
+        assert profiler.routes()['/slow/<int:n>']['slow_requests'] == 2
+    finally:
+        profiler.stop()
+
+
+def test_disabled_profiler_records_nothing(tmp_path):
+    app, profiler = make_app(tmp_path, threshold_ms=0)
+    app.config['PROFILER_ENABLED'] = False
+    client = app.test_client()
+    client.get('/slow/1')
+    assert profiler.routes() == {}
+    assert client.get('/api/admin/profiles/slow_int_n').status_code == 404
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+single-flight のテスト（ローカルSQLite）
+
+同じ内容の同時リクエストが1回の計算にまとまり、全員が同じレスポンスを受け取ること、
+内容が違えば別々に計算されること、プロセス間（ロックファイル）でもまとまることを確認する。
+"""
+
+import os
+import pickle
+import threading
+import time
+
+import pytest
+
+import real_data_app
+import single_flight
+
+RESPONSE = (200, [('Content-Type', 'application/json'), ('Vary', 'Accept')], b'{"rows": [1, 2, 3]}')
+
+
+def wait_for_waiters(flight, key, count, timeout=5):
+    """処理中の計算を count 件が待つまで待つ（key が None ならどのキーでも）"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        keys = list(flight._calls) if key is None else [key]
+        if any((flight.in_flight(k) or 0) >= count for k in keys):
+            return
+        time.sleep(0.01)
+    raise AssertionError(f'{count}件の待ちが揃いませんでした')
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = single_flight.SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return 'result'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', compute))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    wait_for_waiters(flight, 'key', 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [('result', False)] + [('result', True)] * 4
+    assert flight.in_flight('key') is None
+
+
+def test_errors_reach_every_waiter():
+    flight = single_flight.SingleFlight()
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        raise ValueError('集計に失敗')
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('key', compute)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_for_waiters(flight, 'key', 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert errors == ['集計に失敗'] * 3
+
+
+@pytest.mark.skipif(single_flight.fcntl is None, reason='flock が使えない環境')
+def test_lock_directory_shares_across_instances(tmp_path):
+    # 同じロックディレクトリを使う2つのインスタンスを、別々のワーカープロセスに見立てる
+    first = single_flight.SingleFlight(str(tmp_path), share_seconds=5)
+    second = single_flight.SingleFlight(str(tmp_path), share_seconds=5)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return RESPONSE
+
+    results = {}
+    leader = threading.Thread(target=lambda: results.update(first=first.do('key', compute)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.update(second=second.do('key', compute)))
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(calls) == 1
+    assert results == {'first': (RESPONSE, False), 'second': (RESPONSE, True)}
+
+
+@pytest.mark.skipif(single_flight.fcntl is None, reason='flock が使えない環境')
+def test_result_files_are_not_unpickled(tmp_path):
+    # 置き場に書き込めるだけでワーカーでコードを実行できないよう、結果ファイルは pickle で読まない
+    flight = single_flight.SingleFlight(str(tmp_path), share_seconds=5)
+    flight.do('key', lambda: RESPONSE)
+    result_path, = tmp_path.glob('*.result')
+    assert result_path.read_bytes().endswith(b'\n' + RESPONSE[2])
+
+    result_path.write_bytes(pickle.dumps(RESPONSE))
+    assert flight.do('key', lambda: (200, [], b'fresh')) == ((200, [], b'fresh'), False)
+
+
+@pytest.mark.skipif(single_flight.fcntl is None, reason='flock が使えない環境')
+def test_old_result_and_lock_files_are_swept(tmp_path):
+    flight = single_flight.SingleFlight(str(tmp_path), share_seconds=2)
+    for day in range(5):
+        flight.do(('GET', '/api/date-range-data', f'start_date=2024-01-0{day + 1}'), lambda: RESPONSE)
+    assert len(list(tmp_path.glob('*.result'))) == 5
+
+    # 共有期間とロックの保持期間を過ぎた扱いにする（1つは別のプロセスが計算中）
+    old = time.time() - single_flight.SWEEP_SECONDS - 1
+    for path in tmp_path.iterdir():
+        os.utime(path, (old, old))
+    held = sorted(tmp_path.glob('*.lock'))[0]
+    with open(held, 'a+b') as lock_file:
+        single_flight.fcntl.flock(lock_file, single_flight.fcntl.LOCK_EX)
+        flight.sweep(force=True)
+
+    assert list(tmp_path.glob('*.result')) == []
+    assert list(tmp_path.glob('*.lock')) == [held]
+
+
+def test_identical_route_requests_are_coalesced(sales_list_db, monkeypatch):
+    app = real_data_app.app
+    flight = app.extensions['single_flight']
+    release = threading.Event()
+    calls = []
+    original = real_data_app.get_companies_counts_by_period
+
+    def slow_counts(*args, **kwargs):
+        calls.append(args)  # 画面用の集計は (期間フィルタ, 開始日, 終了日) で呼ばれる
+        release.wait(5)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(real_data_app, 'get_companies_counts_by_period', slow_counts)
+
+    responses = []
+
+    def post(date_filter):
+        response = app.test_client().post('/api/filtered-data', json={'date_filter': date_filter})
+        responses.append((date_filter, response.headers['X-Single-Flight'], response.get_json()))
+
+    threads = [threading.Thread(target=post, args=('month',)) for _ in range(4)]
+    threads.append(threading.Thread(target=post, args=('week',)))
+    for thread in threads:
+        thread.start()
+    wait_for_waiters(flight, None, 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == len(set(calls)) == 2
+    month = [r for r in responses if r[0] == 'month']
+    assert sorted(r[1] for r in month) == ['leader', 'shared', 'shared', 'shared']
+    assert all(r[2] == month[0][2] and r[2]['status'] == 'success' for r in month)
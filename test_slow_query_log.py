@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+slow_query_log のテスト（ローカルSQLiteで EXPLAIN QUERY PLAN を確認）
+"""
+
+import json
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func
+
+import slow_query_log
+
+
+def make_app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path}/slow.db'
+    app.config['SLOW_QUERY_THRESHOLD_MS'] = 0
+    app.config['SLOW_QUERY_LOG_PATH'] = str(tmp_path / 'slow_query.log')
+    db = SQLAlchemy(app)
+
+    class Company(db.Model):
+        __tablename__ = 'companies'
+        id = db.Column(db.Integer, primary_key=True)
+        fm_area_id = db.Column(db.Integer)
+        created_at = db.Column(db.DateTime)
+
+    slow_log = slow_query_log.init_app(app, db)
+
+    @app.route('/api/count/<int:area_id>')
+    def count(area_id):
+        n = db.session.query(func.count(Company.id)).filter(Company.fm_area_id == area_id).scalar()
+        return {'count': n}
+
+    with app.app_context():
+        db.create_all()
+    return app, slow_log
+
+
+def test_slow_statement_records_plan_params_and_route(tmp_path):
+    app, slow_log = make_app(tmp_path)
+    client = app.test_client()
+    assert client.get('/api/count/3').get_json() == {'count': 0}
+
+    body = client.get('/api/admin/slow-queries').get_json()
+    selects = [e for e in body['entries'] if e['statement'].lstrip().startswith('SELECT')]
+    assert selects
+    entry = selects[0]
+    assert entry['route'] == 'GET /api/count/<int:area_id>'
+    assert entry['parameters'] == [3]
+    assert any('SCAN companies' in row['detail'] for row in entry['plan'])
+
+    # ローテーションログにも JSON Lines で書かれている
+    with open(tmp_path / 'slow_query.log', encoding='utf-8') as f:
+        logged = [json.loads(line) for line in f]
+    assert any(e['route'] == 'GET /api/count/<int:area_id>' for e in logged)
+
+
+def test_fast_statements_are_timed_but_not_recorded(tmp_path):
+    app, slow_log = make_app(tmp_path)
+    slow_log.threshold = 60
+    slow_log.entries.clear()
+    app.test_client().get('/api/count/1')
+    assert slow_log.statement_count > 0
+    assert slow_log.recent() == []
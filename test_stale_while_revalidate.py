@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+期間集計の stale-while-revalidate のテスト（ローカルSQLite）
+
+新しい値はそのまま、少し古い値はすぐ返して裏で計算し直し、古すぎる値はその場で計算することと、
+/api/filtered-data が computed_at を付け、追加した行が再計算後に反映されることを確認する。
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+import real_data_app
+import stale_while_revalidate
+
+
+@pytest.fixture
+def cache():
+    return stale_while_revalidate.StaleWhileRevalidateCache(Flask(__name__), fresh_seconds=60, stale_seconds=120)
+
+
+def test_fresh_value_is_not_recomputed(cache):
+    calls = []
+    assert cache.get('k', lambda: calls.append(1) or len(calls)) == 1
+    assert cache.get('k', lambda: calls.append(1) or len(calls)) == 1
+    assert calls == [1] and cache.hits == {'fresh': 1, 'stale': 0, 'miss': 1}
+
+
+def test_stale_value_is_served_while_recomputing_in_background(cache):
+    cache.fresh_seconds = 0
+    cache.get('k', lambda: 'old')
+    release = threading.Event()
+
+    def slow_recompute():
+        release.wait(5)
+        return 'new'
+
+    started = time.monotonic()
+    # 再計算中に何度読まれても古い値をすぐ返し、再計算は1本だけ
+    assert cache.get('k', slow_recompute) == 'old'
+    assert cache.get('k', slow_recompute) == 'old'
+    assert time.monotonic() - started < 1
+    assert len(cache._revalidating) == 1
+
+    release.set()
+    assert cache.wait_for_revalidation()
+    assert cache.get('k', lambda: 'unused') == 'new'
+
+
+def test_expired_value_is_computed_inline(cache):
+    cache.fresh_seconds = cache.stale_seconds = 0
+    cache.get('k', lambda: 'old')
+    assert cache.get('k', lambda: 'new') == 'new'
+    assert cache.hits['miss'] == 2
+
+
+def test_failed_revalidation_keeps_old_value(cache):
+    cache.fresh_seconds = 0
+    cache.get('k', lambda: 'old')
+
+    def broken():
+        raise RuntimeError('db down')
+
+    assert cache.get('k', broken) == 'old'
+    assert cache.wait_for_revalidation()
+    assert cache.get('k', broken) == 'old'
+
+
+def test_computed_at_is_oldest_value_used(cache):
+    cache.get('old', lambda: 1)
+    with cache.app.test_request_context('/'):
+        time.sleep(0.01)
+        cache.get('new', lambda: 2)
+        cache.get('old', lambda: 1)
+        assert stale_while_revalidate.computed_at() == cache._entries['old'].computed_at.isoformat(timespec='seconds')
+
+
+@pytest.fixture
+def swr_window():
+    """画面用の期間集計を、すぐ古くなるが 60秒は返し続ける設定にする"""
+    aggregate_cache = real_data_app.aggregate_cache
+    original = aggregate_cache.fresh_seconds, aggregate_cache.stale_seconds
+    aggregate_cache.clear()
+    aggregate_cache.fresh_seconds, aggregate_cache.stale_seconds = 0, 60
+    yield aggregate_cache
+    aggregate_cache.wait_for_revalidation()
+    aggregate_cache.fresh_seconds, aggregate_cache.stale_seconds = original
+    aggregate_cache.clear()
+
+
+def test_filtered_data_serves_stale_then_revalidates(sales_list_db, swr_window):
+    m = real_data_app
+    client = m.app.test_client()
+    first = client.post('/api/filtered-data', json={'date_filter': 'today'}).get_json()
+    assert first['computed_at']
+
+    with m.app.app_context():
+        now = datetime.now()
+        m.db.session.add(m.Company(
+            fm_area_id=1, imported_fm_account_id=1, company_name='追加', job_detail='',
+            fm_import_result=2, created_at=now, updated_at=now
+        ))
+        m.db.session.commit()
+
+    # 保持していた値がすぐ返り、裏で計算し直される
+    second = client.post('/api/filtered-data', json={'date_filter': 'today'}).get_json()
+    assert second['total_new'] == first['total_new']
+    assert second['computed_at'] == first['computed_at']
+
+    assert swr_window.wait_for_revalidation()
+    third = client.post('/api/filtered-data', json={'date_filter': 'today'}).get_json()
+    assert third['total_new'] == first['total_new'] + 1
+    assert third['computed_at'] >= first['computed_at']
+
+
+def test_date_range_data_has_computed_at(sales_list_db):
+    client = real_data_app.app.test_client()
+    today = datetime.now().date().isoformat()
+    body = client.get(f'/api/date-range-data?start_date={today}&end_date={today}').get_json()
+    assert body['status'] == 'success' and body['computed_at'].startswith(today)
+
+
+def test_closed_period_is_counted_without_cache(sales_list_db, swr_window):
+    # 締まった期間は ETag が今のデータを表すので、古い集計を返さない
+    m = real_data_app
+    client = m.app.test_client()
+    yesterday = (datetime.now() - timedelta(days=1)).replace(hour=12)
+    path = f'/api/date-range-data?start_date={yesterday.date()}&end_date={yesterday.date()}'
+    first = client.get(path)
+
+    with m.app.app_context():
+        m.db.session.add(m.Company(
+            fm_area_id=1, imported_fm_account_id=1, company_name='追加', job_detail='',
+            fm_import_result=2, created_at=yesterday, updated_at=yesterday
+        ))
+        m.db.session.commit()
+
+    second = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200 and second.headers['ETag'] != first.headers['ETag']
+    assert second.get_json()['total_new'] == first.get_json()['total_new'] + 1
+    assert not swr_window._entries
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+トップページのテンプレート・静的ファイルのテスト（ローカルSQLite）
+
+各アプリの / が templates/ のファイルから描画され、CSS/JS が内容ハッシュ付きの URL から
+immutable・圧縮済みで配信されること、コンパイル済みのテンプレートがキャッシュから使われることを確認する。
+"""
+
+import gzip
+import os
+import re
+
+import pytest
+
+import excel_only_app
+import hellowork_app
+import real_data_app
+import static_assets
+
+
+@pytest.mark.parametrize('module,name', [
+    (real_data_app, 'real_data'),
+    (excel_only_app, 'excel_only'),
+    (hellowork_app, 'hellowork'),
+])
+def test_index_uses_template_file_and_static_assets(sales_list_db, hellowork_db, module, name):
+    client = module.app.test_client()
+    page = client.get('/').get_data(as_text=True)
+    assert '<style>' not in page and '<script>\n' not in page
+
+    for ext, content_type in (('css', 'text/css'), ('js', 'javascript')):
+        url = re.search(rf'/assets/{name}/index\.[0-9a-f]{{10}}\.{ext}', page).group(0)
+        response = client.get(url)
+        assert response.status_code == 200
+        assert content_type in response.content_type
+        assert 'immutable' in response.headers['Cache-Control']
+        with open(f'{module.app.static_folder}/{name}/index.{ext}', 'rb') as f:
+            assert response.data == f.read()
+
+        compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(compressed.data) == response.data
+
+        assert client.get(url, headers={'If-None-Match': f'"{response.get_etag()[0]}"'}).status_code == 304
+
+    env = module.app.jinja_env
+    assert env.get_template(f'{name}/index.html') is env.get_template(f'{name}/index.html')
+
+
+def test_fingerprint_changes_with_content(tmp_path):
+    (tmp_path / 'app').mkdir()
+    script = tmp_path / 'app' / 'index.js'
+    script.write_text('console.log(1);\n' * 50)
+    manifest = static_assets.AssetManifest(str(tmp_path), reload=True)
+    before = manifest.url_name('app/index.js')
+    assert re.fullmatch(r'app/index\.[0-9a-f]{10}\.js', before)
+    assert manifest.lookup(before).encoded.keys() >= {'gzip'}
+
+    script.write_text('console.log(2);\n' * 50)
+    os.utime(script, (1, 1))
+    after = manifest.url_name('app/index.js')
+    assert after != before and manifest.lookup(before) is None
+    assert manifest.url_name('app/missing.js') is None